@@ -0,0 +1,139 @@
+## @file Data_Logger.py
+#  Records the motor controllers' time, position, velocity, effort and
+#  reference at the full control rate, for step responses and tuning.
+#
+#  The motor controllers used to put each sample into queues, which were
+#  taken out to save heap. Instead, a @c DataLogger allocates one array for
+#  each channel of each wheel when it's created, at boot, and the motor
+#  controllers write each sample into the arrays in place while the data
+#  transfer share is set, so recording never allocates memory. The memory
+#  needed is known before the logger is made, from @c DataLogger.size(), so
+#  @c main.py can report it against the free heap and the number of samples
+#  can be chosen to fit. Recording stops when the arrays are full.
+#
+#  After the test, @c dump() writes the samples to a UART in the compact
+#  binary form described at @c LOG_HEADER, straight from the arrays, and
+#  @c Host Tools/Data_Log_Decode.py turns a dump into CSV files. Writing a
+#  whole dump takes most of a second, so on the robot @c pieces() hands it
+#  to the UART sender instead, a few samples at a time.
+#
+#  @author Antonio Ventimiglia
+#  @author Caiden Bonney
+#  @date   2025-Dec-12
+#  @copyright GPLv3
+
+import struct
+import utime
+import micropython
+from array import array
+
+## Names of the channels recorded for each wheel, in the order they're
+#  dumped: time since the logger was started [us], as an unsigned 32-bit
+#  number, then position [rad], velocity [mm/s], effort [%] and reference
+#  [mm/s], as 32-bit floats.
+CHANNELS = ("time", "position", "velocity", "effort", "reference")
+
+## Array type codes of the channels.
+CHANNEL_TYPES = "Iffff"
+
+## Format of the header written by @c DataLogger.dump(): the marker
+#  @c b"RLOG", the number of channels, the number of samples each channel
+#  holds, and the number recorded for the left and right wheels. Then, for
+#  the left wheel and then the right, come the samples of each channel in
+#  turn, little-endian, oldest first.
+LOG_HEADER = "<4sBHHH"
+
+
+## Preallocated recorder of the motor controllers' samples.
+class DataLogger:
+    ## Bytes of heap a logger holding a number of samples for each wheel
+    #  needs for its arrays.
+    #
+    #  @param samples Samples recorded for each wheel
+    #  @return The bytes needed
+    @staticmethod
+    def size(samples: int) -> int:
+        return 2 * 4 * len(CHANNELS) * samples
+
+    ## Create a logger, allocating all its arrays.
+    #
+    #  @param samples Samples recorded for each wheel; at the 20 ms control
+    #         period, 250 samples hold 5 seconds
+    def __init__(self, samples: int = 250):
+        ## Samples each channel holds.
+        self.samples = int(samples)
+
+        # For each wheel, one array for each channel
+        self._channels = tuple(tuple(array(code, [0] * self.samples) for code in CHANNEL_TYPES) for _ in range(2))
+
+        # Samples recorded for each wheel, and when recording started
+        self._count = array("H", [0, 0])
+        self._start = utime.ticks_us()
+
+    ## Start recording from the beginning, discarding what was recorded.
+    def start(self):
+        self._count[0] = 0
+        self._count[1] = 0
+        self._start = utime.ticks_us()
+
+    ## Record a sample for one wheel, with the time since @c start() was
+    #  called. Nothing is allocated.
+    #
+    #  @param wheel 0 for the left wheel, 1 for the right
+    #  @param position Wheel position [rad]
+    #  @param velocity Wheel velocity [mm/s]
+    #  @param effort Effort given to the motor [%]
+    #  @param reference Reference velocity [mm/s]
+    #  @return @c False if the arrays were already full, so the sample
+    #          wasn't recorded
+    @micropython.native
+    def record(self, wheel: int, position: float, velocity: float, effort: float, reference: float) -> bool:
+        idx = self._count[wheel]
+        if idx >= self.samples:
+            return False
+        time_a, pos_a, vel_a, eff_a, ref_a = self._channels[wheel]
+        time_a[idx] = utime.ticks_diff(utime.ticks_us(), self._start)
+        pos_a[idx] = position
+        vel_a[idx] = velocity
+        eff_a[idx] = effort
+        ref_a[idx] = reference
+        self._count[wheel] = idx + 1
+        return True
+
+    ## The number of samples recorded for a wheel.
+    #
+    #  @param wheel 0 for the left wheel, 1 for the right
+    def count(self, wheel: int) -> int:
+        return self._count[wheel]
+
+    ## Write the samples to a stream in the compact binary form described at
+    #  @c LOG_HEADER, straight from the arrays.
+    #  @param stream Something with a @c write() method, such as a UART
+    def dump(self, stream):
+        stream.write(struct.pack(LOG_HEADER, b"RLOG", len(CHANNELS), self.samples, self._count[0], self._count[1]))
+        for wheel in range(2):
+            for buf in self._channels[wheel]:
+                stream.write(memoryview(buf)[: self._count[wheel]])
+
+    ## Generator of the dump @c dump() writes, in pieces small enough to be
+    #  sent a few at a time, for @c UARTSender.write_stream().
+    #
+    #  @param size Most bytes in a piece; at least the header's length
+    #  @return Generator of pairs of a buffer and its length in bytes
+    def pieces(self, size: int):
+        header = struct.pack(LOG_HEADER, b"RLOG", len(CHANNELS), self.samples, self._count[0], self._count[1])
+        yield header, len(header)
+        step = max(1, size // 4)
+        for wheel in range(2):
+            count = self._count[wheel]
+            for buf in self._channels[wheel]:
+                view = memoryview(buf)
+                for start in range(0, count, step):
+                    end = min(start + step, count)
+                    yield view[start:end], 4 * (end - start)
+
+    ## Puts the size of the logger and the samples recorded into a string.
+    def __repr__(self):
+        return "Data logger: 2 wheels x {:d} channels x {:d} samples, {:d} bytes; recorded {:d} left, {:d} right".format(
+            len(CHANNELS), self.samples, DataLogger.size(self.samples), self._count[0], self._count[1]
+        )
@@ -0,0 +1,290 @@
+## @file Flight_Log.py
+#  Low-priority task which records the observer's and the motor
+#  controllers' state every frame to a file in flash, compressed so that a
+#  whole run fits.
+#
+#  Each sample is a set of integers in the units the sensors work in:
+#  encoder ticks, the IMU's register units of 1/900 rad, and hundredths of
+#  a millimetre or of a percent, as listed in @c CHANNELS. Each value is
+#  written as the difference from the one before, zigzag and varint
+#  encoded, so a value which changes little from frame to frame takes one
+#  byte rather than the four of a float.
+#
+#  Samples go into one of two pages in RAM, allocated when the log is
+#  created. When a page is full it waits to be written while the other
+#  fills. A page is written only when the slack before the next task
+#  deadline is longer than the slowest recent write, so writing to flash
+#  never makes a timed task late; if the other page fills first, samples
+#  are dropped and counted rather than waiting. Each page is written as a
+#  block with its own header and CRC-16, and the first sample in a block is
+#  given whole, so every block can be decoded on its own. The file is only
+#  ever appended to: each boot starts with a session header, and a block
+#  lost or cut short by a soft reset costs only that block.
+#
+#  @c Host Tools/Flight_Log_Decode.py decodes the file into CSV files.
+#
+#  @author Antonio Ventimiglia
+#  @author Caiden Bonney
+#  @date   2025-Dec-12
+#  @copyright GPLv3
+
+import os
+import struct
+import utime
+import micropython
+from array import array
+from Romi_Props import RomiProps
+from Observer import Observer
+from Telemetry import crc16
+
+## File the log is appended to, or @c None to log nothing. Set this before
+#  the @c FlightLog is created to write somewhere else.
+PATH = "flight.log"
+
+## The channels of each sample, and the number of integer steps in each of
+#  their units: time since boot [ms], left and right encoder positions
+#  [ticks], heading [rad] and yaw rate [rad/s] in the IMU's units of 1/900,
+#  X and Y position and line centroid [mm] in hundredths, and left and right
+#  motor efforts [%] in hundredths.
+CHANNELS = (
+    ("time", 1),
+    ("left_ticks", 1),
+    ("right_ticks", 1),
+    ("heading", 900),
+    ("yaw_rate", 900),
+    ("X", 100),
+    ("Y", 100),
+    ("centroid", 100),
+    ("left_effort", 100),
+    ("right_effort", 100),
+)
+
+## Format of the header starting each session: the marker @c b"FLGS", the
+#  format version, the number of channels, and the length and CRC-16 of the
+#  text which follows, naming each channel and its steps as
+#  @c name:steps separated by commas.
+SESSION_HEADER = "<4sBBHH"
+
+## Format of the header starting each block: the marker @c b"FLGB", the
+#  block's number in the session, the number of samples in it, the number
+#  of samples dropped just before it, and the length and CRC-16 of the
+#  encoded samples which follow.
+BLOCK_HEADER = "<4sHHHHH"
+
+# Bytes in a block header, and the most a sample can take once encoded
+_BLOCK_LEN = struct.calcsize(BLOCK_HEADER)
+_SAMPLE_MAX = 5 * len(CHANNELS)
+
+
+## Write an integer to a buffer as a zigzag encoded varint.
+#
+#  @param buf The buffer
+#  @param pos Where in the buffer to write
+#  @param value The integer, which may be negative
+#  @return The position after the last byte written
+@micropython.native
+def put_varint(buf, pos: int, value: int) -> int:
+    value = (value << 1) if value >= 0 else ((-value << 1) - 1)
+    while value >= 0x80:
+        buf[pos] = (value & 0x7F) | 0x80
+        value >>= 7
+        pos += 1
+    buf[pos] = value
+    return pos + 1
+
+
+## Task which samples the robot's state every frame and writes it to flash
+#  in double-buffered blocks.
+class FlightLog:
+    ## Create a flight log, allocating its pages and opening the file.
+    #
+    #  @param encoders The left and right @c Encoder
+    #  @param imu The @c IMU, whose integrated heading is read
+    #  @param controllers The left and right @c MotorController
+    #  @param line_clc The path director's line following controller, whose
+    #         last measured centroid is read
+    #  @param task_list The @c cotask.TaskList whose next deadline decides
+    #         when a page may be written
+    #  @param page Bytes in each RAM page, and so the most in a block
+    #  @param max_bytes Size [bytes] the file may grow to, after which
+    #         nothing more is written
+    #  @param write_us Time [us] a page is expected to take to write, until
+    #         a write has been timed
+    #  @param priority The priority of the log's task; only the deadlines of
+    #         tasks above it count, as those of its own priority or below can
+    #         wait
+    def __init__(
+        self, encoders, imu, controllers, line_clc, task_list, page: int = 512, max_bytes: int = 131072, write_us: int = 3000, priority: int = 0
+    ):
+        self.encoders = encoders
+        self.priority = priority
+        self.imu = imu
+        self.controllers = controllers
+        self.line_clc = line_clc
+        self.task_list = task_list
+        self.max_bytes = max_bytes
+
+        ## Time [us] a page is expected to take to write: the slowest recent
+        #  write, decaying slowly.
+        self.write_us = write_us
+
+        # The two pages, and the page being filled, where the next sample
+        # goes in it, the samples in it and those dropped before it
+        self._pages = (bytearray(page), bytearray(page))
+        self._views = (memoryview(self._pages[0]), memoryview(self._pages[1]))
+        self._fill = 0
+        self._pos = _BLOCK_LEN
+        self._samples = 0
+        self._dropped_before = 0
+
+        # The page waiting to be written, or -1, its length and the samples
+        # in it
+        self._waiting = -1
+        self._waiting_len = 0
+        self._waiting_samples = 0
+
+        # The sample being taken and the one before it in the same block
+        self._values = array("i", [0] * len(CHANNELS))
+        self._prev = array("i", [0] * len(CHANNELS))
+        self._seq = 0
+
+        ## Samples recorded, and dropped for want of a free page or of room
+        #  in the file.
+        self.samples = 0
+        self.dropped = 0
+        ## Blocks written to the file.
+        self.blocks = 0
+
+        self._file = None
+        self.bytes = 0
+        if PATH:
+            try:
+                self.bytes = os.stat(PATH)[6]
+            except OSError:
+                self.bytes = 0
+            self._file = open(PATH, "ab")
+            self._write_session()
+
+    # Start the session with the names and steps of the channels
+    def _write_session(self):
+        text = ",".join(name + ":" + str(steps) for name, steps in CHANNELS).encode()
+        header = struct.pack(SESSION_HEADER, b"FLGS", 1, len(CHANNELS), len(text), crc16(text, len(text)))
+        self._file.write(header)
+        self._file.write(text)
+        self._file.flush()
+        self.bytes += len(header) + len(text)
+
+    # Read the robot's state into the sample, in the units of CHANNELS
+    def _read(self, pose):
+        values = self._values
+        ticks_to_rads = RomiProps.ticks_to_rads
+        values[0] = utime.ticks_ms()
+        values[1] = round(self.encoders[0].position / ticks_to_rads)
+        values[2] = round(self.encoders[1].position / ticks_to_rads)
+        values[3] = round(self.imu.heading * 900)
+        values[4] = round(pose.get_field(Observer.YAWRATE) * 900)
+        values[5] = round(pose.get_field(Observer.X) * 100)
+        values[6] = round(pose.get_field(Observer.Y) * 100)
+        values[7] = round(self.line_clc.x_h * 100) if self.line_clc else 0
+        values[8] = round(self.controllers[0].effort * 100)
+        values[9] = round(self.controllers[1].effort * 100)
+
+    ## Encode the sample just read into the page being filled.
+    @micropython.native
+    def _encode(self):
+        page = self._pages[self._fill]
+        values = self._values
+        prev = self._prev
+        pos = self._pos
+        first = self._samples == 0
+        for idx in range(len(values)):
+            value = values[idx]
+            pos = put_varint(page, pos, value if first else value - prev[idx])
+            prev[idx] = value
+        self._pos = pos
+        self._samples += 1
+        self.samples += 1
+
+    # Whether the page being filled has no room for another sample
+    def _full(self) -> bool:
+        return self._pos + _SAMPLE_MAX > len(self._pages[self._fill])
+
+    # Finish the page being filled with its block header and hand it over
+    # to be written, then start filling the other page
+    def _close(self):
+        page = self._pages[self._fill]
+        length = self._pos - _BLOCK_LEN
+        crc = crc16(self._views[self._fill][_BLOCK_LEN:], length)
+        struct.pack_into(BLOCK_HEADER, page, 0, b"FLGB", self._seq, self._samples, self._dropped_before, length, crc)
+        self._seq = (self._seq + 1) & 0xFFFF
+        self._waiting = self._fill
+        self._waiting_len = self._pos
+        self._waiting_samples = self._samples
+        self._fill ^= 1
+        self._pos = _BLOCK_LEN
+        self._samples = 0
+        self._dropped_before = 0
+
+    # Write the waiting page to the file, timing the write
+    def _write(self):
+        length = self._waiting_len
+        if self._file is None or self.bytes + length > self.max_bytes:
+            self.dropped += self._waiting_samples
+        else:
+            start = utime.ticks_us()
+            self._file.write(self._views[self._waiting][:length])
+            self._file.flush()
+            took = utime.ticks_diff(utime.ticks_us(), start)
+            self.write_us = max(took, self.write_us - (self.write_us >> 4))
+            self.bytes += length
+            self.blocks += 1
+        self._waiting = -1
+
+    ## Write whatever is held in the pages, waiting for the writes. Call
+    #  this only once the scheduler has stopped.
+    def close(self):
+        if self._waiting >= 0:
+            self._write()
+        if self._samples:
+            self._close()
+            self._write()
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    ## Generator which takes a sample every run and writes full pages when
+    #  there is time.
+    #
+    #  Yields 0 when no page is waiting to be written and 1 when one is.
+    #
+    #  @param shares Tuple holding the @c task_share.StructShare for the
+    #         observed state
+    def run(self, shares):
+        (obsd_pose_s,) = shares
+        while True:
+            # A full page is handed over to be written once the other page
+            # has been; until then, samples are dropped
+            if self._full() and self._waiting < 0:
+                self._close()
+            if self._full():
+                self.dropped += 1
+                self._dropped_before += 1
+            else:
+                self._read(obsd_pose_s)
+                self._encode()
+                if self._full() and self._waiting < 0:
+                    self._close()
+
+            if self._waiting >= 0:
+                slack = self.task_list.slack(self.priority)
+                if slack is None or slack > self.write_us:
+                    self._write()
+
+            yield 0 if self._waiting < 0 else 1
+
+    ## Puts the samples recorded and dropped and the size of the file into a
+    #  string.
+    def __repr__(self):
+        return "Flight log: {:d} samples, {:d} dropped; {:d} blocks, {:d} of {:d} bytes; write {:d} us".format(
+            self.samples, self.dropped, self.blocks, self.bytes, self.max_bytes, self.write_us
+        )
@@ -1,25 +1,167 @@
 ## @file Garbage_Collector.py
-#  Cooperative task that periodically triggers MicroPython garbage collection
-#  to reduce fragmentation during long runs.
+#  Policy which decides when the cooperative scheduler runs the MicroPython
+#  garbage collector. Instead of being a task of its own, it is attached to
+#  @c cotask.TaskList as @c gc_policy and collects only when the time until
+#  the next task deadline is longer than a collection is expected to take,
+#  so collecting never makes a timed task late. If memory still runs low, a
+#  collection is forced regardless of the deadlines.
 #
 #  @author Antonio Ventimiglia
 #  @author Caiden Bonney
 #  @date   2025-Dec-12
 #  @copyright GPLv3
 
-from gc import collect
+import gc
+import utime
+from array import array
 
+## Number of recent collections whose duration and reclaimed memory are kept.
+HISTORY_LEN = 16
 
-## Task wrapper that invokes @c gc.collect() on a cooperative schedule.
+
+## Garbage collection policy for @c cotask.TaskList.
+#
+#  After every scheduler pass, @c service() is called. When no task ran and
+#  at least @c min_garbage bytes have been allocated since the last
+#  collection, a collection is run if the slack until the next deadline is
+#  longer than the estimated cost of a collection plus a safety margin. The
+#  cost estimate is the slowest recent collection, decaying slowly so that
+#  one unusually long collection does not block collecting for the rest of
+#  the run. While tasks keep running, free memory is checked every
+#  @c check_every passes, and if it is below the low-water mark a
+#  collection is forced.
 class GarbageCollector:
-    ## Initialize the garbage collector task.
-    def __init__(self):
-        pass
+    ## Create a garbage collection policy.
+    #
+    #  @param low_water Free heap bytes below which a collection is forced
+    #  @param cost_us Initial estimate of how long a collection takes [us]
+    #  @param margin_us Slack [us] kept in hand beyond the estimated cost
+    #  @param check_every Number of busy scheduler passes between checks of
+    #         the free memory
+    #  @param min_garbage Bytes which must have been allocated since the
+    #         last collection before collecting in idle time is worthwhile;
+    #         most of the cost of a collection is marking the live objects,
+    #         so collecting a little garbage often wastes time
+    def __init__(
+        self, low_water: int = 8192, cost_us: int = 5000, margin_us: int = 500, check_every: int = 32, min_garbage: int = 8192
+    ):
+        ## Free heap bytes below which a collection is forced.
+        self.low_water = low_water
+
+        ## Estimated time a collection takes [us].
+        self.cost_us = cost_us
+
+        ## Slack [us] kept in hand beyond the estimated cost.
+        self.margin_us = margin_us
+
+        ## Number of busy scheduler passes between checks of free memory.
+        self.check_every = check_every
+
+        ## Bytes allocated since the last collection before collecting in
+        #  idle time is worthwhile.
+        self.min_garbage = min_garbage
+
+        # Busy passes since free memory was last checked
+        self._busy = 0
+
+        # Free memory just after the last collection; any less now means
+        # memory has been allocated since
+        self._free_after = gc.mem_free()
+
+        # Durations [us] and reclaimed bytes of the most recent collections,
+        # kept in rings allocated here so that recording them never allocates
+        self.durations = array("I", [0] * HISTORY_LEN)
+        self.reclaimed = array("i", [0] * HISTORY_LEN)
+        self._head = 0
+
+        self.reset_stats()
+
+    ## Reset the collection statistics.
+    def reset_stats(self):
+        ## Number of collections run when there was enough slack.
+        self.collects = 0
 
-    ## Generator that runs garbage collection each time it's scheduled.
+        ## Number of collections forced by low memory.
+        self.forced = 0
+
+        ## Number of idle passes on which a collection did not fit the slack.
+        self.skipped = 0
+
+        ## Total [us] and longest [us] time spent collecting.
+        self.total_us = 0
+        self.max_us = 0
+
+        ## Total bytes reclaimed.
+        self.total_reclaimed = 0
+
+        ## Lowest free memory [bytes] seen before a collection.
+        self.min_free = self._free_after
+
+    ## Decide whether to collect after a scheduler pass. This is called by
+    #  the scheduler methods of @c cotask.TaskList.
+    #
+    #  @param task_list The task list being scheduled
+    #  @param ran @c True if a task ran during the pass
+    def service(self, task_list, ran: bool):
+        if ran:
+            self._busy += 1
+            if self._busy < self.check_every:
+                return
+            self._busy = 0
+            if gc.mem_free() < self.low_water:
+                self.collect(True)
+            return
+
+        free = gc.mem_free()
+        if free < self.low_water:
+            self.collect(True)
+        elif self._free_after - free >= self.min_garbage:
+            slack = task_list.slack()
+            if slack is None or slack > self.cost_us + self.margin_us:
+                self.collect(False)
+            else:
+                self.skipped += 1
+
+    ## Run a collection, timing it and measuring the memory reclaimed.
     #
-    #  Yields after collecting so the scheduler can continue running other tasks.
-    def run(self):
-        while True:
-            collect()
-            yield
+    #  @param forced @c True if the collection was forced by low memory
+    def collect(self, forced: bool = False):
+        free = gc.mem_free()
+        start = utime.ticks_us()
+        gc.collect()
+        dur = utime.ticks_diff(utime.ticks_us(), start)
+        self._free_after = gc.mem_free()
+
+        idx = self._head
+        self.durations[idx] = dur
+        self.reclaimed[idx] = self._free_after - free
+        idx += 1
+        self._head = idx if idx < HISTORY_LEN else 0
+
+        if forced:
+            self.forced += 1
+        else:
+            self.collects += 1
+        self.total_us += dur
+        self.total_reclaimed += self._free_after - free
+        if dur > self.max_us:
+            self.max_us = dur
+        if free < self.min_free:
+            self.min_free = free
+
+        # Let the cost estimate decay by 1/8 per collection toward the
+        # latest duration, but jump straight up to any longer one
+        self.cost_us -= self.cost_us >> 3
+        if dur > self.cost_us:
+            self.cost_us = dur
+
+    ## Create a table of collection statistics.
+    def __repr__(self):
+        count = self.collects + self.forced
+        avg_dur = self.total_us / count / 1000.0 if count else 0.0
+        avg_freed = self.total_reclaimed // count if count else 0
+        return (
+            "GARBAGE COLLECTOR   COLLECTS  FORCED  SKIPPED   AVG DUR   MAX DUR  AVG FREED  MIN FREE\n"
+            f"{'':<16s}{self.collects:>11d}{self.forced:>8d}{self.skipped:>9d}"
+            f"{avg_dur: 10.3f}{(self.max_us / 1000.0): 10.3f}{avg_freed:>11d}{self.min_free:>10d}\n"
+        )
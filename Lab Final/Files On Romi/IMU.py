@@ -11,6 +11,7 @@ from pyb import I2C, Pin, delay  # pyright: ignore
 from struct import calcsize, unpack_from
 from micropython import const  # pyright: ignore
 from os import listdir
+from time import ticks_diff, ticks_ms  # pyright: ignore
 from Sensor import Sensor
 from math import pi
 
@@ -75,6 +76,10 @@ class IMU(Sensor):
         self.reset_pin = reset_pin
         self._buf = bytearray((0 for _ in range(22)))  # buffer for unpacking. Each element is a byte
         self.calibrated = False
+        # Last calibration status seen and when it was read, once calibration
+        # without saved data has started
+        self._cal_prev = None
+        self._cal_time = 0
         self.convert_reg_to_rad = 900
         self.prev_imu_heading = 0
         self.heading = 0
@@ -181,9 +186,14 @@ class IMU(Sensor):
     ## Run calibration or load saved coefficients from file.
     #
     #  If @c IMU_cal.txt exists, coefficients are loaded; otherwise calibration
-    #  runs until gyro and mag are calibrated, then saves to file.
+    #  runs until gyro and mag are calibrated, then saves to file. Calibration
+    #  never blocks: each call checks the calibration status at most once, no
+    #  more often than every 100 ms so the IMU has time to settle, so this is
+    #  meant to be called on every run of a task until it returns @c True.
+    #
+    #  @return @c True once calibration is complete
     def calibrate(self) -> bool:
-        if "IMU_cal.txt" in listdir():
+        if self._cal_prev is None and "IMU_cal.txt" in listdir():
             # Calibration data is present
             self.set_mode(0)
             print("Found IMU calibration data, skipping calibration")
@@ -198,28 +208,34 @@ class IMU(Sensor):
                 self.calibrated = True
                 self.set_mode(IMU.default_mode_set)
                 return True
-        else:
+
+        if self._cal_prev is None:
             print("No IMU calibration data found")
             self.set_mode(5)  # set to NDOF mode for calibration
+            self._cal_prev = 0
+            self._cal_time = ticks_ms()
+            return False
 
-            prev_cal = cur_cal = 0
-            while not (cur_cal & 0b0011_0011 == 0b0011_0011):  # only check GYR and MAG calibration
-                if prev_cal != cur_cal:
-                    print(f"{cur_cal:08b}")
-                    prev_cal = cur_cal
-
-                cur_cal = self.get_calibration_status()[0]  # Update cur_cal before checking
-                if cur_cal & 0b0011_0011 == 0b0011_0011:
-                    self.set_mode(0)
-                    with open("IMU_cal.txt", "w") as f:
-                        coefs = ",".join(f"{s & 0xFFFF:016b}" for s in self.get_calibration_coefficients())
-                        f.write(f"{coefs}\n")
-                        print(f"{coefs}")
-                    print("IMU Calibration Coefficients Saved")
-                    self.calibrated = True
-                    self.set_mode(IMU.default_mode_set)
-                    return True
-                delay(100)  # delay(ms) to allow IMU to settle
+        # Wait between checks to allow IMU to settle
+        if ticks_diff(ticks_ms(), self._cal_time) < 100:
+            return False
+        self._cal_time = ticks_ms()
+
+        cur_cal = self.get_calibration_status()[0]
+        if cur_cal & 0b0011_0011 == 0b0011_0011:  # only check GYR and MAG calibration
+            self.set_mode(0)
+            with open("IMU_cal.txt", "w") as f:
+                coefs = ",".join(f"{s & 0xFFFF:016b}" for s in self.get_calibration_coefficients())
+                f.write(f"{coefs}\n")
+                print(f"{coefs}")
+            print("IMU Calibration Coefficients Saved")
+            self.calibrated = True
+            self.set_mode(IMU.default_mode_set)
+            return True
+
+        if self._cal_prev != cur_cal:
+            print(f"{cur_cal:08b}")
+            self._cal_prev = cur_cal
         return False
 
     ## Return Euler angles (heading, roll, pitch) in radians.
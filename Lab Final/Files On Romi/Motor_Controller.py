@@ -1,6 +1,7 @@
 ## @file Motor_Controller.py
 #  Cooperative task that applies closed-loop control to a motor using encoder
-#  feedback. Handles segment starts, gain updates, and data transfer hooks.
+#  feedback. Handles segment starts, gain updates, and recording samples to
+#  a @c DataLogger while the data transfer share is set.
 #  @author Antonio Ventimiglia
 #  @author Caiden Bonney
 #  @date   2025-Dec-12
@@ -22,7 +23,9 @@ class MotorController:
     #  @param battery   Battery monitor for droop compensation
     #  @param side      @c False for left, @c True for right motor
     #  @param duration  Optional test duration in seconds (0 = continuous)
-    def __init__(self, motor, encoder, battery, side: bool, duration: int = 0):
+    #  @param logger    Optional @c DataLogger which records each sample
+    #                   while the data transfer share is set
+    def __init__(self, motor, encoder, battery, side: bool, duration: int = 0, logger=None):
         self.motor = motor
         self.encoder = encoder
         self.side = side  # False = left, True = right
@@ -31,8 +34,11 @@ class MotorController:
         self.motor.enable()
         self.encoder.zero()
 
-        self.queues_were_full = False
         self.duration = duration  # duration of test in seconds where 0 = infinite
+        self.logger = logger
+
+        ## Effort last given to the motor [%].
+        self.effort = 0.0
 
         # Internal flag to indicate when the current test is complete
         self.done = False
@@ -51,11 +57,13 @@ class MotorController:
 
     ## Generator task that drives the motor under closed-loop control.
     #
-    #  Responds to flag and speed shares, manages segment starts, updates
-    #  gains, and writes efforts to the motor driver.
+    #  Responds to new speed commands, marked by writes to the flag share,
+    #  manages segment starts, updates gains, and writes efforts to the motor
+    #  driver.
     #
     #  @param shares Tuple of @c task_share variables for flags, speed,
-    #                data transfer and test completion signaling
+    #                data transfer and test completion signaling, and the
+    #                segment start event
     def run(self, shares):
         # Separating the shares
         (
@@ -63,7 +71,7 @@ class MotorController:
             speed_s,
             data_transfer_s,
             test_complete_s,
-            seg_start_s,
+            seg_start_e,
         ) = shares
 
         def test_complete():
@@ -74,17 +82,25 @@ class MotorController:
 
         self.start = ticks_us()
 
+        # This controller's number among those which see the segment start
+        # event
+        participant = 1 if self.side else 0
+
+        # Version of the flag share last acted on; the speed is read only
+        # after the flag has been written again
+        flag_version = flag_s.version()
+
         while True:
-            if seg_start_s.get():
-                seg_start_s.put(seg_start_s.get() - 1)  # decrement seg_start_s because we have two motor controllers
+            if seg_start_e.wait_poll(participant):
                 self.test_start = ticks_us()
                 test_complete_s.put(0)
-                self.queues_were_full = False
                 self.done = False
 
-            # All motor control code goes here in the needed states
-            if flag_s.get():
-                flag_s.put(0)
+            # All motor control code goes here in the needed states. Each
+            # new speed command raises the flag again, which counts as a
+            # write even though the flag is never cleared
+            if flag_s.changed_since(flag_version):
+                flag_version = flag_s.version()
                 if speed_s.get() == 0:
                     # Speed is zero so disable the closed loop control
                     self.CLC.reset()
@@ -102,6 +118,7 @@ class MotorController:
             # first check if test is already complete
             if not test_complete_s.get():
                 # change effort by running closed loop control if it is on
+                effort = 0.0
                 if self.CLC.on:
                     self.CLC.gain_update(
                         Kp=Encoder.Kp,
@@ -111,26 +128,22 @@ class MotorController:
                         Kff=Encoder.Kff,
                         PWM_start=Encoder.PWM_startr if self.side else Encoder.PWM_startl,
                     )
-                    self.motor.set_effort(self.CLC.run())
+                    effort = self.CLC.run()
+                    self.motor.set_effort(effort)
+                self.effort = effort
 
-                # if data transfer is on, then put data into queues
+                # if data transfer is on, then record the sample
                 if data_transfer_s.get():
 
                     # if no time limit -> always run ; if time limit -> check if less than duration
                     if self.duration <= 0 or ticks_diff(ticks_us(), self.test_start) <= self.duration * 1e6:
-                        # Original queues were removed for memory management but were used during data collection in prior labs
-
-                        #     # if queues are currently full, then set test complete, stop motors and zero encoders
-                        #     if time_q.full() or pos_q.full() or vel_q.full():
-                        #         self.queues_were_full = True
-                        #         test_complete()
-
-                        #     # if queues are not full and have not been full within the current test, then put data into queues
-                        #     if not self.queues_were_full:
-                        #         time_q.put(ticks_diff(ticks_us(), self.test_start))  #  [us]
-                        #         pos_q.put(self.encoder.position)  #                     [rad]
-                        #         vel_q.put(self.encoder.velocity)  #                     [mm/s]
-                        pass
+                        # The logger's arrays were allocated at boot, so this
+                        # allocates nothing; once they're full, recording
+                        # stops for both wheels but the robot carries on
+                        if self.logger is not None and not self.logger.record(
+                            participant, self.encoder.position, self.encoder.velocity, effort, self.CLC.r
+                        ):
+                            data_transfer_s.put(0)
                     else:
                         # if time limit is reached, then set test complete, stop motors and zero encoders
                         test_complete()
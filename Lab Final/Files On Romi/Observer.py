@@ -14,6 +14,20 @@ from math import pi
 ## Luenberger-style observer that estimates pose from sensors and inputs.
 class Observer:
 
+    ## Names of the fields of the observed state, in the order they're kept
+    #  in the @c task_share.StructShare the observer publishes.
+    POSE_FIELDS = ("lpos", "rpos", "cpos", "yaw", "yawrate", "X", "Y", "dist_yaw")
+
+    # Field numbers in the observed state
+    LPOS = 0  # left wheel position [mm]
+    RPOS = 1  # right wheel position [mm]
+    CPOS = 2  # center position [mm]
+    YAW = 3  # heading [rad]
+    YAWRATE = 4  # yaw rate [rad/s]
+    X = 5  # X position [mm]
+    Y = 6  # Y position [mm]
+    DIST_YAW = 7  # heading derived from wheel distances [rad]
+
     ## Initialize the observer with required sensor references.
     #
     #  @param IMU       IMU object for heading/yaw rate
@@ -37,24 +51,34 @@ class Observer:
 
         self.uart = UART(5, 115200)
 
+        # Number of upcoming runs on which the pose update is skipped
+        self._skip = 0
+
+    ## Called by the scheduler after a run which went over the task's time
+    #  budget. The next pose update is skipped, so the tasks after the
+    #  observer in the frame get their time back.
+    #
+    #  @param run_us How long the run took [us]
+    def degrade(self, run_us):
+        self._skip = 1
+
     ## Generator that updates state estimates and publishes to shares.
     #
     #  Uses discrete system matrices to propagate the state and updates pose
-    #  accumulators. Yields after each update for cooperative scheduling.
+    #  accumulators. The observed state is published all at once as one
+    #  record, so readers never see fields from different frames. Yields 0
+    #  after each update for cooperative scheduling, or 1 after a run on
+    #  which the update was skipped.
     #
-    #  @param shares Tuple of @c task_share variables for observed states
+    #  @param shares Tuple holding the @c task_share.StructShare for the
+    #         observed state, with fields named in @c POSE_FIELDS
     def run(self, shares):
-        # Seperating the shares
-        (
-            obsd_lpos_s,
-            obsd_rpos_s,
-            obsd_cpos_s,
-            obsd_yaw_s,
-            obsd_yawrate_s,
-            obsd_X_s,
-            obsd_Y_s,
-            dist_yaw_s,
-        ) = shares
+        (obsd_pose_s,) = shares
+
+        # Buffer in which the record is built before it's published
+        pose = obsd_pose_s.new_buffer()
+        X = Observer.X
+        Y = Observer.Y
 
         # Making A_D, B_D, and C matrices
         A_D = np.array(
@@ -99,10 +123,17 @@ class Observer:
         self.r_encoder.position = RomiProps.wdiv2 * self.IMU.get_heading()
 
         # set coordinate system
-        obsd_X_s.put(100)
-        obsd_Y_s.put(800)
+        obsd_pose_s.put_field(X, 100)
+        obsd_pose_s.put_field(Y, 800)
 
         while True:
+            # Shed this run's work after a run which went over budget; the
+            # shares keep the last estimate until the next update
+            if self._skip:
+                self._skip -= 1
+                yield 1
+                continue
+
             # Update real-time data
             ustar[0, 0] = self.l_motor_pwm_ch.pulse_width_percent() / 100 * self.battery.get_cur_volt()
             ustar[1, 0] = self.r_motor_pwm_ch.pulse_width_percent() / 100 * self.battery.get_cur_volt()
@@ -122,17 +153,19 @@ class Observer:
             X_delta = C_delta * np.cos(ustar[4, 0])
             Y_delta = C_delta * np.sin(ustar[4, 0])
 
-            # Update Shares Accordingly
-            obsd_lpos_s.put(y_k[0, 0])
-            obsd_rpos_s.put(y_k[1, 0])
-            obsd_cpos_s.put(x_k[2, 0])
-            obsd_yaw_s.put(y_k[2, 0])
-            obsd_yawrate_s.put(y_k[3, 0])
-            obsd_X_s.put(obsd_X_s.get() + X_delta)
-            obsd_Y_s.put(obsd_Y_s.get() + Y_delta)
-            dist_yaw_s.put(
+            # Update the shared state all at once. The position is added to
+            # what's in the share, since the path director may have reset it
+            pose[Observer.LPOS] = y_k[0, 0]
+            pose[Observer.RPOS] = y_k[1, 0]
+            pose[Observer.CPOS] = x_k[2, 0]
+            pose[Observer.YAW] = y_k[2, 0]
+            pose[Observer.YAWRATE] = y_k[3, 0]
+            pose[X] = obsd_pose_s.get_field(X) + X_delta
+            pose[Y] = obsd_pose_s.get_field(Y) + Y_delta
+            pose[Observer.DIST_YAW] = (
                 (self.r_encoder.position - self.l_encoder.position) * RomiProps.wheel_radius / RomiProps.trackwidth
             )
+            obsd_pose_s.put(pose)
 
             # Update x_k to be used in next iteration
             x_k = np.dot(A_D, x_k) + np.dot(B_D, ustar)
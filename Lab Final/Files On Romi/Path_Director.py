@@ -16,6 +16,8 @@ from math import pi, atan2
 from gc import collect
 from Romi_Props import RomiProps
 from Path_Director_vars import PD_vars
+from Observer import Observer
+from Telemetry import Telemetry
 
 
 ## Task-level controller that sequences Romi through predefined path states.
@@ -72,13 +74,15 @@ class PathDirector:
 
     ## Initialize the path director.
     #
-    #  Sets up closed-loop controllers, UART telemetry, bump callbacks, and
-    #  initializes path state variables.
+    #  Sets up closed-loop controllers, telemetry over the UART, bump
+    #  callbacks, and initializes path state variables.
     #
     #  @param line_sensor Calibrated line sensor instance
     #  @param IMU_obj IMU instance providing heading and calibration
     #  @param bump_sensors Tuple of bumper pins for collision detection
-    def __init__(self, line_sensor, IMU_obj, bump_sensors: tuple):
+    #  @param port Where telemetry is written, such as a @c UARTSender, or
+    #         @c None to write straight to the Bluetooth UART
+    def __init__(self, line_sensor, IMU_obj, bump_sensors: tuple, port=None):
         collect()
         from Closed_Loop_Control import ClosedLoopControl
         from Line_Sensor import LineSensor
@@ -106,10 +110,11 @@ class PathDirector:
         )
 
         self.uart = UART(5, 115200)
+        self.telemetry = Telemetry(port if port else self.uart)
         self.bumped = False
         self.bump_stop = True
         self.bump_wall = False
-        self.bumptimer = 0
+        self.bumptimer = None
 
         collect()
         from pyb import Pin, ExtInt  # pyright: ignore
@@ -129,6 +134,18 @@ class PathDirector:
         self.distance = 1000  # mm
         self.end_point = 0  # mm
 
+        # Number of upcoming runs on which the last motor command is held
+        self.hold = 0
+
+    ## Called by the scheduler after a run which went over the task's time
+    #  budget. The motor speeds last sent are held for the next run instead
+    #  of running the state machine, so the motor controllers aren't held
+    #  up again.
+    #
+    #  @param run_us How long the run took [us]
+    def degrade(self, run_us):
+        self.hold = 1
+
     ## Generator implementing the state machine for path execution.
     #
     #  Pulls data from shared variables, updates control references, and
@@ -149,20 +166,30 @@ class PathDirector:
             white_cal_s,
             black_cal_s,
             set_seg_s,
-            seg_start_s,
-            obsd_lpos_s,
-            obsd_rpos_s,
-            obsd_cpos_s,
-            obsd_yaw_s,
-            obsd_yawrate_s,
-            obsd_X_s,
-            obsd_Y_s,
-            dist_yaw_s,
+            seg_start_e,
+            obsd_pose_s,
         ) = shares
 
+        # Copy of the observed state, taken once at the start of each run so
+        # every decision in the run uses the same frame's estimate
+        pose = obsd_pose_s.new_buffer()
+        LPOS = Observer.LPOS
+        RPOS = Observer.RPOS
+        CPOS = Observer.CPOS
+        YAW = Observer.YAW
+        X = Observer.X
+        Y = Observer.Y
+        DIST_YAW = Observer.DIST_YAW
+
+        # Version of the segment share last acted on; it's read again only
+        # after something else has written it
+        seg_version = set_seg_s.version()
+
         def set_state(new_state: int):
+            nonlocal seg_version
             self.state = new_state
             set_seg_s.put(new_state)
+            seg_version = set_seg_s.version()
             self.segment_set = False
 
             # notify motors previous segment is complete
@@ -175,6 +202,13 @@ class PathDirector:
             r_flag_s.put(1)
             r_speed_s.put(PD_vars.v_ref + v_adjust)
 
+        # Reset the observed position, in the share and in this run's copy
+        def set_position(x: float, y: float):
+            obsd_pose_s.put_field(X, x)
+            obsd_pose_s.put_field(Y, y)
+            pose[X] = x
+            pose[Y] = y
+
         def forward_at_speed(speed: float):
             l_flag_s.put(1)
             l_speed_s.put(speed)
@@ -184,23 +218,32 @@ class PathDirector:
         set_state(PathDirector.CALIBRATE)
 
         while True:
+            # Hold the last command after a run over budget, but never put
+            # off reacting to the bump sensors
+            if self.hold and not self.bumped:
+                self.hold -= 1
+                yield self.state
+                continue
+
+            obsd_pose_s.snapshot_into(pose)
+
             if self.bumped:
                 if self.bump_stop:
-                    self.uart.write(f"bumped\r\n".encode("utf-8"))
+                    self.telemetry.send(Telemetry.BUMPED)
                     self.bumped = False
                     set_state(PathDirector.WAIT)
                 elif self.bump_wall:
-                    self.uart.write(f"wall\r\n".encode("utf-8"))
+                    self.telemetry.send(Telemetry.WALL)
                     set_state(PathDirector.REVERSE_FROM_WALL)
                 else:
-                    if self.bumptimer == 0:
-                        self.uart.write(f"bumped\r\n".encode("utf-8"))
+                    if self.bumptimer is None:
+                        self.telemetry.send(Telemetry.BUMPED)
                         self.bumptimer = ticks_us()
                     forward_at_speed(-100)
                     if ticks_diff(ticks_us(), self.bumptimer) >= 1000_000:
-                        self.uart.write(f"unbumped\r\n".encode("utf-8"))
+                        self.telemetry.send(Telemetry.UNBUMPED)
                         forward_at_speed(0)
-                        self.bumptimer = 0
+                        self.bumptimer = None
                         self.bumped = False
 
             if self.Line_CLC:
@@ -213,34 +256,29 @@ class PathDirector:
 
                 self.Heading_CLC.gain_update(Kp=IMU.Kp, Ki=IMU.Ki, Kd=IMU.Kd)
 
-            if set_seg_s.get() != self.state:
-                set_state(set_seg_s.get())
+            if set_seg_s.changed_since(seg_version):
+                seg_version = set_seg_s.version()
+                if set_seg_s.get() != self.state:
+                    set_state(set_seg_s.get())
 
             if self.state == PathDirector.WAIT:
                 if not self.segment_set:
                     self.segment_set = True
-                    # set seg_start_s to 2 because we have two motor controllers
-                    # that both have to acknowledge the segment start
-                    seg_start_s.put(2)
+                    # tell both motor controllers the segment has started
+                    seg_start_e.signal()
                     forward_at_speed(0)
 
                     print("Starting Waiting Segment")
                     # Waiting Segment
                     # self.uart.write(f"curr state: {self.state}\r\n".encode("utf-8"))
-                    self.uart.write(f"L: {obsd_lpos_s.get()}\r\n".encode("utf-8"))
-                    self.uart.write(f"R: {obsd_rpos_s.get()}\r\n".encode("utf-8"))
-                    self.uart.write(f"C: {obsd_cpos_s.get()}\r\n".encode("utf-8"))
-                    self.uart.write(f"H: {obsd_yaw_s.get()}\r\n".encode("utf-8"))
-                    self.uart.write(f"X: {obsd_X_s.get()}\r\n".encode("utf-8"))
-                    self.uart.write(f"Y: {obsd_Y_s.get()}\r\n".encode("utf-8"))
+                    self.telemetry.send(Telemetry.POSE, pose[LPOS], pose[RPOS], pose[CPOS], pose[YAW], pose[X], pose[Y])
 
             elif self.state == PathDirector.CALIBRATE:
                 # Calibration Segment
                 if not self.segment_set:
                     self.segment_set = True
-                    # set seg_start_s to 2 because we have two motor controllers
-                    # that both have to acknowledge the segment start
-                    seg_start_s.put(2)
+                    # tell both motor controllers the segment has started
+                    seg_start_e.signal()
                     print("Starting Calibration Segment")
 
                 if white_cal_s.get() == 1:
@@ -268,9 +306,8 @@ class PathDirector:
                 # Line Following Segment
                 if not self.segment_set:  # ran once per segment
                     self.segment_set = True
-                    # set seg_start_s to 2 because we have two motor controllers
-                    # that both have to acknowledge the segment start
-                    seg_start_s.put(2)
+                    # tell both motor controllers the segment has started
+                    seg_start_e.signal()
                     print("Starting Line Following Segment")
 
                     # Linesensor CLC centroid reference
@@ -287,24 +324,18 @@ class PathDirector:
                 # Fixed Forward Distance Segment
                 if not self.segment_set:  # ran once per segment
                     self.segment_set = True
-                    # set seg_start_s to 2 because we have two motor controllers
-                    # that both have to acknowledge the segment start
-                    seg_start_s.put(2)
+                    # tell both motor controllers the segment has started
+                    seg_start_e.signal()
                     print("Fixed Forward Distance Segment")
 
                     # self.distance = 1000  # mm
-                    self.end_point = obsd_cpos_s.get() + self.distance  # mm
+                    self.end_point = pose[CPOS] + self.distance  # mm
 
                     # motor settings
                     forward_at_speed(PD_vars.v_ref)
 
-                if obsd_cpos_s.get() >= self.end_point:
-                    self.uart.write(f"L: {obsd_lpos_s.get()}\r\n".encode("utf-8"))
-                    self.uart.write(f"R: {obsd_rpos_s.get()}\r\n".encode("utf-8"))
-                    self.uart.write(f"C: {obsd_cpos_s.get()}\r\n".encode("utf-8"))
-                    self.uart.write(f"H: {obsd_yaw_s.get()}\r\n".encode("utf-8"))
-                    self.uart.write(f"X: {obsd_X_s.get()}\r\n".encode("utf-8"))
-                    self.uart.write(f"Y: {obsd_Y_s.get()}\r\n".encode("utf-8"))
+                if pose[CPOS] >= self.end_point:
+                    self.telemetry.send(Telemetry.POSE, pose[LPOS], pose[RPOS], pose[CPOS], pose[YAW], pose[X], pose[Y])
                     set_state(PD_vars.next_state)
 
             elif self.state == PathDirector.TURN_ANGLE:
@@ -312,9 +343,8 @@ class PathDirector:
                 # var1 = angle [deg], var2 = ----, var3 = ----
                 if not self.segment_set:  # ran once per segment
                     self.segment_set = True
-                    # set seg_start_s to 2 because we have two motor controllers
-                    # that both have to acknowledge the segment start
-                    seg_start_s.put(2)
+                    # tell both motor controllers the segment has started
+                    seg_start_e.signal()
                     print("Turn Angle Segment")
 
                     PD_vars.v_ref = 0
@@ -342,17 +372,16 @@ class PathDirector:
                 # var4 = "boolean for Y tolerance": True = ignore Y tolerance
                 if not self.segment_set:  # ran once per segment
                     self.segment_set = True
-                    # set seg_start_s to 2 because we have two motor controllers
-                    # that both have to acknowledge the segment start
-                    seg_start_s.put(2)
+                    # tell both motor controllers the segment has started
+                    seg_start_e.signal()
                     print("Go 2 Point Segment")
                     # motor settings
                     forward_at_speed(PD_vars.v_ref)
 
                     self.Heading_CLC.reset()
 
-                dX = PD_vars.var_1 - obsd_X_s.get()
-                dY = PD_vars.var_2 - obsd_Y_s.get()
+                dX = PD_vars.var_1 - pose[X]
+                dY = PD_vars.var_2 - pose[Y]
                 target_angle = atan2(dY, dX)
                 diff = ((target_angle - self.IMU.heading + pi) % (2 * pi)) - pi
                 self.Heading_CLC.set_ref(self.IMU.heading + diff)
@@ -360,8 +389,8 @@ class PathDirector:
                 if (PD_vars.v_ref == 0 and abs(diff) <= 3 / 180 * pi) or (
                     (PD_vars.var_3 or abs(dX) <= 25) and (PD_vars.var_4 or abs(dY) <= 25)
                 ):
-                    self.uart.write(f"{obsd_X_s.get()},{obsd_Y_s.get()}\r\n".encode("utf-8"))
-                    self.uart.write(f"Next State: {PD_vars.next_state}\r\n".encode("utf-8"))
+                    self.telemetry.send(Telemetry.POINT, pose[X], pose[Y])
+                    self.telemetry.send(Telemetry.NEXT_STATE, PD_vars.next_state)
                     set_state(PD_vars.next_state)
                     PD_vars.v_ref = PD_vars.v_ref_DEFAULT
                 else:
@@ -371,7 +400,7 @@ class PathDirector:
                 if not self.segment_set:
                     # comms to motors
                     self.segment_set = True
-                    seg_start_s.put(2)
+                    seg_start_e.signal()
                     print("Starting Line Follow For Time Segment")
                     self.seg_start_time = ticks_us()
 
@@ -390,7 +419,7 @@ class PathDirector:
                 if not self.segment_set:
                     # comms to motors
                     self.segment_set = True
-                    seg_start_s.put(2)
+                    seg_start_e.signal()
                     print("Starting Line Follow To Point Segment")
 
                     # motor settings
@@ -398,8 +427,8 @@ class PathDirector:
 
                     self.Line_CLC.reset()
 
-                dX = PD_vars.var_1 - obsd_X_s.get()
-                dY = PD_vars.var_2 - obsd_Y_s.get()
+                dX = PD_vars.var_1 - pose[X]
+                dY = PD_vars.var_2 - pose[Y]
 
                 if (PD_vars.var_3 or abs(dX) <= 25) and (PD_vars.var_4 or abs(dY) <= 25):
                     set_state(PD_vars.next_state)
@@ -413,7 +442,7 @@ class PathDirector:
                 if not self.segment_set:
                     self.segment_set = True
                     # comms to motors
-                    seg_start_s.put(2)
+                    seg_start_e.signal()
                     print("Straight before following line segment")
 
                     # motor settings
@@ -421,7 +450,7 @@ class PathDirector:
 
                     self.distance = 50  # mm
 
-                if obsd_cpos_s.get() >= self.distance:
+                if pose[CPOS] >= self.distance:
                     set_state(PathDirector.FOLLOW_LINE_B4_FORK)
 
             elif self.state == PathDirector.FOLLOW_LINE_B4_FORK:
@@ -429,7 +458,7 @@ class PathDirector:
                 if not self.segment_set:
                     # comms to motors
                     self.segment_set = True
-                    seg_start_s.put(2)
+                    seg_start_e.signal()
                     print("Starting FOLLOW_LINE_B4_FORK Segment")
 
                     # Linesensor CLC centroid reference
@@ -439,7 +468,7 @@ class PathDirector:
                     # motor settings
                     forward_at_speed(PD_vars.v_ref)
 
-                if obsd_X_s.get() >= 725:
+                if pose[X] >= 725:
                     set_state(PathDirector.FORCE_RIGHT_FORK)
                 else:
                     update_motors_CLC(self.Line_CLC)
@@ -449,7 +478,7 @@ class PathDirector:
                 if not self.segment_set:
                     # comms to motors
                     self.segment_set = True
-                    seg_start_s.put(2)
+                    seg_start_e.signal()
                     print("Starting Force Right Fork Segment")
                     self.seg_start_time = ticks_us()
 
@@ -467,7 +496,7 @@ class PathDirector:
                 if not self.segment_set:
                     self.segment_set = True
                     # comms to motors
-                    seg_start_s.put(2)
+                    seg_start_e.signal()
                     print("Starting Line Following 2 Diamond Segment")
 
                     # Linesensor CLC centroid reference
@@ -477,10 +506,8 @@ class PathDirector:
                     # motor settings
                     forward_at_speed(PD_vars.v_ref)
 
-                if (obsd_X_s.get() >= 900 and obsd_Y_s.get() <= 600) or self.IMU.heading <= -pi / 2 + 0.1:
-                    self.uart.write(f"X_LF2D: {obsd_X_s.get()}\r\n".encode("utf-8"))
-                    self.uart.write(f"Y_LF2D: {obsd_Y_s.get()}\r\n".encode("utf-8"))
-                    self.uart.write(f"H_LF2D: {obsd_yaw_s.get()}\r\n".encode("utf-8"))
+                if (pose[X] >= 900 and pose[Y] <= 600) or self.IMU.heading <= -pi / 2 + 0.1:
+                    self.telemetry.send(Telemetry.LF2D, pose[X], pose[Y], pose[YAW])
                     set_state(PathDirector.DIAMOND_2_CP1)
                 else:
                     update_motors_CLC(self.Line_CLC)
@@ -503,8 +530,7 @@ class PathDirector:
                 PD_vars.next_state = PathDirector.GO_2_LINE_B4_CP2
 
             elif self.state == PathDirector.GO_2_LINE_B4_CP2:
-                obsd_X_s.put(950)
-                obsd_Y_s.put(425)
+                set_position(950, 425)
                 PD_vars.var_1 = 1300
                 PD_vars.var_2 = 650
                 PD_vars.var_3 = False
@@ -518,8 +544,7 @@ class PathDirector:
                 PD_vars.next_state = PathDirector.LINE_B4_CP3
 
             elif self.state == PathDirector.LINE_B4_CP3:
-                obsd_X_s.put(1400)
-                obsd_Y_s.put(800)
+                set_position(1400, 800)
                 PD_vars.var_1 = 400_000
                 set_state(PathDirector.FOLLOW_LINE_4_TIME)
                 PD_vars.next_state = PathDirector.TURN_2_LINE_B4_CP3
@@ -542,19 +567,17 @@ class PathDirector:
                 PD_vars.next_state = PathDirector.TURN_2_CP3
 
             elif self.state == PathDirector.TURN_2_CP3:
-                self.uart.write(f"T2C3 X, Y: {obsd_X_s.get()}, {obsd_Y_s.get()}\r\n".encode("utf-8"))
+                self.telemetry.send(Telemetry.T2C3, pose[X], pose[Y])
                 self.IMU.set_heading(-pi / 2)
                 PD_vars.var_1 = -180
                 set_state(PathDirector.TURN_ANGLE)
                 PD_vars.next_state = PathDirector.GO_2_LINE_B4_CP4
 
             elif self.state == PathDirector.GO_2_LINE_B4_CP4:
-                self.uart.write(f"X, Y: {obsd_X_s.get()}, {obsd_Y_s.get()}\r\n".encode("utf-8"))
-                self.uart.write(f"dist yaw: {dist_yaw_s.get()}\r\n".encode("utf-8"))
+                self.telemetry.send(Telemetry.POSITION_YAW, pose[X], pose[Y], pose[DIST_YAW])
 
-                obsd_X_s.put(1600)
-                obsd_Y_s.put(100)
-                self.IMU.set_heading(dist_yaw_s.get())
+                set_position(1600, 100)
+                self.IMU.set_heading(pose[DIST_YAW])
                 PD_vars.var_1 = 1100
                 PD_vars.var_2 = 100
                 PD_vars.var_3 = False
@@ -572,14 +595,13 @@ class PathDirector:
                 PD_vars.next_state = PathDirector.TURN_4_GARAGE
 
             elif self.state == PathDirector.TURN_4_GARAGE:
-                obsd_X_s.put(800)
-                obsd_Y_s.put(150)
+                set_position(800, 150)
                 PD_vars.var_1 = -180
                 set_state(PathDirector.TURN_ANGLE)
                 PD_vars.next_state = PathDirector.MOVE_IN_GARAGE
 
             elif self.state == PathDirector.MOVE_IN_GARAGE:
-                self.uart.write(f"dist, head: {dist_yaw_s.get()}, {self.IMU.heading}\r\n".encode("utf-8"))
+                self.telemetry.send(Telemetry.DIST_HEAD, pose[DIST_YAW], self.IMU.heading)
                 self.IMU.set_heading(-pi)
                 PD_vars.var_1 = 160
                 PD_vars.var_2 = 150
@@ -589,16 +611,15 @@ class PathDirector:
                 PD_vars.next_state = PathDirector.TURN_2_GARAGE_EXIT
 
             elif self.state == PathDirector.TURN_2_GARAGE_EXIT:
-                self.uart.write(f"dist, head: {dist_yaw_s.get()}, {self.IMU.heading}\r\n".encode("utf-8"))
+                self.telemetry.send(Telemetry.DIST_HEAD, pose[DIST_YAW], self.IMU.heading)
                 PD_vars.var_1 = -260
                 set_state(PathDirector.TURN_ANGLE)
                 PD_vars.next_state = PathDirector.GO_2_GARAGE_EXIT
 
             elif self.state == PathDirector.GO_2_GARAGE_EXIT:
                 self.bump_wall = True
-                self.uart.write(f"dist, head: {dist_yaw_s.get()}, {self.IMU.heading}\r\n".encode("utf-8"))
-                obsd_X_s.put(175)
-                obsd_Y_s.put(175)
+                self.telemetry.send(Telemetry.DIST_HEAD, pose[DIST_YAW], self.IMU.heading)
+                set_position(175, 175)
                 self.IMU.set_heading(-3 * pi / 2)
                 PD_vars.var_1 = 100
                 PD_vars.var_2 = 400
@@ -617,25 +638,23 @@ class PathDirector:
             elif self.state == PathDirector.REVERSE_FROM_WALL:
                 if not self.segment_set:  # ran once per segment
                     self.segment_set = True
-                    # set seg_start_s to 2 because we have two motor controllers
-                    # that both have to acknowledge the segment start
-                    seg_start_s.put(2)
+                    # tell both motor controllers the segment has started
+                    seg_start_e.signal()
                     print("Fixed Reverse Distance Segment")
 
                     self.bump_wall = False
                     self.bumped = False
                     self.IMU.set_heading(-3 * pi / 2)
-                    obsd_X_s.put(100)
-                    obsd_Y_s.put(675)
+                    set_position(100, 675)
 
                     self.distance = -100  # mm
-                    self.end_point = obsd_cpos_s.get() + self.distance  # mm
+                    self.end_point = pose[CPOS] + self.distance  # mm
 
                     # motor settings
                     forward_at_speed(-200)
 
-                if obsd_cpos_s.get() <= self.end_point:
-                    self.uart.write(f"reversed\r\n".encode("utf-8"))
+                if pose[CPOS] <= self.end_point:
+                    self.telemetry.send(Telemetry.REVERSED)
                     set_state(PathDirector.TURN_2_CUP2)
 
             elif self.state == PathDirector.TURN_2_CUP2:
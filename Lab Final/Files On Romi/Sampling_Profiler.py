@@ -0,0 +1,155 @@
+## @file Sampling_Profiler.py
+#  Statistical profiler which samples, from a timer interrupt, which task is
+#  running and which state that task is in.
+#
+#  The profile built from the samples shows where the processor's time goes
+#  in finer detail than the per-task averages kept by @c cotask: a state
+#  which takes most of a task's time stands out even if the task's average
+#  run time looks reasonable. Samples are kept in a ring buffer allocated
+#  when the profiler is created, so the interrupt never allocates memory.
+#  The host tool @c Sample_Profile.py turns a dump into a flat profile.
+#
+#  On the robot, a profiler is made in @c main.py when @c SAMPLE_PROFILE is
+#  set, and the user input task's @c m command starts, stops and dumps it,
+#  with the dump handed to the UART sender a few samples at a time by
+#  @c pieces().
+#
+#  @author Antonio Ventimiglia
+#  @author Caiden Bonney
+#  @date   2025-Dec-12
+#  @copyright GPLv3
+
+import struct
+from array import array
+from pyb import Timer  # pyright: ignore
+
+import cotask
+
+## Task number recorded when no task is running, so the scheduler itself,
+#  the garbage collector or idle time was interrupted.
+IDLE_ID = 255
+
+## Format of the header written by @c SamplingProfiler.dump(): the marker
+#  @c b"CSMP", the ring capacity, the number of samples which follow, the
+#  total number taken, the sampling frequency in hertz and the number of
+#  tasks. Each task name follows as a length byte and the name. Then come
+#  the task numbers as bytes and the states as little-endian 16-bit numbers,
+#  oldest first.
+SAMPLE_HEADER = "<4sHHIHB"
+
+
+## A profiler which samples the running task and state from a timer.
+class SamplingProfiler:
+    ## Create a profiler for the tasks in a task list.
+    #
+    #  The tasks must all have been appended to the list before the
+    #  profiler is created.
+    #
+    #  @param task_list The @c cotask.TaskList whose tasks are sampled
+    #  @param length The number of samples to keep
+    #  @param freq Sampling frequency [Hz]; best not a multiple of the task
+    #         rates, so that samples don't lock onto the same instants
+    #  @param timer Number of a hardware timer not used for anything else
+    def __init__(self, task_list, length: int = 4096, freq: int = 997, timer: int = 7):
+        ## Task names, indexed by task number.
+        self.names = []
+        self._ids = {}
+        for pri in task_list.pri_list:
+            for task in pri[2:]:
+                self._ids[task] = len(self.names)
+                self.names.append(task.name)
+
+        ## The number of samples the profiler holds.
+        self.length = int(length)
+        self._tasks = array("B", [0] * self.length)
+        self._states = array("H", [0] * self.length)
+        self._head = 0
+
+        ## The number of samples taken, including overwritten ones.
+        self.count = 0
+
+        ## Sampling frequency [Hz].
+        self.freq = freq
+        self._timer_num = timer
+        self._timer = None
+
+    ## Start sampling.
+    def start(self):
+        self._timer = Timer(self._timer_num, freq=self.freq, callback=self._sample)
+
+    ## Stop sampling.
+    def stop(self):
+        if self._timer:
+            self._timer.deinit()
+            self._timer = None
+
+    ## Check whether the profiler is sampling.
+    #  @return @c True between @c start() and @c stop()
+    def running(self) -> bool:
+        return self._timer is not None
+
+    ## Empty the buffer of samples.
+    def clear(self):
+        self._head = 0
+        self.count = 0
+
+    ## Take one sample. This is the timer callback, so it must not allocate.
+    #  @param timer The timer which fired
+    def _sample(self, timer):
+        task = cotask.Task.running
+        idx = self._head
+        if task is None:
+            self._tasks[idx] = IDLE_ID
+            self._states[idx] = 0
+        else:
+            self._tasks[idx] = self._ids.get(task, IDLE_ID)
+            # The state the task last yielded is the one it's running in
+            state = task._prev_state
+            self._states[idx] = state if state else 0
+        idx += 1
+        self._head = idx if idx < self.length else 0
+        self.count += 1
+
+    ## Write the samples to a stream in the compact binary form described at
+    #  @c SAMPLE_HEADER, straight from the ring buffers.
+    #  @param stream Something with a @c write() method, such as a UART
+    def dump(self, stream):
+        kept = min(self.count, self.length)
+        stream.write(struct.pack(SAMPLE_HEADER, b"CSMP", self.length, kept, self.count, self.freq, len(self.names)))
+        for name in self.names:
+            name = name.encode()
+            stream.write(bytes((len(name),)))
+            stream.write(name)
+        head = self._head if kept == self.length else 0
+        for buf in (self._tasks, self._states):
+            buf = memoryview(buf)
+            stream.write(buf[head:kept])
+            stream.write(buf[:head])
+
+    ## Generator of the dump @c dump() writes, in pieces small enough to be
+    #  sent a few at a time, for @c UARTSender.write_stream(). Sampling
+    #  should be stopped first, so the ring doesn't move under the dump.
+    #
+    #  @param size Most bytes in a piece
+    #  @return Generator of pairs of a buffer and its length in bytes
+    def pieces(self, size: int):
+        kept = min(self.count, self.length)
+        header = struct.pack(SAMPLE_HEADER, b"CSMP", self.length, kept, self.count, self.freq, len(self.names))
+        yield header, len(header)
+        for name in self.names:
+            name = bytes((len(name),)) + name.encode()
+            yield name, len(name)
+        head = self._head if kept == self.length else 0
+        for buf, itemsize in ((self._tasks, 1), (self._states, 2)):
+            view = memoryview(buf)
+            step = max(1, size // itemsize)
+            for first, last in ((head, kept), (0, head)):
+                for start in range(first, last, step):
+                    end = min(start + step, last)
+                    yield view[start:end], itemsize * (end - start)
+
+    ## Puts the number of samples taken and kept into a string.
+    def __repr__(self):
+        return "Sampling profiler: {:d} samples at {:d} Hz, {:d} kept of {:d}{:s}".format(
+            self.count, self.freq, min(self.count, self.length), self.length, ", sampling" if self.running() else ""
+        )
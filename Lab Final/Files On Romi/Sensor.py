@@ -9,6 +9,7 @@
 
 from time import ticks_diff, ticks_us  # pyright: ignore
 from pyb import UART  # pyright: ignore
+from Telemetry import Telemetry
 
 uart = UART(5, 115200)
 
@@ -18,6 +19,10 @@ uart = UART(5, 115200)
 #  Subclasses must implement @c get_data(). Timing helpers keep track of
 #  delta-t between measurements for control algorithms.
 class Sensor:
+    ## Where gain changes are reported; @c main.py may replace it with one
+    #  which sends through the background UART sender.
+    telemetry = Telemetry(uart)
+
     ## Set a class-level gain attribute.
     #
     #  Used to tune controller gains stored on sensor classes.
@@ -30,7 +35,7 @@ class Sensor:
             raise AttributeError(f"'{K}' is not a defined gain on {cls.__name__}")
         setattr(cls, K, value)
         print(K, value)
-        uart.write(f"{K}{value}\r\n".encode("utf-8"))
+        cls.telemetry.send(Telemetry.GAIN, K, value)
 
     ## Initialize timing variables for dt computation.
     def __init__(self) -> None:
@@ -0,0 +1,130 @@
+## @file Status_Reporter.py
+#  Low-priority task which sends snapshots of the task profiles, heap use
+#  and share values over Bluetooth while the scheduler keeps running.
+#
+#  A snapshot is asked for with @c request(), normally by the user input
+#  task. The snapshot is taken all at once, so every number in it comes from
+#  the same instant, and only when the slack before the next task deadline
+#  is long enough to format it. The text is then written in pieces which
+#  end at the end of a line wherever they can. Given a @c UARTSender, each
+#  piece is queued as a message of its own once there's room for it in the
+#  sender's ring besides some left free for the other tasks, so the
+#  snapshot's lines go out whole between the other tasks' messages, never
+#  split one, and never crowd one out. Given a UART, which waits while the
+#  bytes go out, a piece is written only if it will have gone out before
+#  the next task deadline, and sending never holds up the control tasks.
+#
+#  @author Antonio Ventimiglia
+#  @author Caiden Bonney
+#  @date   2025-Dec-12
+#  @copyright GPLv3
+
+import gc
+import utime
+import task_share
+
+
+## Task which takes snapshots of the system's status and sends them in
+#  chunks.
+class StatusReporter:
+    ## Create a status reporter.
+    #
+    #  @param task_list The @c cotask.TaskList whose profiles are reported
+    #  @param port Where snapshots are written: a @c UARTSender, or a UART
+    #  @param baudrate The UART's baud rate, used to work out how long a
+    #         piece takes to send straight to a UART
+    #  @param chunk Most bytes written at once
+    #  @param snapshot_us Slack [us] before the next task deadline needed to
+    #         take a snapshot
+    #  @param priority The priority of the reporter's task; only the
+    #         deadlines of tasks above it count, as those of its own priority
+    #         or below can wait
+    #  @param headroom Bytes of a @c UARTSender's ring kept free for the
+    #         other tasks' messages
+    def __init__(
+        self, task_list, port, baudrate: int = 115200, chunk: int = 128, snapshot_us: int = 8000, priority: int = 0, headroom: int = 384
+    ):
+        self.task_list = task_list
+        self.priority = priority
+        self.port = port
+        self.chunk = chunk
+        self.headroom = headroom
+        self.snapshot_us = snapshot_us
+
+        ## Slack [us] before the next task deadline needed to send a piece
+        #  straight to a UART; each byte takes 10 bit times, and half a
+        #  millisecond is kept in hand.
+        self.chunk_us = chunk * 10_000_000 // baudrate + 500
+
+        # Whether a snapshot has been asked for, and whether the profiles
+        # are to be reset when it's taken
+        self._wanted = False
+        self._reset = False
+
+        # The snapshot being sent and how much of it has gone out
+        self._out = b""
+        self._pos = 0
+
+    ## Ask for a snapshot to be taken and sent.
+    #
+    #  @param reset If @c True, the task profiles and garbage collection
+    #         statistics are reset as the snapshot is taken, so the next
+    #         snapshot covers only what happens in between
+    def request(self, reset: bool = False):
+        self._wanted = True
+        self._reset = self._reset or reset
+
+    ## Check whether a snapshot is being sent.
+    #
+    #  @return @c True until the whole of the last snapshot has been written
+    def busy(self) -> bool:
+        return self._pos < len(self._out)
+
+    ## Take a snapshot of the task profiles, heap use and share values, and
+    #  reset the profiles if asked to. Nothing else runs in between, so the
+    #  reset loses nothing which isn't in the snapshot.
+    #
+    #  @param reset If @c True, reset the profiles after reading them
+    #  @return The snapshot as text
+    def snapshot(self, reset: bool = False) -> str:
+        text = f"\nSNAPSHOT AT {utime.ticks_ms()} ms" + (" (RESET)" if reset else "") + "\n"
+        text += str(self.task_list) + "\n"
+        text += task_share.show_all(values=True) + "\n"
+        text += f"HEAP: {gc.mem_free()} bytes free, {gc.mem_alloc()} bytes allocated\n"
+        if reset:
+            self.task_list.reset_profile()
+            if self.task_list.gc_policy:
+                self.task_list.gc_policy.reset_stats()
+        return text.replace("\n", "\r\n")
+
+    ## Generator which takes requested snapshots and sends them.
+    #
+    #  Yields 0 while idle and 1 while a snapshot is being sent.
+    def run(self):
+        while True:
+            if self._wanted and not self.busy():
+                slack = self.task_list.slack(self.priority)
+                if slack is None or slack > self.snapshot_us:
+                    self._out = self.snapshot(self._reset).encode()
+                    self._pos = 0
+                    self._wanted = False
+                    self._reset = False
+
+            # Queue as many pieces as there's room for in a sender's ring,
+            # or write as many as fit before the next deadline to a UART
+            while self.busy():
+                end = self._out.rfind(b"\n", self._pos, self._pos + self.chunk) + 1
+                if end <= self._pos:
+                    end = self._pos + self.chunk
+                end = min(end, len(self._out))
+                if hasattr(self.port, "room"):
+                    if self.port.room() - self.headroom < end - self._pos:
+                        break
+                else:
+                    slack = self.task_list.slack(self.priority)
+                    if slack is not None and slack < self.chunk_us:
+                        break
+                self.port.write(memoryview(self._out)[self._pos : end])
+                self._pos = end
+
+            yield 1 if self.busy() else 0
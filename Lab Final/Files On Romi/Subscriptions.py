@@ -0,0 +1,187 @@
+## @file Subscriptions.py
+#  Low-priority task which sends the values of the shares the host has
+#  subscribed to, each at the rate asked for, so only the data being
+#  debugged takes up the Bluetooth link.
+#
+#  Shares are added to a table of channels by name when the tasks are
+#  created, such as @c l_speed_s, or @c obsd_X_s for the @c X field of the
+#  observed state. The host subscribes to a channel with the user input
+#  task's @c t command, giving its name and a rate [Hz], which is turned
+#  into a number of frames between samples; a rate of 0 unsubscribes. Each
+#  run, the task reads only the channels which are due and sends them all
+#  as one @c Telemetry.SAMPLES record, so a frame's header and CRC are
+#  shared between them. The channels' values are kept in an array allocated
+#  once, and nothing is allocated while sending binary records.
+#
+#  Before a subscription is taken, the bytes a second every subscription
+#  would send are worked out, and the subscription is refused if they would
+#  go over the budget, which is set well below what the UART sender can
+#  carry so there's room left for replies and the path director's
+#  telemetry. Each subscription taken is confirmed with a
+#  @c Telemetry.SUBSCRIBED record giving the channel's number, by which
+#  binary records name it.
+#
+#  @author Antonio Ventimiglia
+#  @author Caiden Bonney
+#  @date   2025-Dec-12
+#  @copyright GPLv3
+
+import utime
+import micropython
+from array import array
+from Telemetry import Telemetry
+
+# Bytes a binary SAMPLES record takes besides its values: the kind and
+# sequence number, the header, the CRC, and COBS's code byte and zero bytes
+_FRAME_BYTES = 2 + 6 + 2 + 3
+
+# Bytes a text line takes besides its values, and for each value besides
+# its name, allowing for the longest float MicroPython prints
+_LINE_BYTES = len("Sample 4294967295:\r\n")
+_TEXT_VALUE_BYTES = len(" =-1.234567e+38")
+
+
+## Task which samples the subscribed shares at their rates and sends them.
+class Subscriptions:
+    ## Create an empty table of channels, with nothing subscribed.
+    #
+    #  @param telemetry The @c Telemetry through which records are sent
+    #  @param period The task's period [ms], the shortest time between
+    #         samples of a channel
+    #  @param budget Bytes a second all subscriptions together may send
+    def __init__(self, telemetry, period: int = 20, budget: int = 500):
+        self.telemetry = telemetry
+        self.period = period
+        self.budget = budget
+
+        # The name of each channel, the share it's read from and the field
+        # of a StructShare, or -1 for a Share
+        self._names = []
+        self._shares = []
+        self._fields = []
+
+        # For each channel, the frames between samples, or 0 if it isn't
+        # subscribed, and the frames until it's next due
+        self._every = array("H", [0] * Telemetry.MAX_SAMPLES)
+        self._countdown = array("H", [0] * Telemetry.MAX_SAMPLES)
+        self._values = array("f", [0] * Telemetry.MAX_SAMPLES)
+
+        ## Records sent.
+        self.records = 0
+
+    ## Add a share, or one field of a @c StructShare, to the table of
+    #  channels. Call this before the scheduler starts.
+    #
+    #  @param name The name the host subscribes to, such as @c l_speed_s
+    #  @param share The @c task_share.Share or @c task_share.StructShare
+    #  @param field The name of the field of a @c StructShare, or @c None
+    def add(self, name: str, share, field=None):
+        if len(self._names) >= Telemetry.MAX_SAMPLES:
+            raise ValueError("No room for channel " + name)
+        if len(name) > 16:
+            raise ValueError("Channel name too long: " + name)
+        self._names.append(name)
+        self._shares.append(share)
+        self._fields.append(-1 if field is None else share.index(field))
+
+    ## Add each field of a @c StructShare as a channel, named by putting the
+    #  field's name into a pattern.
+    #
+    #  @param pattern The channel names, such as @c "obsd_{}_s"
+    #  @param share The @c task_share.StructShare
+    def add_fields(self, pattern: str, share):
+        for field in share.fields:
+            self.add(pattern.format(field), share, field)
+
+    ## The bytes a second the subscriptions would send.
+    #
+    #  Every record sent holds at least one value, so there are never more
+    #  records a second than values, nor more than one in each run.
+    #
+    #  @param every For each channel, the frames between samples, or 0 if
+    #         it isn't subscribed; the current subscriptions if @c None
+    #  @return The bytes a second
+    def bandwidth(self, every=None) -> int:
+        every = self._every if every is None else every
+        binary = self.telemetry.binary
+        records = 0.0
+        total = 0.0
+        for idx in range(len(self._names)):
+            if every[idx]:
+                rate = 1000 / (self.period * every[idx])
+                records += rate
+                total += rate * (4 if binary else len(self._names[idx]) + _TEXT_VALUE_BYTES)
+        records = min(records, 1000 / self.period)
+        return int(total + records * (_FRAME_BYTES if binary else _LINE_BYTES) + 0.5)
+
+    ## Subscribe to a channel, change its rate, or unsubscribe from it.
+    #
+    #  @param name The channel's name
+    #  @param rate Samples a second [Hz], or 0 to unsubscribe; the rate is
+    #         rounded to a whole number of the task's periods
+    #  @return The bytes a second all the subscriptions now send
+    #  @throws ValueError if there's no such channel, or the subscription
+    #          would go over the budget
+    def subscribe(self, name: str, rate: float) -> int:
+        if name not in self._names:
+            raise ValueError("No channel " + name)
+        idx = self._names.index(name)
+        every = 0 if rate <= 0 else max(1, min(0xFFFF, round(1000 / (self.period * rate))))
+
+        wanted = array("H", self._every)
+        wanted[idx] = every
+        needed = self.bandwidth(wanted)
+        if needed > self.budget:
+            raise ValueError("{} at {} Hz needs {} B/s, budget {} B/s".format(name, rate, needed, self.budget))
+
+        self._every[idx] = every
+        self._countdown[idx] = 0
+        self.telemetry.send(Telemetry.SUBSCRIBED, idx, name, every)
+        return needed
+
+    ## Unsubscribe from every channel.
+    def clear(self):
+        for idx in range(len(self._names)):
+            if self._every[idx]:
+                self._every[idx] = 0
+                self.telemetry.send(Telemetry.SUBSCRIBED, idx, self._names[idx], 0)
+
+    # Read the channels which are due into the values, and return the mask
+    # of those read
+    @micropython.native
+    def _sample(self) -> int:
+        every = self._every
+        countdown = self._countdown
+        values = self._values
+        mask = 0
+        for idx in range(len(self._names)):
+            if every[idx] == 0:
+                continue
+            if countdown[idx] == 0:
+                field = self._fields[idx]
+                values[idx] = self._shares[idx].get() if field < 0 else self._shares[idx].get_field(field)
+                mask |= 1 << idx
+                countdown[idx] = every[idx] - 1
+            else:
+                countdown[idx] -= 1
+        return mask
+
+    ## Generator which sends the channels due in each run.
+    #
+    #  Yields 1 in runs which send a record and 0 in the others.
+    def run(self):
+        while True:
+            mask = self._sample()
+            if mask:
+                self.telemetry.send_samples(utime.ticks_ms(), mask, self._values, self._names)
+                self.records += 1
+            yield 1 if mask else 0
+
+    ## Puts the table of channels, with the rate of each subscription and
+    #  the bandwidth used, into a string.
+    def __repr__(self):
+        text = "CHANNEL              HZ\n"
+        for idx in range(len(self._names)):
+            every = self._every[idx]
+            text += "{:2d} {:16s} {:6.1f}\n".format(idx, self._names[idx], 1000 / (self.period * every) if every else 0.0)
+        return text + "Subscriptions: {:d} of {:d} B/s, {:d} records sent".format(self.bandwidth(), self.budget, self.records)
@@ -0,0 +1,265 @@
+## @file Telemetry.py
+#  Sends telemetry records, such as the pose at the end of a segment, as
+#  text lines or as compact binary frames.
+#
+#  Each kind of record has a number, a @c struct format for its values and a
+#  text template. In text mode a record is written as the same lines the
+#  tasks used to write with f-strings, so the Bluetooth console reads as
+#  before. In binary mode the values are packed with @c struct.pack_into()
+#  into a buffer allocated once, after a byte for the kind of record and a
+#  sequence number, and followed by a CRC-16; the frame is then COBS encoded
+#  so it holds no zero bytes, and written between two zero bytes. Text lines
+#  never hold a zero byte, so text and frames can share one stream and a
+#  reader can always tell them apart: whatever lies between two zero bytes
+#  is either a whole frame or text. No float is ever formatted as text, and
+#  the frames are a fraction of the length of the lines.
+#
+#  A @c Telemetry object writes to anything with a @c write() method, so the
+#  same stream goes over UART 5 (Bluetooth), USB, or a @c UARTSender which
+#  sends it in the background; a port which also has a @c write_urgent()
+#  method, as a @c UARTSender has, is given the bump and wall messages
+#  through that:
+#  @code
+#  telemetry = Telemetry (UART (5, 115200))
+#  telemetry = Telemetry (pyb.USB_VCP ())
+#  telemetry.send (Telemetry.DIST_HEAD, dist_yaw, heading)
+#  @endcode
+#
+#  Besides the records in the table, a @c SAMPLES record carries the values
+#  of whichever share channels the host has subscribed to, sent by
+#  @c Subscriptions.py: the time, a mask of the channels present, and one
+#  float for each, so its length varies with the subscriptions.
+#
+#  Frames are decoded on a PC with @c Host Tools/Telemetry_Decode.py, which
+#  uses the record table here.
+#
+#  @author Antonio Ventimiglia
+#  @author Caiden Bonney
+#  @date   2025-Dec-12
+#  @copyright GPLv3
+
+import struct
+import micropython
+from array import array
+
+## Whether new @c Telemetry objects send binary frames rather than text
+#  unless told otherwise when they're created. Set this to @c True before
+#  the tasks are created to switch the whole robot to binary telemetry.
+BINARY = False
+
+
+# Table for the CRC-16/CCITT-FALSE checksum (polynomial 0x1021), one entry
+# for each value of a byte
+def _crc_table():
+    table = array("H", range(256))
+    for byte in range(256):
+        crc = byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else (crc << 1)
+        table[byte] = crc & 0xFFFF
+    return table
+
+
+_CRC_TABLE = _crc_table()
+
+
+## Work out the CRC-16/CCITT-FALSE checksum of the start of a buffer.
+#
+#  @param buf The buffer
+#  @param length The number of bytes at the start of the buffer to check
+#  @return The 16 bit checksum
+@micropython.native
+def crc16(buf, length: int) -> int:
+    crc = 0xFFFF
+    table = _CRC_TABLE
+    for idx in range(length):
+        crc = ((crc << 8) & 0xFF00) ^ table[(crc >> 8) ^ buf[idx]]
+    return crc
+
+
+## COBS encode the start of a buffer into another, between two zero bytes.
+#
+#  @param src The buffer holding the bytes to encode
+#  @param length The number of bytes at the start of @c src to encode
+#  @param out The buffer the frame is written into, which must be at least
+#         @c length @c + @c length//254 @c + @c 3 bytes long
+#  @return The number of bytes written to @c out
+@micropython.native
+def cobs_encode(src, length: int, out) -> int:
+    out[0] = 0
+    code_idx = 1
+    code = 1
+    pos = 2
+    for idx in range(length):
+        byte = src[idx]
+        if byte == 0:
+            out[code_idx] = code
+            code_idx = pos
+            pos += 1
+            code = 1
+        else:
+            out[pos] = byte
+            pos += 1
+            code += 1
+            if code == 0xFF:
+                out[code_idx] = code
+                code_idx = pos
+                pos += 1
+                code = 1
+    out[code_idx] = code
+    out[pos] = 0
+    return pos + 1
+
+
+## Sends telemetry records over a UART or USB, as text or binary frames.
+class Telemetry:
+
+    # Kinds of record; those up to REVERSED are safety messages, sent ahead
+    # of the others where the port allows
+    BUMPED = 1
+    WALL = 2
+    UNBUMPED = 3
+    REVERSED = 4
+    POSE = 5
+    POINT = 6
+    NEXT_STATE = 7
+    LF2D = 8
+    T2C3 = 9
+    POSITION_YAW = 10
+    DIST_HEAD = 11
+    GAIN = 12
+    SUBSCRIBED = 13
+    SAMPLES = 14
+
+    ## For each kind of record, its name, the @c struct format of its
+    #  values, and the text template they fill in text mode. Gain and
+    #  channel names take 16 bytes, room for the longest of them, such as
+    #  @c turn_correctionl; @c struct would cut a longer name short.
+    RECORDS = {
+        BUMPED: ("bumped", "<", "bumped\r\n"),
+        WALL: ("wall", "<", "wall\r\n"),
+        UNBUMPED: ("unbumped", "<", "unbumped\r\n"),
+        REVERSED: ("reversed", "<", "reversed\r\n"),
+        POSE: ("pose", "<6f", "L: {}\r\nR: {}\r\nC: {}\r\nH: {}\r\nX: {}\r\nY: {}\r\n"),
+        POINT: ("point", "<2f", "{},{}\r\n"),
+        NEXT_STATE: ("next_state", "<H", "Next State: {}\r\n"),
+        LF2D: ("lf2d", "<3f", "X_LF2D: {}\r\nY_LF2D: {}\r\nH_LF2D: {}\r\n"),
+        T2C3: ("t2c3", "<2f", "T2C3 X, Y: {}, {}\r\n"),
+        POSITION_YAW: ("position_yaw", "<3f", "X, Y: {}, {}\r\ndist yaw: {}\r\n"),
+        DIST_HEAD: ("dist_head", "<2f", "dist, head: {}, {}\r\n"),
+        GAIN: ("gain", "<16sf", "{}{}\r\n"),
+        SUBSCRIBED: ("subscribed", "<B16sH", "Subscribed {}: {} every {} frames\r\n"),
+    }
+
+    ## Most channels a @c SAMPLES record can hold.
+    MAX_SAMPLES = 16
+
+    ## Format of the start of a @c SAMPLES record: the time [ms] and a mask
+    #  with a bit set for each channel present, lowest channel first. A
+    #  float for each channel present follows.
+    SAMPLES_HEADER = "<IH"
+
+    ## Bytes in the largest record's values.
+    MAX_PAYLOAD = 6 + 4 * MAX_SAMPLES
+
+    ## Create a telemetry sender.
+    #
+    #  @param port Anything with a @c write() method, such as a @c pyb.UART,
+    #         a @c pyb.USB_VCP or a @c UARTSender
+    #  @param binary @c True to send binary frames, @c False to send text, or
+    #         @c None to follow @c Telemetry.BINARY
+    def __init__(self, port, binary=None):
+        self.port = port
+        self.binary = BINARY if binary is None else binary
+
+        # The frame before and after encoding: kind, sequence number,
+        # values and checksum, then the same COBS encoded between zeros
+        self._raw = bytearray(2 + Telemetry.MAX_PAYLOAD + 2)
+        self._out = bytearray(len(self._raw) + len(self._raw) // 254 + 3)
+        self._out_view = memoryview(self._out)
+        self._seq = 0
+
+        # Sizes of the values of each kind of record, worked out once
+        self._sizes = {kind: struct.calcsize(fmt) for kind, (_, fmt, _) in Telemetry.RECORDS.items()}
+
+        ## Number of records sent.
+        self.records = 0
+        ## Number of bytes written.
+        self.bytes = 0
+
+    ## Send a record.
+    #
+    #  @param kind The kind of record, such as @c Telemetry.POSE
+    #  @param values The record's values, in the order of its format
+    @micropython.native
+    def send(self, kind: int, *values):
+        _, fmt, text = Telemetry.RECORDS[kind]
+        urgent = kind <= Telemetry.REVERSED and hasattr(self.port, "write_urgent")
+        if not self.binary:
+            data = text.format(*values).encode("utf-8")
+            if urgent:
+                self.port.write_urgent(data)
+            else:
+                self.port.write(data)
+            self.records += 1
+            self.bytes += len(data)
+            return
+
+        # Text values, such as gain and channel names, are sent as bytes
+        if kind == Telemetry.GAIN:
+            values = (values[0].encode("utf-8"), values[1])
+        elif kind == Telemetry.SUBSCRIBED:
+            values = (values[0], values[1].encode("utf-8"), values[2])
+
+        struct.pack_into(fmt, self._raw, 2, *values)
+        self._send_frame(kind, self._sizes[kind], urgent)
+
+    ## Send the values of the subscribed channels as a @c SAMPLES record. In
+    #  text mode it's one line of @c name=value pairs.
+    #
+    #  @param time_ms The time the values were read [ms]
+    #  @param mask A bit set for each channel present, lowest channel first
+    #  @param values Array holding a value for every channel, of which only
+    #         those present are sent
+    #  @param names The names of every channel
+    @micropython.native
+    def send_samples(self, time_ms: int, mask: int, values, names):
+        if not self.binary:
+            line = "Sample {}:".format(time_ms)
+            for idx in range(len(names)):
+                if mask & (1 << idx):
+                    line += " {}={}".format(names[idx], values[idx])
+            data = (line + "\r\n").encode("utf-8")
+            self.port.write(data)
+            self.records += 1
+            self.bytes += len(data)
+            return
+
+        raw = self._raw
+        struct.pack_into(Telemetry.SAMPLES_HEADER, raw, 2, time_ms, mask)
+        pos = 8
+        for idx in range(len(names)):
+            if mask & (1 << idx):
+                struct.pack_into("<f", raw, pos, values[idx])
+                pos += 4
+        self._send_frame(Telemetry.SAMPLES, pos - 2, False)
+
+    # Finish the frame whose values have been packed into the raw buffer,
+    # and write it
+    @micropython.native
+    def _send_frame(self, kind: int, size: int, urgent: bool):
+        raw = self._raw
+        raw[0] = kind
+        raw[1] = self._seq
+        self._seq = (self._seq + 1) & 0xFF
+        length = 2 + size
+        crc = crc16(raw, length)
+        raw[length] = crc & 0xFF
+        raw[length + 1] = crc >> 8
+        count = cobs_encode(raw, length + 2, self._out)
+        if urgent:
+            self.port.write_urgent(self._out_view[:count])
+        else:
+            self.port.write(self._out_view[:count])
+        self.records += 1
+        self.bytes += count
@@ -0,0 +1,212 @@
+## @file UART_Sender.py
+#  Low-priority task which sends what the other tasks write to the UART, a
+#  little at a time, so no task waits while bytes go out.
+#
+#  At 115200 baud each byte takes 87 us to send, and @c UART.write() returns
+#  only once all but the last byte have gone, so six lines of text written
+#  by the path director at the end of a segment held it up for milliseconds
+#  while the motor controllers waited. Instead, tasks write to a
+#  @c UARTSender, which copies the bytes into a ring buffer allocated once
+#  and returns at once. The sender's task then writes a few bytes to the
+#  UART each time it runs: only as many as go out in the time it's allowed,
+#  and never more than fit before the next task deadline.
+#
+#  Each message is kept whole: one which doesn't fit in the ring is dropped,
+#  and counted, rather than cut short, so a text line or telemetry frame is
+#  never sent in part. Safety messages, such as the bump warnings, are
+#  written with @c write_urgent() to a second, smaller ring which is always
+#  sent first, as soon as the message being sent is finished.
+#
+#  The bytes sent in a run are copied from the ring into a staging buffer,
+#  allocated with a view of each length it can be written in, so sending
+#  allocates nothing.
+#
+#  A long binary transfer, such as a data logger dump, is given to
+#  @c write_stream() as an iterator of buffers instead of being copied into
+#  the ring. Once the message being sent is finished, the buffers are
+#  written straight from where they are, a run's worth at a time, with
+#  nothing else sent between them, so the transfer arrives unbroken while
+#  the other messages wait in the rings.
+#
+#  @author Antonio Ventimiglia
+#  @author Caiden Bonney
+#  @date   2025-Dec-12
+#  @copyright GPLv3
+
+import micropython
+import task_share
+
+
+## Task which sends buffered messages to a UART without blocking.
+class UARTSender:
+    ## Create a sender.
+    #
+    #  @param uart UART to which messages are sent
+    #  @param size Bytes in the ring for ordinary messages
+    #  @param urgent_size Bytes in the ring for urgent messages
+    #  @param baudrate The UART's baud rate, used to work out how many bytes
+    #         go out in a run
+    #  @param slot_us Time [us] the task may spend writing in each run
+    #  @param task_list The @c cotask.TaskList whose next deadline limits
+    #         each run, or @c None to use only @c slot_us
+    #  @param priority The priority of the sender's task; only the deadlines
+    #         of tasks above it limit a run, as those of its own priority
+    #         or below can wait
+    def __init__(
+        self, uart, size: int = 1024, urgent_size: int = 128, baudrate: int = 115200, slot_us: int = 2000, task_list=None, priority: int = 0
+    ):
+        self.uart = uart
+        self.task_list = task_list
+        self.priority = priority
+        self.baudrate = baudrate
+
+        ## Bytes sent in each run; each byte takes 10 bit times.
+        self.slot_bytes = max(1, slot_us * baudrate // 10_000_000)
+
+        # The urgent and ordinary rings; each message in them is preceded by
+        # its length in two bytes
+        self._lanes = (
+            task_share.Queue("B", urgent_size, thread_protect=False, name="TX urgent"),
+            task_share.Queue("B", size, thread_protect=False, name="TX ring"),
+        )
+        self._sizes = (urgent_size, size)
+
+        # The staging buffer, and a view of its first n bytes at index n
+        self._staging = bytearray(self.slot_bytes)
+        self._staged = tuple(memoryview(self._staging)[:count] for count in range(self.slot_bytes + 1))
+
+        # The ring holding the message being sent and the bytes of it left
+        self._lane = None
+        self._left = 0
+
+        # The iterator of a stream being sent, and its buffer waiting to go
+        self._stream = None
+        self._piece = None
+
+        ## Number of bytes sent.
+        self.sent = 0
+        ## Number of urgent and ordinary messages dropped for want of room.
+        self.dropped = [0, 0]
+        ## Number of bytes in the messages dropped, urgent and ordinary.
+        self.dropped_bytes = [0, 0]
+
+    # Copy a whole message into one of the rings, or count it as dropped
+    def _put(self, lane: int, data) -> int:
+        ring = self._lanes[lane]
+        count = len(data)
+        if count + 2 > self._sizes[lane] - ring.num_in():
+            self.dropped[lane] += 1
+            self.dropped_bytes[lane] += count
+            return 0
+        ring.put(count & 0xFF)
+        ring.put(count >> 8)
+        ring.put_many(data)
+        return count
+
+    ## Queue a message to be sent, as @c UART.write() would send it.
+    #
+    #  @param data The bytes to send
+    #  @return The number of bytes queued, which is 0 if there wasn't room
+    def write(self, data) -> int:
+        return self._put(1, data)
+
+    ## Queue a message to be sent ahead of the ordinary messages.
+    #
+    #  @param data The bytes to send
+    #  @return The number of bytes queued, which is 0 if there wasn't room
+    def write_urgent(self, data) -> int:
+        return self._put(0, data)
+
+    ## Send the buffers an iterator gives, one after another with nothing
+    #  else between them, as soon as the message being sent is finished.
+    #
+    #  Each buffer is written whole in one run, so none should be longer
+    #  than @c slot_bytes. Messages queued meanwhile wait until the stream
+    #  ends, and are dropped if their ring fills.
+    #
+    #  @param pieces Iterator, such as a generator, of pairs of a buffer and
+    #         its length in bytes, as the view of an array counts items
+    #  @return @c False if another stream is still being sent
+    def write_stream(self, pieces) -> bool:
+        if self._stream is not None:
+            return False
+        self._stream = pieces
+        return True
+
+    ## Find the longest message which @c write() can queue now.
+    #
+    #  @return The number of bytes, which may be 0 or less when the ring is
+    #          nearly full
+    def room(self) -> int:
+        return self._sizes[1] - self._lanes[1].num_in() - 2
+
+    ## Check whether anything is waiting to be sent.
+    #
+    #  @return @c True while any message hasn't been sent in full
+    def busy(self) -> bool:
+        return self._left > 0 or self._stream is not None or self._lanes[0].any() or self._lanes[1].any()
+
+    # Move bytes of the message being sent from its ring to the staging
+    # buffer
+    @micropython.native
+    def _stage(self, count: int):
+        lane = self._lane
+        staging = self._staging
+        for idx in range(count):
+            staging[idx] = lane.get()
+
+    ## Generator which sends what fits in each run.
+    #
+    #  Yields 0 while idle and 1 while messages are waiting.
+    def run(self):
+        urgent, ordinary = self._lanes
+        while True:
+            budget = self.slot_bytes
+            if self.task_list:
+                slack = self.task_list.slack(self.priority)
+                if slack is not None and slack * self.baudrate // 10_000_000 < budget:
+                    budget = slack * self.baudrate // 10_000_000
+
+            while budget > 0:
+                # Between messages, send a stream's buffers while they fit
+                if self._left == 0 and self._stream is not None:
+                    if self._piece is None:
+                        self._piece = next(self._stream, None)
+                        if self._piece is None:
+                            self._stream = None
+                            continue
+                    buf, count = self._piece
+                    if count > budget and budget < self.slot_bytes:
+                        break
+                    self.uart.write(buf)
+                    self._piece = None
+                    budget -= count
+                    self.sent += count
+                    continue
+
+                # Between messages, start the next one, urgent ones first
+                if self._left == 0:
+                    if urgent.any():
+                        self._lane = urgent
+                    elif ordinary.any():
+                        self._lane = ordinary
+                    else:
+                        break
+                    self._left = self._lane.get() | (self._lane.get() << 8)
+
+                count = min(self._left, budget)
+                self._stage(count)
+                self.uart.write(self._staged[count])
+                self._left -= count
+                budget -= count
+                self.sent += count
+
+            yield 1 if self.busy() else 0
+
+    ## Puts the numbers of bytes sent and waiting, and of messages dropped,
+    #  into a string.
+    def __repr__(self):
+        queued = self._left + self._lanes[0].num_in() + self._lanes[1].num_in()
+        return "UART sender: {:d} bytes sent, {:d} queued; dropped {:d} urgent ({:d} bytes), {:d} ordinary ({:d} bytes)".format(
+            self.sent, queued, self.dropped[0], self.dropped_bytes[0], self.dropped[1], self.dropped_bytes[1]
+        )
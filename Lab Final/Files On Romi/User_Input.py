@@ -2,7 +2,8 @@
 #  Bluetooth/serial command handler for Romi. Polls UART for user commands,
 #  decodes configuration changes, calibration triggers, and direct state
 #  transitions, then writes results into shared variables for other tasks.
-#  This task is cooperative and yields after each loop iteration.
+#  This task is cooperative and yields after each loop iteration, and while
+#  waiting for the characters of a numeric input.
 #
 #  @author Antonio Ventimiglia
 #  @author Caiden Bonney
@@ -32,10 +33,26 @@ class UserInput:
     #
     #  @param button_pin Pin object used to trigger a soft reset
     #  @param battery Battery object for reporting/adjustment hooks
-    def __init__(self, button_pin, battery):
+    #  @param reporter Optional @c StatusReporter which sends status
+    #         snapshots when asked to with the @c s and @c r commands
+    #  @param port Where replies are written, such as a @c UARTSender, or
+    #         @c None to write straight to the UART
+    #  @param logger Optional @c DataLogger which records the motor
+    #         controllers' samples after the @c l command, and is dumped with
+    #         the @c d command
+    #  @param subscriptions Optional @c Subscriptions whose channels are
+    #         subscribed to with the @c t command
+    #  @param profiler Optional @c SamplingProfiler which is started,
+    #         stopped and dumped with the @c m command
+    def __init__(self, button_pin, battery, reporter=None, port=None, logger=None, subscriptions=None, profiler=None):
         self.cmd_queue = []
         self.uart = UART(5, 115200)
+        self.tx = port if port else self.uart
         self.battery = battery
+        self.reporter = reporter
+        self.logger = logger
+        self.subscriptions = subscriptions
+        self.profiler = profiler
 
         self.button_pin = button_pin
 
@@ -67,32 +84,59 @@ class UserInput:
 
     ## Change a sensor class attribute using the next numeric token.
     #
+    #  This is a generator which yields while waiting for the token, so it
+    #  is run with @c yield @c from inside @c run().
+    #
     #  @param sens Sensor class whose attribute is being modified
     #  @param att_str Attribute name to set (e.g., @c Kp, @c Ki)
     def change_attribute(self, sens, att_str):
-        value = self.get_next_n_char(5)
+        value = yield from self.get_next_n_char(5)
         sens.set_attr(att_str, value)
 
-    ## Fetch the next @p n characters (blocking until available).
+    ## Fetch the next @p n characters, yielding to the scheduler until they
+    #  are available.
     #
     #  Converts the retrieved token to @c float and retries on invalid input.
+    #  This is a generator, so it never holds up the other tasks while the
+    #  user types; inside @c run() it is used as
+    #  @c value @c = @c yield @c from @c self.get_next_n_char(n).
     #
     #  @param n Number of characters to read
     #  @return Parsed floating-point value
-    def get_next_n_char(self, n) -> float:
-        while len(self.cmd_queue) < n:
+    def get_next_n_char(self, n):
+        while True:
             self.poll()
-        value = ""
-        for _ in range(n):
-            char = self.get_cmd()
-            if char is not None:
-                value += char
-        try:
-            return float(value)
-        except ValueError:
-            print("Invalid value try again")
-            self.uart.write(b"Invalid value try again\r\n")
-            return self.get_next_n_char(n)
+            while len(self.cmd_queue) < n:
+                yield
+                self.poll()
+            value = ""
+            for _ in range(n):
+                char = self.get_cmd()
+                if char is not None:
+                    value += char
+            try:
+                return float(value)
+            except ValueError:
+                print("Invalid value try again")
+                self.tx.write(b"Invalid value try again\r\n")
+
+    ## Fetch the characters up to the end of the line, yielding to the
+    #  scheduler until it ends.
+    #
+    #  Like @c get_next_n_char(), this is used inside @c run() as
+    #  @c line @c = @c yield @c from @c self.get_line().
+    #
+    #  @return The line, without its carriage return or line feed
+    def get_line(self):
+        line = ""
+        while True:
+            self.poll()
+            while self.cmd_queue:
+                char = self.get_cmd()
+                if char == "\r" or char == "\n":
+                    return line
+                line += char
+            yield
 
     ## Clear any buffered commands.
     def drain(self):
@@ -101,7 +145,17 @@ class UserInput:
     ## Generator task that processes user commands and updates shares.
     #
     #  Handles calibration triggers, segment selection, gain changes, and
-    #  reference speed updates. Also supports soft reset via button press.
+    #  reference speed updates. Also supports soft reset via button press,
+    #  and asks the status reporter for a snapshot of the task profiles,
+    #  heap and shares with @c s, or for a snapshot followed by a reset of
+    #  the profiles with @c r. The @c l command starts recording the motor
+    #  controllers' samples, and @c d dumps them once recording has stopped.
+    #  The @c t command is followed by a line giving a channel and a rate
+    #  [Hz], such as @c "obsd_X_s 10", to subscribe to the channel; a rate
+    #  of 0 unsubscribes, @c "-" unsubscribes from everything, and an empty
+    #  line lists the channels. The @c m command is followed by a line
+    #  saying @c start, @c stop or @c dump to control the sampling profiler;
+    #  an empty line tells how many samples it has.
     #
     #  @param shares Tuple of @c task_share variables for motor flags, speeds,
     #                and calibration/status signaling
@@ -118,7 +172,7 @@ class UserInput:
             set_seg_s,
         ) = shares
         data_transfer_s.put(0)
-        self.uart.write(f"Bluetooth Connection Established\r\n".encode("utf-8"))
+        self.tx.write(f"Bluetooth Connection Established\r\n".encode("utf-8"))
         while True:
             if self.button_pin.value() == 0:
                 soft_reset()
@@ -132,7 +186,7 @@ class UserInput:
             # If command is valid do command
             if cmd:
                 print(cmd)
-                self.uart.write(f"{cmd}\r\n".encode("utf-8"))
+                self.tx.write(f"{cmd}\r\n".encode("utf-8"))
 
                 # Calibration commands
                 if cmd == "v":
@@ -157,76 +211,146 @@ class UserInput:
                     set_seg_s.put(0)
 
                 elif cmd == ".":
-                    self.uart.write(f"Set State (3 chr):".encode("utf-8"))
-                    value = int(self.get_next_n_char(3))
-                    self.uart.write(f"{value}\r\n".encode("utf-8"))
+                    self.tx.write(f"Set State (3 chr):".encode("utf-8"))
+                    value = int((yield from self.get_next_n_char(3)))
+                    self.tx.write(f"{value}\r\n".encode("utf-8"))
 
                     func_id = value // 100
 
                     if func_id >= 1:
                         PD_vars.next_state = 0
-                        # self.uart.write(f"Next State (3 chr):".encode("utf-8"))
+                        # self.tx.write(f"Next State (3 chr):".encode("utf-8"))
                         # PD_vars.var_1 = int(self.get_next_n_char(3))
-                        self.uart.write(f"Var1 (5 chr):".encode("utf-8"))
-                        PD_vars.var_1 = self.get_next_n_char(5)
-                        self.uart.write(f"{PD_vars.var_1}\r\n".encode("utf-8"))
+                        self.tx.write(f"Var1 (5 chr):".encode("utf-8"))
+                        PD_vars.var_1 = yield from self.get_next_n_char(5)
+                        self.tx.write(f"{PD_vars.var_1}\r\n".encode("utf-8"))
                     if func_id >= 2:
-                        self.uart.write(f"Var2 (5 chr):".encode("utf-8"))
-                        PD_vars.var_2 = self.get_next_n_char(5)
-                        self.uart.write(f"{PD_vars.var_2}\r\n".encode("utf-8"))
+                        self.tx.write(f"Var2 (5 chr):".encode("utf-8"))
+                        PD_vars.var_2 = yield from self.get_next_n_char(5)
+                        self.tx.write(f"{PD_vars.var_2}\r\n".encode("utf-8"))
                     if func_id >= 3:
-                        self.uart.write(f"Var3 (5 chr):".encode("utf-8"))
-                        PD_vars.var_3 = self.get_next_n_char(5)
-                        self.uart.write(f"{PD_vars.var_3}\r\n".encode("utf-8"))
+                        self.tx.write(f"Var3 (5 chr):".encode("utf-8"))
+                        PD_vars.var_3 = yield from self.get_next_n_char(5)
+                        self.tx.write(f"{PD_vars.var_3}\r\n".encode("utf-8"))
                     if func_id >= 4:
-                        self.uart.write(f"Var4 (5 chr):".encode("utf-8"))
-                        PD_vars.var_4 = self.get_next_n_char(5)
-                        self.uart.write(f"{PD_vars.var_4}\r\n".encode("utf-8"))
+                        self.tx.write(f"Var4 (5 chr):".encode("utf-8"))
+                        PD_vars.var_4 = yield from self.get_next_n_char(5)
+                        self.tx.write(f"{PD_vars.var_4}\r\n".encode("utf-8"))
                     set_seg_s.put(value)
 
                 # Gain Control
                 elif cmd == "p":
-                    which_CLC = self.get_next_n_char(1)
-                    self.uart.write(f"{which_CLC}\r\n".encode("utf-8"))
+                    which_CLC = yield from self.get_next_n_char(1)
+                    self.tx.write(f"{which_CLC}\r\n".encode("utf-8"))
                     if which_CLC == "1":
                         sens = Encoder
                     elif which_CLC == "2":
                         sens = LineSensor
                     else:
                         sens = IMU
-                    self.change_attribute(sens, "Kp")
+                    yield from self.change_attribute(sens, "Kp")
                 elif cmd == "i":
-                    which_CLC = self.get_next_n_char(1)
+                    which_CLC = yield from self.get_next_n_char(1)
                     if which_CLC == "1":
                         sens = Encoder
                     elif which_CLC == "2":
                         sens = LineSensor
                     else:
                         sens = IMU
-                    self.change_attribute(sens, "Ki")
+                    yield from self.change_attribute(sens, "Ki")
                 elif cmd == "o":
-                    which_CLC = self.get_next_n_char(1)
+                    which_CLC = yield from self.get_next_n_char(1)
                     if which_CLC == "1":
                         sens = Encoder
                     elif which_CLC == "2":
                         sens = LineSensor
                     else:
                         sens = IMU
-                    self.change_attribute(sens, "Kd")
+                    yield from self.change_attribute(sens, "Kd")
                 elif cmd == "k":
                     sens = Encoder
-                    self.change_attribute(sens, "Kff")
+                    yield from self.change_attribute(sens, "Kff")
                 elif cmd == "h":
                     sens = Encoder
-                    self.change_attribute(sens, "turn_correctionl")
+                    yield from self.change_attribute(sens, "turn_correctionl")
                 elif cmd == "j":
                     sens = Encoder
-                    self.change_attribute(sens, "turn_correctionr")
+                    yield from self.change_attribute(sens, "turn_correctionr")
+
+                # Status snapshot, and snapshot with reset of the profiles
+                elif cmd == "s" or cmd == "r":
+                    if self.reporter is None:
+                        self.tx.write(b"No status reporter\r\n")
+                    else:
+                        self.reporter.request(reset=cmd == "r")
+
+                # Start recording the motor controllers' samples
+                elif cmd == "l":
+                    if self.logger is None:
+                        self.tx.write(b"No data logger\r\n")
+                    else:
+                        self.logger.start()
+                        data_transfer_s.put(1)
+
+                # Dump the samples. The UART sender sends the dump a few
+                # samples a run, once the message it's sending is finished,
+                # and nothing else until it's done, so the dump isn't split;
+                # without one, the dump is written at once
+                elif cmd == "d":
+                    if self.logger is None:
+                        self.tx.write(b"No data logger\r\n")
+                    elif data_transfer_s.get():
+                        self.tx.write(b"Still recording\r\n")
+                    elif not hasattr(self.tx, "write_stream"):
+                        self.logger.dump(self.uart)
+                    elif not self.tx.write_stream(self.logger.pieces(self.tx.slot_bytes)):
+                        self.tx.write(b"Still dumping\r\n")
+
+                # Subscribe to a channel, or list them
+                elif cmd == "t":
+                    line = yield from self.get_line()
+                    words = line.split()
+                    if self.subscriptions is None:
+                        self.tx.write(b"No subscriptions\r\n")
+                    elif not words:
+                        self.tx.write((str(self.subscriptions) + "\r\n").encode("utf-8"))
+                    elif words[0] == "-":
+                        self.subscriptions.clear()
+                        self.tx.write(b"Subscriptions cleared\r\n")
+                    else:
+                        try:
+                            used = self.subscriptions.subscribe(words[0], float(words[1]) if len(words) > 1 else 0.0)
+                            self.tx.write(f"Subscriptions use {used} of {self.subscriptions.budget} B/s\r\n".encode("utf-8"))
+                        except ValueError as e:
+                            self.tx.write(f"Rejected: {e}\r\n".encode("utf-8"))
+
+                # Start, stop or dump the sampling profiler. Starting empties
+                # it, and the dump is sent like the data logger's
+                elif cmd == "m":
+                    line = yield from self.get_line()
+                    word = line.strip()
+                    if self.profiler is None:
+                        self.tx.write(b"No sampling profiler\r\n")
+                    elif word == "start":
+                        self.profiler.stop()
+                        self.profiler.clear()
+                        self.profiler.start()
+                    elif word == "stop":
+                        self.profiler.stop()
+                    elif word == "dump":
+                        if self.profiler.running():
+                            self.tx.write(b"Still sampling\r\n")
+                        elif not hasattr(self.tx, "write_stream"):
+                            self.profiler.dump(self.uart)
+                        elif not self.tx.write_stream(self.profiler.pieces(self.tx.slot_bytes)):
+                            self.tx.write(b"Still dumping\r\n")
+                    else:
+                        self.tx.write((str(self.profiler) + "\r\n").encode("utf-8"))
 
                 # Reference Speed
                 elif cmd == "z":
-                    value = self.get_next_n_char(5)
+                    value = yield from self.get_next_n_char(5)
                     PD_vars.v_ref = value
                     print("v_ref:", PD_vars.v_ref)
-                    self.uart.write(f"v_ref:{PD_vars.v_ref}\r\n".encode("utf-8"))
+                    self.tx.write(f"v_ref:{PD_vars.v_ref}\r\n".encode("utf-8"))
             yield
@@ -6,7 +6,8 @@
 #  @c yield at least once in the loop. References to all the tasks to be run
 #  in the system are kept in a list maintained by class @c CoTaskList; the
 #  system scheduler then runs the tasks' @c run() methods according to a
-#  chosen scheduling algorithm such as round-robin or highest-priority-first.
+#  chosen scheduling algorithm such as round-robin, highest-priority-first or
+#  earliest-deadline-first.
 #
 #  @author JR Ridgely
 #  @date   2017-Jan-01 JRR Approximate date of creation of file
@@ -27,9 +28,68 @@
 #  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 #  POSSIBILITY OF SUCH DAMAGE.
 
-import gc  # Memory allocation garbage collector
 import utime  # Micropython version of time library
 import micropython  # This shuts up incorrect warnings
+import struct
+from array import array
+
+## Number of bins in each run time and lateness histogram. Bin @c n counts
+#  times from 2<sup>n</sup> up to 2<sup>n+1</sup> microseconds, except that
+#  bin 0 also counts times under 1 us and the last bin counts everything
+#  over about 8 seconds.
+HIST_BINS = 24
+
+## Number of state transitions kept by a task whose @c trace parameter is
+#  @c True. A number given as the @c trace parameter overrides this.
+TRACE_LEN = 64
+
+## Format of the header written before each task's transitions by
+#  @c Task.dump_trace(): the marker @c b"CTRC", the ring capacity, the number
+#  of transitions which follow, the total number recorded since tracing
+#  began, the state before the oldest transition which follows, the time at
+#  which tracing began and the length of the task name. The name follows the
+#  header, then the transition times as little-endian 32-bit microsecond
+#  ticks, then the states to which the task moved as little-endian 16-bit
+#  numbers, both oldest first.
+TRACE_HEADER = "<4sHHIHIB"
+
+## Format of the header written before a scheduler timeline by
+#  @c Timeline.dump(): the marker @c b"CTLN", the ring capacity, the number
+#  of runs which follow, the total number recorded and the number of tasks.
+#  Each task name follows as a length byte and the name. Then come the task
+#  numbers as bytes, the start and end times as little-endian 32-bit
+#  microsecond ticks and the states yielded as little-endian 16-bit numbers,
+#  each oldest first.
+TIMELINE_HEADER = "<4sHHIB"
+
+## Overrun policy under which a task which has fallen a whole period or more
+#  behind runs once for every time slot it missed, back to back, until it
+#  has caught up. No runs are lost, but a long stall is followed by a burst.
+CATCH_UP = 0
+
+## Overrun policy under which a task which has fallen a whole period or more
+#  behind runs once and then carries on in the next time slot which hasn't
+#  yet passed, so it stays in phase with the tasks it shares frames with.
+SKIP = 1
+
+## Overrun policy under which a task which has fallen a whole period or more
+#  behind runs once and then starts its periods over from the current time.
+RESET = 2
+
+## The function which the scheduler calls to find the current time in
+#  microseconds. It is @c utime.ticks_us() unless @c set_clock() has been used
+#  to substitute another time source, such as a simulated clock which allows
+#  tasks to be tested off-target.
+_clock = utime.ticks_us
+
+
+## Replace the time source used by the scheduler and by task profiling.
+#  The new clock must behave like @c utime.ticks_us(), returning a time in
+#  microseconds which can be compared using @c utime.ticks_diff().
+#  @param clock_fun A function which takes no arguments and returns the time
+def set_clock(clock_fun):
+    global _clock
+    _clock = clock_fun
 
 
 ## Implements multitasking with scheduling and some performance logging.
@@ -65,6 +125,11 @@ import micropython  # This shuts up incorrect warnings
 #    @endcode
 class Task:
 
+    ## The task whose generator is running now, or @c None while the
+    #  scheduler itself is running. A timer interrupt can read this to see
+    #  where the time is going; see @c Sampling_Profiler.py.
+    running = None
+
     ## Initialize a task object so it may be run by the scheduler.
     #
     #  This method initializes a task object, saving copies of constructor
@@ -81,11 +146,43 @@ class Task:
     #         The time can be given in a @c float or @c int; it will be
     #         converted to microseconds for internal use by the scheduler.
     #  @param profile Set to @c True to enable run-time profiling
-    #  @param trace Set to @c True to generate a list of transitions between
-    #         states. @b Note: This slows things down and allocates memory.
+    #  @param trace Set to @c True to keep the last @c TRACE_LEN transitions
+    #         between states, or to a number to keep that many transitions.
+    #         The buffer is allocated here, so tracing doesn't allocate
+    #         memory while the scheduler runs.
     #  @param shares A list or tuple of shares and queues used by this task.
     #         If no list is given, no shares are passed to the task
-    def __init__(self, run_fun, name="NoName", priority=0, period=None, profile=False, trace=False, shares=()):
+    #  @param phase The time in milliseconds by which the task's runs are
+    #         offset from the start of its period. Tasks with the same period
+    #         and different phases run in a fixed order within each frame
+    #  @param after A task, or a list or tuple of tasks, which produce data
+    #         this task uses. This task won't run until each of them has run
+    #         since this task last ran, unless it has waited a whole period.
+    #         The time from the first task's sensor samples to the end of
+    #         this task's run is measured and shown with the task list
+    #  @param overrun What a timed task does once it has fallen a whole
+    #         period or more behind: @c CATCH_UP, @c SKIP or @c RESET
+    #  @param budget The time in milliseconds one run of the task should
+    #         take at most, or @c None for no budget. Runs which take longer
+    #         are counted and shown with the task list
+    #  @param degrade A function called with the run time in microseconds
+    #         after each run which goes over the budget, so the task can shed
+    #         work on its next runs
+    def __init__(
+        self,
+        run_fun,
+        name="NoName",
+        priority=0,
+        period=None,
+        profile=False,
+        trace=False,
+        shares=(),
+        phase=0,
+        after=(),
+        overrun=CATCH_UP,
+        budget=None,
+        degrade=None,
+    ):
         # The function which is run to implement this task's code. Since it
         # is a generator, we "run" it here, which doesn't actually run it but
         # gets it going as a generator which is ready to yield values
@@ -108,25 +205,69 @@ class Task:
         #  @c go() method.
         if period != None:
             self.period = int(period * 1000)
-            self._next_run = utime.ticks_us() + self.period
+            self._next_run = utime.ticks_add(_clock(), self.period + int(phase * 1000))
         else:
             self.period = period
             self._next_run = None
 
+        ## What the task does once it has fallen a whole period or more
+        #  behind: @c CATCH_UP, @c SKIP or @c RESET.
+        self.overrun = overrun
+
+        ## The time in microseconds one run of the task should take at most,
+        #  or @c None if runs aren't checked against a budget.
+        self.budget = None if budget is None else int(budget * 1000)
+
+        # The function told about runs which go over the budget, if any
+        self._degrade = degrade
+
         # Flag which causes the task to be profiled, in which the execution
         #  time of the @c run() method is measured and basic statistics kept.
+        # The histograms are allocated here, once, so that profiling never
+        # allocates memory while the scheduler is running
         self._prof = profile
+        self._run_hist = array("L", [0] * HIST_BINS)
+        self._late_hist = array("L", [0] * HIST_BINS)
+        self._lat_hist = array("L", [0] * HIST_BINS)
         self.reset_profile()
 
         # The previous state in which the task last ran. It is used to watch
         # for and track state transitions.
         self._prev_state = 0
 
-        # If transition tracing has been enabled, create an empty list in
-        # which to store transition (time, to-state) stamps
-        self._trace = trace
-        self._tr_data = []
-        self._prev_time = utime.ticks_us()
+        # If transition tracing has been enabled, create the ring buffer in
+        # which transition times and to-states are stored
+        self.set_trace(TRACE_LEN if trace is True else int(trace))
+
+        # The scheduler timeline in which each run of this task is logged,
+        # if any, and this task's number in it
+        self._timeline = None
+        self._tl_id = 0
+
+        # The task list the task is in, if any, told when its period is set
+        self._task_list = None
+
+        # The tasks which must run before this one in each frame, and how
+        # many times each had run when this task last used its output
+        if isinstance(after, Task):
+            after = (after,)
+        self._after = tuple(after)
+        self._seen = [pred._done for pred in self._after]
+
+        # Number of times this task has run, the time at which the oldest
+        # sensor sample behind its latest output was taken, and whether
+        # it's part of a chain of dependent tasks
+        self._done = 0
+        self._sample = 0
+        self._waiting = False
+        self._dataflow = bool(self._after)
+        for pred in self._after:
+            pred._dataflow = True
+
+        ## The number of links in the longest chain of tasks which must run
+        #  before this one; @c TaskList.frame_sched() runs the tasks of a
+        #  chain in order of depth.
+        self.depth = 1 + max(pred.depth for pred in self._after) if self._after else 0
 
         ## Flag which is set true when the task is ready to be run by the
         #  scheduler
@@ -144,16 +285,54 @@ class Task:
             # Reset the go flag for the next run
             self.go_flag = False
 
-            # If profiling, save the start time
-            if self._prof:
-                stime = utime.ticks_us()
+            # If profiling, checking the budget, recording a timeline or
+            # passing data along a chain of dependent tasks, save the start
+            # time
+            if self._prof or self.budget or self._timeline or self._dataflow:
+                stime = _clock()
+
+            # A task at the start of a chain samples its sensors now; one
+            # further along uses output based on its producers' samples
+            if self._dataflow:
+                sample = stime
+                for idx in range(len(self._after)):
+                    pred = self._after[idx]
+                    self._seen[idx] = pred._done
+                    if utime.ticks_diff(pred._sample, sample) < 0:
+                        sample = pred._sample
+                self._sample = sample
 
             # Run the method belonging to the state which should be run next
+            Task.running = self
             curr_state = next(self._run_gen)
+            Task.running = None
 
-            # If profiling or tracing, save timing data
-            if self._prof or self._trace:
-                etime = utime.ticks_us()
+            # If profiling, tracing or recording a timeline, save timing data
+            if self._prof or self.budget or self._tr_len or self._timeline or self._dataflow:
+                etime = _clock()
+
+            # If the run went over the task's budget, count it and let the
+            # task know so it can do less on its next runs
+            if self.budget:
+                runt = utime.ticks_diff(etime, stime)
+                if runt > self.budget:
+                    self._over_budget += 1
+                    if runt > self._worst_over:
+                        self._worst_over = runt
+                    if self._degrade:
+                        self._degrade(runt)
+
+            # At the end of a chain, measure the time from the sensor sample
+            # to the output which depends on it
+            if self._dataflow:
+                self._done += 1
+                if self._after:
+                    lat = utime.ticks_diff(etime, self._sample)
+                    self._lat_count += 1
+                    self._lat_sum += lat
+                    self._lat_hist[_hist_bin(lat)] += 1
+                    if lat > self._lat_max:
+                        self._lat_max = lat
 
             # If profiling, save timing data
             if self._prof:
@@ -161,22 +340,30 @@ class Task:
                 runt = utime.ticks_diff(etime, stime)
                 if self._runs > 2:
                     self._run_sum += runt
+                    self._run_hist[_hist_bin(runt)] += 1
                     if runt > self._slowest:
                         self._slowest = runt
 
-            # If transition logic tracing is on, record a transition; if not,
-            # ignore the state. If out of memory, switch tracing off and
-            # run the memory allocation garbage collector
-            if self._trace:
-                try:
-                    if curr_state != self._prev_state:
-                        self._tr_data.append((utime.ticks_diff(etime, self._prev_time), curr_state))
-                except MemoryError:
-                    self._trace = False
-                    gc.collect()
+            # If transition logic tracing is on, record a transition in the
+            # ring buffer, overwriting the oldest one once the ring is full.
+            # A task which yields nothing is counted as being in state 0
+            if self._tr_len:
+                if curr_state is None:
+                    curr_state = 0
+                if curr_state != self._prev_state:
+                    idx = self._tr_head
+                    if self._tr_count >= self._tr_len:
+                        self._tr_base = self._tr_states[idx]
+                    self._tr_times[idx] = etime
+                    self._tr_states[idx] = curr_state
+                    idx += 1
+                    self._tr_head = idx if idx < self._tr_len else 0
+                    self._tr_count += 1
+            self._prev_state = curr_state
 
-                self._prev_state = curr_state
-                self._prev_time = etime
+            # If a scheduler timeline is being kept, log this run in it
+            if self._timeline:
+                self._timeline.record(self._tl_id, stime, etime, curr_state)
 
             return True
 
@@ -193,57 +380,215 @@ class Task:
         # If this task uses a timer, check if it's time to run run() again. If
         # so, set go flag and set the timer to go off at the next run time
         if self.period != None:
-            late = utime.ticks_diff(utime.ticks_us(), self._next_run)
+            late = utime.ticks_diff(_clock(), self._next_run)
             if late > 0:
+                # Wait for the tasks this one depends on, but not for more
+                # than a whole period
+                if self._after and not self._deps_done():
+                    if late < self.period:
+                        if not self._waiting:
+                            self._waiting = True
+                            self._dep_waits += 1
+                        return self.go_flag
+                    self._dep_misses += 1
+                self._waiting = False
                 self.go_flag = True
-                self._next_run = utime.ticks_diff(self.period, -self._next_run)
+
+                # Move on to the next time slot. If a whole period or more
+                # has been missed, that depends on the overrun policy
+                if late < self.period:
+                    self._next_run = utime.ticks_add(self._next_run, self.period)
+                else:
+                    self._overruns += 1
+                    if self.overrun == SKIP:
+                        missed = late // self.period
+                        self._skipped += missed
+                        self._next_run = utime.ticks_add(self._next_run, (missed + 1) * self.period)
+                    elif self.overrun == RESET:
+                        self._next_run = utime.ticks_add(self._next_run, late + self.period)
+                    else:
+                        self._next_run = utime.ticks_add(self._next_run, self.period)
 
                 # If keeping a latency profile, record the data
                 if self._prof:
                     self._late_sum += late
+                    self._late_hist[_hist_bin(late)] += 1
                     if late > self._latest:
                         self._latest = late
 
         # If the task doesn't use a timer, we rely on go_flag to signal ready
         return self.go_flag
 
+    ## This method checks whether every task this one depends on has run
+    #  since this task last ran.
+    #  @return @c True if all the tasks in @c after have run
+    @micropython.native
+    def _deps_done(self) -> bool:
+        for idx in range(len(self._after)):
+            if self._after[idx]._done == self._seen[idx]:
+                return False
+        return True
+
     ## This method sets the period between runs of the task to the given
     #  number of milliseconds, or @c None if the task is triggered by calls
-    #  to @c go() rather than time.
+    #  to @c go() rather than time. A task which becomes timed is next due
+    #  one period from now, and a task which becomes timed or untimed is
+    #  moved between the deadline heap and the untimed tasks of the task
+    #  list it is in.
     #  @param new_period The new period in milliseconds between task runs
     def set_period(self, new_period):
         if new_period is None:
             self.period = None
         else:
+            timed = self.period
             self.period = int(new_period) * 1000
+            if self._next_run is None or not timed:
+                self._next_run = utime.ticks_add(_clock(), self.period)
+        if self._task_list:
+            self._task_list._rehome(self)
 
     ## This method resets the variables used for execution time profiling.
     #  This method is also used by @c __init__() to create the variables.
+    #  The histograms are cleared in place rather than being reallocated.
     def reset_profile(self):
         self._runs = 0
         self._run_sum = 0
         self._slowest = 0
         self._late_sum = 0
         self._latest = 0
+        self._lat_count = 0
+        self._lat_sum = 0
+        self._lat_max = 0
+        self._dep_waits = 0
+        self._dep_misses = 0
+        self._overruns = 0
+        self._skipped = 0
+        self._over_budget = 0
+        self._worst_over = 0
+        for idx in range(HIST_BINS):
+            self._run_hist[idx] = 0
+            self._late_hist[idx] = 0
+            self._lat_hist[idx] = 0
+
+    ## This method estimates a percentile of the task's run time from the
+    #  run time histogram.
+    #  @param pct The percentile wanted, from 0 to 100
+    #  @return The upper edge in microseconds of the histogram bin holding
+    #          the percentile, but no more than the slowest run, or 0 if
+    #          there is no data
+    def run_percentile(self, pct):
+        return _hist_percentile(self._run_hist, pct, self._slowest)
+
+    ## This method estimates a percentile of how late the task has been in
+    #  starting, from the lateness histogram.
+    #  @param pct The percentile wanted, from 0 to 100
+    #  @return The upper edge in microseconds of the histogram bin holding
+    #          the percentile, but no more than the latest start, or 0 if
+    #          there is no data
+    def late_percentile(self, pct):
+        return _hist_percentile(self._late_hist, pct, self._latest)
+
+    ## This method sets up transition tracing, replacing any trace already
+    #  kept. It allocates memory, so it should be called before the
+    #  scheduler starts rather than while tasks are running.
+    #  @param length The number of transitions to keep, or 0 to stop tracing
+    def set_trace(self, length):
+        self._tr_len = int(length)
+        # Times are kept as "I", which is 32 bits on the Romi as "L" is, but
+        # is also 32 bits on a PC, so dumps read the same on either
+        self._tr_times = array("I", [0] * self._tr_len)
+        self._tr_states = array("H", [0] * self._tr_len)
+        self._tr_head = 0
+        self._tr_count = 0
+        self._tr_base = self._prev_state
+        self._tr_start = _clock()
+
+    ## This method makes a string showing the time from the sensor samples
+    #  at the start of the task's chain of dependencies to the end of the
+    #  task's runs, in milliseconds, and how often the task waited for or
+    #  gave up waiting for the tasks it depends on.
+    #  @returns The string showing the task's latency, or an empty string
+    #           if the task doesn't depend on other tasks
+    def latency(self):
+        if not self._after or not self._lat_count:
+            return ""
+        rst = f"{self.name:<16s}{self._lat_count:8d}"
+        rst += f"{(self._lat_sum / self._lat_count / 1000.0): 10.3f}"
+        rst += f"{(_hist_percentile(self._lat_hist, 95, self._lat_max) / 1000.0): 10.3f}"
+        rst += f"{(self._lat_max / 1000.0): 10.3f}{self._dep_waits:8d}{self._dep_misses:8d}"
+        return rst
+
+    ## This method makes a string showing the task's overrun policy, how
+    #  many times it has fallen a whole period or more behind, and how many
+    #  time slots it has skipped as a result.
+    #  @returns The string showing the task's overruns, or an empty string
+    #           if it has not overrun
+    def overruns(self):
+        if not self._overruns:
+            return ""
+        policy = ("CATCH_UP", "SKIP", "RESET")[self.overrun]
+        return f"{self.name:<16s}{policy:>10s}{self._overruns:10d}{self._skipped:10d}"
+
+    ## This method makes a string showing the task's budget, how many runs
+    #  went over it and the longest of those runs, in milliseconds.
+    #  @returns The string showing the task's budget, or an empty string if
+    #           the task has no budget
+    def violations(self):
+        if not self.budget:
+            return ""
+        rst = f"{self.name:<16s}{(self.budget / 1000.0): 10.3f}{self._over_budget:10d}"
+        rst += f"{(self._worst_over / 1000.0): 10.3f}"
+        return rst
 
     ## This method returns a string containing the task's transition trace.
-    #  The trace is a set of tuples, each of which contains a time and the
-    #  states from and to which the system transitioned.
+    #  Each line holds the time in seconds since tracing began and the
+    #  states from and to which the task transitioned. Only the most recent
+    #  transitions which fit in the ring buffer are shown.
     #  @return A possibly quite large string showing state transitions
     def get_trace(self):
         tr_str = "Task " + self.name + ":"
-        if self._trace:
+        if self._tr_len:
             tr_str += "\n"
-            last_state = 0
-            total_time = 0.0
-            for item in self._tr_data:
-                total_time += item[0] / 1000000.0
-                tr_str += "{: 12.6f}: {: 2d} -> {:d}\n".format(total_time, last_state, item[1])
-                last_state = item[1]
+            if self._tr_count > self._tr_len:
+                tr_str += f"  ({self._tr_count - self._tr_len} earlier transitions overwritten)\n"
+            last_state = self._tr_base
+            for idx in self._trace_order():
+                total_time = utime.ticks_diff(self._tr_times[idx], self._tr_start) / 1000000.0
+                tr_str += "{: 12.6f}: {: 2d} -> {:d}\n".format(total_time, last_state, self._tr_states[idx])
+                last_state = self._tr_states[idx]
         else:
             tr_str += " not traced"
         return tr_str
 
+    ## This method finds the indices of the transitions in the ring buffer,
+    #  oldest first.
+    #  @return A range, or a pair of ranges, covering the stored transitions
+    def _trace_order(self):
+        if self._tr_count < self._tr_len:
+            return range(self._tr_count)
+        return list(range(self._tr_head, self._tr_len)) + list(range(self._tr_head))
+
+    ## This method writes the task's transition trace to a stream in the
+    #  compact binary form described at @c TRACE_HEADER. The ring buffer is
+    #  written straight from memory, so a long trace can be sent out over a
+    #  serial port without building a large string. Nothing is written if
+    #  the task is not traced.
+    #  @param stream Something with a @c write() method, such as a UART, a
+    #         @c USB_VCP or a file opened in binary mode
+    def dump_trace(self, stream):
+        if not self._tr_len:
+            return
+        name = self.name.encode()
+        kept = min(self._tr_count, self._tr_len)
+        stream.write(
+            struct.pack(TRACE_HEADER, b"CTRC", self._tr_len, kept, self._tr_count, self._tr_base, self._tr_start, len(name))
+        )
+        stream.write(name)
+        head = self._tr_head if kept == self._tr_len else 0
+        for buf in (memoryview(self._tr_times), memoryview(self._tr_states)):
+            stream.write(buf[head:kept])
+            stream.write(buf[:head])
+
     ## Method to set a flag so that this task indicates that it's ready to run.
     #  This method may be called from an interrupt service routine or from
     #  another task which has data that this task needs to process soon.
@@ -270,10 +615,145 @@ class Task:
                 rst += f"{avg_late: 10.3f}{(self._latest / 1000.0): 10.3f}"
         return rst
 
+    ## This method makes a string showing the 50th, 95th and 99th
+    #  percentiles of the task's run time and lateness in milliseconds.
+    #  Each figure is the upper edge of a histogram bin, so it is an upper
+    #  bound which may be up to twice the true value, except that it is
+    #  never more than the largest value seen.
+    #  @returns The string showing the task's percentiles
+    def percentiles(self):
+        rst = f"{self.name:<16s}"
+        if self._prof and self._runs > 0:
+            for pct in (50, 95, 99):
+                rst += f"{(self.run_percentile(pct) / 1000.0): 10.3f}"
+            if self.period != None:
+                for pct in (50, 95, 99):
+                    rst += f"{(self.late_percentile(pct) / 1000.0): 10.3f}"
+        return rst
+
 
 # =============================================================================
 
 
+## A record of which task ran when, kept in a fixed ring buffer.
+#
+#  Every run of every task in a @c TaskList which has been given a timeline
+#  with @c TaskList.record_timeline() is logged as a task number, start and
+#  end times and the state the task yielded. The buffers are allocated when
+#  the timeline is created and the oldest runs are overwritten once they
+#  are full, so recording never allocates memory. The host tool
+#  @c Trace_Tools.py turns a dumped timeline into a trace which can be
+#  viewed in Perfetto or @c chrome://tracing.
+class Timeline:
+
+    ## Create a timeline.
+    #  @param length The number of task runs to keep
+    def __init__(self, length):
+        ## The number of task runs the timeline holds.
+        self.length = int(length)
+        self._ids = array("B", [0] * self.length)
+        self._starts = array("I", [0] * self.length)
+        self._ends = array("I", [0] * self.length)
+        self._states = array("H", [0] * self.length)
+        self._head = 0
+
+        ## The number of task runs recorded, including overwritten ones.
+        self.count = 0
+
+        ## The names of the tasks, indexed by task number.
+        self.names = []
+
+    ## Give a task a number in the timeline.
+    #  @param name The name of the task
+    #  @return The number by which runs of the task are logged
+    def add_task(self, name):
+        self.names.append(name)
+        return len(self.names) - 1
+
+    ## Log one run of a task. This is called by @c Task.schedule().
+    #  @param task_id The task's number from @c add_task()
+    #  @param start The time at which the run began
+    #  @param end The time at which the run ended
+    #  @param state The state yielded by the task, or @c None
+    @micropython.native
+    def record(self, task_id, start, end, state):
+        idx = self._head
+        self._ids[idx] = task_id
+        self._starts[idx] = start
+        self._ends[idx] = end
+        self._states[idx] = state if state else 0
+        idx += 1
+        self._head = idx if idx < self.length else 0
+        self.count += 1
+
+    ## Empty the timeline, keeping the task numbers.
+    def clear(self):
+        self._head = 0
+        self.count = 0
+
+    ## Write the timeline to a stream in the compact binary form described
+    #  at @c TIMELINE_HEADER, straight from the ring buffers.
+    #  @param stream Something with a @c write() method, such as a UART
+    def dump(self, stream):
+        kept = min(self.count, self.length)
+        stream.write(struct.pack(TIMELINE_HEADER, b"CTLN", self.length, kept, self.count, len(self.names)))
+        for name in self.names:
+            name = name.encode()
+            stream.write(bytes((len(name),)))
+            stream.write(name)
+        head = self._head if kept == self.length else 0
+        for buf in (self._ids, self._starts, self._ends, self._states):
+            buf = memoryview(buf)
+            stream.write(buf[head:kept])
+            stream.write(buf[:head])
+
+
+## Find which histogram bin a time belongs in. This is done by shifting
+#  rather than with logarithms so that no floating point objects are created.
+#  @param value A time in microseconds
+#  @return The index of the bin, from 0 to @c HIST_BINS - 1
+@micropython.native
+def _hist_bin(value) -> int:
+    idx = 0
+    while value > 1 and idx < HIST_BINS - 1:
+        value >>= 1
+        idx += 1
+    return idx
+
+
+## Estimate a percentile from a histogram.
+#  @param hist A histogram array with @c HIST_BINS bins
+#  @param pct The percentile wanted, from 0 to 100
+#  @param most The largest value put into the histogram; no percentile can
+#         be more than this, though the upper edge of its bin may be
+#  @return The upper edge in microseconds of the bin holding the percentile,
+#          capped at @c most, or 0 if the histogram is empty
+def _hist_percentile(hist, pct, most):
+    total = sum(hist)
+    if total == 0:
+        return 0
+    wanted = total * pct / 100
+    count = 0
+    for idx in range(HIST_BINS):
+        count += hist[idx]
+        if count >= wanted:
+            return min(2 << idx, most)
+    return min(2 << (HIST_BINS - 1), most)
+
+
+## Check whether task @c a should run before task @c b in deadline order.
+#  Times are compared with @c ticks_diff() so that the order stays correct
+#  when the microsecond timer wraps around. Tasks due at the same time are
+#  ordered by priority.
+#  @param a The first task to be compared
+#  @param b The second task to be compared
+#  @return @c True if task @c a is due before task @c b
+@micropython.native
+def _runs_before(a, b) -> bool:
+    diff = utime.ticks_diff(a._next_run, b._next_run)
+    return diff < 0 or (diff == 0 and a.priority > b.priority)
+
+
 ## A list of tasks used internally by the task scheduler.
 #  This class holds the list of tasks which will be run by the task scheduler.
 #  The task list is usually not directly used by the programmer except when
@@ -284,7 +764,8 @@ class Task:
 #  The task list is sorted by priority so that the scheduler can efficiently
 #  look through the list to find the highest priority task which is ready to
 #  run at any given time. Tasks can also be scheduled in a simpler
-#  "round-robin" fashion.
+#  "round-robin" fashion, or in earliest-deadline-first order using a heap
+#  of timed tasks sorted by the time at which each is next due to run.
 class TaskList:
 
     ## Initialize the task list. This creates the list of priorities in
@@ -297,6 +778,38 @@ class TaskList:
         #  that priority.
         self.pri_list = []
 
+        ## A binary min-heap, stored in a list, of the tasks which run on a
+        #  timer. The task which is next due to run is always at index 0, so
+        #  @c edf_sched() only needs to look at that one task.
+        self.edf_heap = []
+
+        ## Tasks with no period or a period of zero. These have no deadline,
+        #  so @c edf_sched() runs them in priority order only when no timed
+        #  task is due.
+        self.edf_idle = []
+
+        # Index of the next idle task to be given a chance to run
+        self._idle_idx = 0
+
+        # Time at which the current profiling window began
+        self._window_start = _clock()
+
+        ## Every task, sorted for @c frame_sched() in order of priority,
+        #  except that the tasks of a chain linked by @c after are kept
+        #  together at the highest priority in the chain, each after the
+        #  tasks it depends on.
+        self.frame_list = []
+
+        ## The timeline in which task runs are logged, or @c None if no
+        #  timeline is being kept. See @c record_timeline().
+        self.timeline = None
+
+        ## An object which decides when to run the memory garbage collector,
+        #  or @c None. After every pass, each scheduler calls its method
+        #  @c service(task_list, ran) with this task list and whether a task
+        #  ran; see @c Garbage_Collector.GarbageCollector.
+        self.gc_policy = None
+
     ## Append a task to the task list. The list will be sorted by task
     #  priorities so that the scheduler can quickly find the highest priority
     #  task which is ready to run at any given time.
@@ -321,6 +834,67 @@ class TaskList:
         # Make sure the main list (of lists at each priority) is sorted
         self.pri_list.sort(key=lambda pri: pri[0], reverse=True)
 
+        # Timed tasks go into the deadline heap; the others are kept in
+        # priority order to be run when no timed task is due
+        if task.period:
+            self.edf_heap.append(task)
+            self._sift_up(len(self.edf_heap) - 1)
+        else:
+            self.edf_idle.append(task)
+            self.edf_idle.sort(key=lambda tsk: tsk.priority, reverse=True)
+
+        # Keep the frame order with producers ahead of their consumers
+        self.frame_list.append(task)
+        self._sort_frame()
+
+        # If a timeline is being kept, log this task's runs in it too
+        if self.timeline:
+            task._timeline = self.timeline
+            task._tl_id = self.timeline.add_task(task.name)
+
+        # Let the task be moved in the deadline order if its period is set
+        task._task_list = self
+
+    ## Sort @c frame_list. Tasks linked by @c after, directly or through
+    #  other tasks, form a chain which is placed at the highest priority of
+    #  any task in it; within a chain, tasks go in order of depth and then
+    #  of priority. So priority decides the order between tasks which
+    #  aren't linked, and a ready background task never runs ahead of a
+    #  chain of higher priority.
+    def _sort_frame(self):
+        chain = {task: [task] for task in self.frame_list}
+        for task in self.frame_list:
+            for pred in task._after:
+                if pred in chain and chain[pred] is not chain[task]:
+                    merged = chain[pred] + chain[task]
+                    for member in merged:
+                        chain[member] = merged
+
+        # Chains of the same priority keep the order they were first met in
+        chains = []
+        for task in self.frame_list:
+            if not any(chain[task] is other for other in chains):
+                chains.append(chain[task])
+        key = {}
+        for num, members in enumerate(chains):
+            top = max(member.priority for member in members)
+            for member in members:
+                key[member] = (-top, num, member.depth, -member.priority)
+        self.frame_list.sort(key=lambda tsk: key[tsk])
+
+    ## Start logging every run of every task, including tasks appended
+    #  later, in a new @c Timeline. The timeline's buffers are allocated
+    #  here, so this should be called before the scheduler starts.
+    #  @param length The number of task runs to keep
+    #  @return The new timeline
+    def record_timeline(self, length):
+        self.timeline = Timeline(length)
+        for pri in self.pri_list:
+            for task in pri[2:]:
+                task._timeline = self.timeline
+                task._tl_id = self.timeline.add_task(task.name)
+        return self.timeline
+
     ## Run tasks in order, ignoring the tasks' priorities.
     #
     #  This scheduling method runs tasks in a round-robin fashion. Each
@@ -330,20 +904,27 @@ class TaskList:
     #  tasks are given a chance to run each time through the list, and it takes
     #  about the same amount of time before each is given a chance to run
     #  again.
+    #  @return @c True if any task ran or @c False if none was ready
     @micropython.native
-    def rr_sched(self):
+    def rr_sched(self) -> bool:
         # For each priority level, run all tasks at that level
+        ran = False
         for pri in self.pri_list:
             for task in pri[2:]:
-                task.schedule()
+                if task.schedule():
+                    ran = True
+        if self.gc_policy:
+            self.gc_policy.service(self, ran)
+        return ran
 
     ## Run tasks according to their priorities.
     #
     #  This scheduler runs tasks in a priority based fashion. Each time it is
     #  called, it finds the highest priority task which is ready to run and
     #  calls that task's @c run() method.
+    #  @return @c True if a task ran or @c False if none was ready
     @micropython.native
-    def pri_sched(self):
+    def pri_sched(self) -> bool:
         # Go down the list of priorities, beginning with the highest
         for pri in self.pri_list:
             # Within each priority list, run tasks in round-robin order
@@ -358,7 +939,187 @@ class TaskList:
                 if pri[1] >= length:
                     pri[1] = 2
                 if ran:
-                    return
+                    if self.gc_policy:
+                        self.gc_policy.service(self, True)
+                    return True
+        if self.gc_policy:
+            self.gc_policy.service(self, False)
+        return False
+
+    ## Run tasks in dataflow order within each frame.
+    #
+    #  This scheduler is meant for tasks which pass data along a chain, such
+    #  as sensor sampling, state estimation, path planning and motor
+    #  control, each given the task before it as @c after and a phase
+    #  offset within a common period. Each time it is called, it runs the
+    #  first ready task in @c frame_list, so a producer which is due always
+    #  runs before its consumers. A consumer whose producers haven't run yet
+    #  in the current frame isn't ready, so it acts on fresh data rather
+    #  than on data a frame old.
+    #  @return @c True if a task ran or @c False if none was ready
+    @micropython.native
+    def frame_sched(self) -> bool:
+        for task in self.frame_list:
+            if task.schedule():
+                if self.gc_policy:
+                    self.gc_policy.service(self, True)
+                return True
+        if self.gc_policy:
+            self.gc_policy.service(self, False)
+        return False
+
+    ## Run tasks in earliest-deadline-first order.
+    #
+    #  This scheduler keeps timed tasks in a heap sorted by the time at which
+    #  each one is next due to run. Each time it is called, only the task at
+    #  the top of the heap is checked; if it is due, it is run and then moved
+    #  down the heap to its new place. Only if no timed task is due does the
+    #  scheduler give one of the tasks without a period a chance to run.
+    #  Tasks which are due at the same time run in order of priority.
+    #  Since only the earliest task is checked, a task waiting for a task it
+    #  depends on (see the @c after parameter of @c Task) holds up the other
+    #  timed tasks; use @c frame_sched() for chains of dependent tasks.
+    #  @return @c True if a task ran or @c False if none was ready
+    @micropython.native
+    def edf_sched(self) -> bool:
+        heap = self.edf_heap
+        if heap and heap[0].schedule():
+            self._sift_down(0)
+            if self.gc_policy:
+                self.gc_policy.service(self, True)
+            return True
+
+        # No timed task is due, so try the untimed tasks in round-robin order
+        idle = self.edf_idle
+        length = len(idle)
+        tries = 0
+        while tries < length:
+            task = idle[self._idle_idx]
+            self._idle_idx += 1
+            if self._idle_idx >= length:
+                self._idle_idx = 0
+            if task.schedule():
+                if self.gc_policy:
+                    self.gc_policy.service(self, True)
+                return True
+            tries += 1
+        if self.gc_policy:
+            self.gc_policy.service(self, False)
+        return False
+
+    ## Move a task whose period has been set into the deadline heap if it
+    #  is now timed, or into the untimed tasks if it isn't. This is called
+    #  by @c Task.set_period().
+    #  @param task The task whose period was set
+    def _rehome(self, task):
+        heap = self.edf_heap
+        if task.period:
+            if task in self.edf_idle:
+                self.edf_idle.remove(task)
+                self._idle_idx = 0
+                heap.append(task)
+                self._sift_up(len(heap) - 1)
+        elif task in heap:
+            # Fill the task's place with the last task in the heap, and move
+            # that one up or down to its own place
+            idx = heap.index(task)
+            last = heap.pop()
+            if idx < len(heap):
+                heap[idx] = last
+                self._sift_down(idx)
+                self._sift_up(idx)
+            self.edf_idle.append(task)
+            self.edf_idle.sort(key=lambda tsk: tsk.priority, reverse=True)
+            self._idle_idx = 0
+
+    ## Find the time at which the next timed task is due to run.
+    #  A simulated clock can jump straight to this time when no task is
+    #  ready, rather than stepping through the idle time in between.
+    #  @param above If given, only tasks of a higher priority than this are
+    #         counted
+    #  @return The @c ticks_us() time at which the earliest timed task is
+    #          next due, or @c None if there are no timed tasks
+    def next_deadline(self, above=None):
+        soonest = None
+        for pri in self.pri_list:
+            if above is not None and pri[0] <= above:
+                break
+            for task in pri[2:]:
+                if task.period and (soonest is None or utime.ticks_diff(task._next_run, soonest) < 0):
+                    soonest = task._next_run
+        return soonest
+
+    ## Find how long the scheduler can be kept busy with something else
+    #  before the next timed task is due to run.
+    #
+    #  A background task working in the slack passes its own priority as
+    #  @c above, so other background tasks due at the same time, which can
+    #  wait for it, don't leave it no slack at all.
+    #  @param above If given, only tasks of a higher priority than this are
+    #         counted
+    #  @return The time in microseconds until the next timed task is due,
+    #          which is negative if one is already late, or @c None if there
+    #          are no timed tasks
+    def slack(self, above=None):
+        deadline = self.next_deadline(above)
+        if deadline is None:
+            return None
+        return utime.ticks_diff(deadline, _clock())
+
+    ## Move the task at index @c idx up the deadline heap to its place.
+    #  @param idx The index in @c edf_heap of the task to be moved
+    @micropython.native
+    def _sift_up(self, idx):
+        heap = self.edf_heap
+        task = heap[idx]
+        while idx > 0:
+            parent = (idx - 1) >> 1
+            if not _runs_before(task, heap[parent]):
+                break
+            heap[idx] = heap[parent]
+            idx = parent
+        heap[idx] = task
+
+    ## Move the task at index @c idx down the deadline heap to its place.
+    #  @param idx The index in @c edf_heap of the task to be moved
+    @micropython.native
+    def _sift_down(self, idx):
+        heap = self.edf_heap
+        length = len(heap)
+        task = heap[idx]
+        while True:
+            child = 2 * idx + 1
+            if child >= length:
+                break
+            if child + 1 < length and _runs_before(heap[child + 1], heap[child]):
+                child += 1
+            if not _runs_before(heap[child], task):
+                break
+            heap[idx] = heap[child]
+            idx = child
+        heap[idx] = task
+
+    ## Start a new profiling window by resetting the profiles of all the
+    #  tasks in the list. Calling this at the start of a stretch of interest,
+    #  such as one Path Director segment, makes the next printout of the task
+    #  list cover only that stretch.
+    def reset_profile(self):
+        for pri in self.pri_list:
+            for task in pri[2:]:
+                task.reset_profile()
+        self._window_start = _clock()
+
+    ## Write the transition traces of all the traced tasks in the list to a
+    #  stream, one after another, in the binary form described at
+    #  @c TRACE_HEADER, followed by the timeline if one is being kept. The
+    #  host tool @c Trace_Tools.py decodes the result.
+    #  @param stream Something with a @c write() method, such as a UART
+    def dump_trace(self, stream):
+        for pri in self.pri_list:
+            for task in pri[2:]:
+                task.dump_trace(stream)
+        if self.timeline:
+            self.timeline.dump(stream)
 
     ## Create some diagnostic text showing the tasks in the task list.
     def __repr__(self):
@@ -367,6 +1128,39 @@ class TaskList:
             for task in pri[2:]:
                 ret_str += str(task) + "\n"
 
+        window = utime.ticks_diff(_clock(), self._window_start) / 1000.0
+        ret_str += f"\nPERCENTILES OVER {window:.1f} ms    DUR P50   DUR P95   DUR P99  LATE P50  LATE P95  LATE P99\n"
+        for pri in self.pri_list:
+            for task in pri[2:]:
+                ret_str += task.percentiles() + "\n"
+
+        chains = ""
+        for pri in self.pri_list:
+            for task in pri[2:]:
+                if task.latency():
+                    chains += task.latency() + "\n"
+        if chains:
+            ret_str += "\nSAMPLE TO OUTPUT         RUNS   AVG LAT   P95 LAT   MAX LAT   WAITS  MISSED\n" + chains
+
+        overruns = ""
+        for pri in self.pri_list:
+            for task in pri[2:]:
+                if task.overruns():
+                    overruns += task.overruns() + "\n"
+        if overruns:
+            ret_str += "\nOVERRUNS            POLICY  OVERRUNS   SKIPPED\n" + overruns
+
+        budgets = ""
+        for pri in self.pri_list:
+            for task in pri[2:]:
+                if task.violations():
+                    budgets += task.violations() + "\n"
+        if budgets:
+            ret_str += "\nBUDGETS             BUDGET      OVER  MAX OVER\n" + budgets
+
+        if self.gc_policy:
+            ret_str += "\n" + str(self.gc_policy)
+
         return ret_str
 
 
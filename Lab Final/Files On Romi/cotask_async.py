@@ -0,0 +1,119 @@
+## @file cotask_async.py
+#  Runs the tasks in a @c cotask.TaskList as @c asyncio coroutines instead of
+#  with one of the @c TaskList scheduler loops, so the two can be compared
+#  without rewriting any task.
+#
+#  Each @c cotask.Task is wrapped in a coroutine which sleeps until the
+#  task is next due and then calls the task's @c schedule() method, so the
+#  generator, profiling, tracing and dependency logic in @c cotask are used
+#  unchanged. @c asyncio has no priorities, so they are emulated: a task
+#  which comes due steps aside, by yielding to the event loop, for as long
+#  as a higher priority task is also due. A coroutine of lowest standing
+#  services the task list's garbage collection policy whenever the other
+#  coroutines are all asleep.
+#
+#  Under MicroPython this uses @c asyncio (formerly @c uasyncio); under
+#  CPython it uses the standard @c asyncio, so it can be tried off-target
+#  with the stand-ins in @c Host Tools.
+#
+#  @author Antonio Ventimiglia
+#  @author Caiden Bonney
+#  @date   2025-Dec-12
+#  @copyright GPLv3
+
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio  # pyright: ignore
+
+import utime
+import cotask
+
+
+# Sleep for a number of microseconds, to the resolution the event loop has;
+# MicroPython's asyncio counts in milliseconds, CPython's in seconds
+async def _sleep_us(us):
+    if us <= 0:
+        await asyncio.sleep(0)
+    elif hasattr(asyncio, "sleep_ms"):
+        await asyncio.sleep_ms(us // 1000)
+    else:
+        await asyncio.sleep(us / 1_000_000)
+
+
+## Check whether a task of higher priority than the given one is due. A
+#  task held up waiting for a task it depends on doesn't count, since the
+#  task it waits for may be of lower priority.
+#  @param task The task about to run
+#  @param tasks All the tasks, highest priority first
+#  @return @c True if a higher priority task should run first
+def _outranked(task, tasks) -> bool:
+    now = cotask._clock()
+    for other in tasks:
+        if other.priority <= task.priority:
+            return False
+        if other.go_flag:
+            return True
+        if other.period is not None and not other._waiting and utime.ticks_diff(now, other._next_run) > 0:
+            return True
+    return False
+
+
+## Coroutine which runs one task whenever it is due.
+#  @param task The @c cotask.Task to run
+#  @param tasks All the tasks, highest priority first
+async def task_coro(task, tasks):
+    while True:
+        # Sleep until the task is due, or check its go flag between other
+        # coroutines if it isn't run by a timer
+        if task.period:
+            await _sleep_us(utime.ticks_diff(task._next_run, cotask._clock()))
+        else:
+            await asyncio.sleep(0)
+
+        # Let higher priority tasks which are also due go first
+        while _outranked(task, tasks):
+            await asyncio.sleep(0)
+
+        # Run the task if it's ready. A task waiting on another task it
+        # depends on isn't ready, and it's tried again on the next pass
+        task.schedule()
+
+
+## Coroutine which runs the garbage collection policy in idle time.
+#  @param task_list The task list whose @c gc_policy is serviced
+async def idle_coro(task_list):
+    while True:
+        await asyncio.sleep(0)
+        if task_list.gc_policy:
+            task_list.gc_policy.service(task_list, False)
+
+
+## Coroutine which runs all the tasks in a task list.
+#  @param task_list The @c cotask.TaskList whose tasks are run
+#  @param duration_ms How long to run [ms], or @c None to run forever
+async def run_tasks(task_list, duration_ms=None):
+    tasks = []
+    for pri in task_list.pri_list:
+        tasks.extend(pri[2:])
+    coros = [asyncio.create_task(task_coro(task, tasks)) for task in tasks]
+    coros.append(asyncio.create_task(idle_coro(task_list)))
+    try:
+        if duration_ms is None:
+            await asyncio.gather(*coros)
+        else:
+            await _sleep_us(duration_ms * 1000)
+    finally:
+        for coro in coros:
+            coro.cancel()
+
+
+## Run all the tasks in a task list with @c asyncio, in place of a loop
+#  which calls one of the @c TaskList schedulers.
+#  @param task_list The @c cotask.TaskList whose tasks are run, by default
+#         @c cotask.task_list
+#  @param duration_ms How long to run [ms], or @c None to run forever
+def run(task_list=None, duration_ms=None):
+    if task_list is None:
+        task_list = cotask.task_list
+    asyncio.run(run_tasks(task_list, duration_ms))
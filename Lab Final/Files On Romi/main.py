@@ -9,7 +9,7 @@
 from pyb import Pin, Timer, ADC, I2C, UART  # pyright: ignore
 import cotask
 import task_share
-from gc import collect
+from gc import collect, mem_free
 
 from Romi_Props import RomiProps
 from Motor import Motor
@@ -99,15 +99,9 @@ if __name__ == "__main__":
     cal_white_s = task_share.Share("B", thread_protect=True, name="white calibration share")
     cal_black_s = task_share.Share("B", thread_protect=True, name="black calibration share")
     set_seg_s = task_share.Share("H", thread_protect=True, name="new segment share")
-    seg_start_s = task_share.Share("B", thread_protect=True, name="segment start share")
-    obsd_lpos_s = task_share.Share("f", thread_protect=False, name="Observed left position share")
-    obsd_rpos_s = task_share.Share("f", thread_protect=False, name="Observed right position share")
-    obsd_cpos_s = task_share.Share("f", thread_protect=False, name="Observed center position share")
-    obsd_yaw_s = task_share.Share("f", thread_protect=False, name="Observed yaw share")
-    obsd_yawrate_s = task_share.Share("f", thread_protect=False, name="Observed yawrate share")
-    obsd_X_s = task_share.Share("f", thread_protect=False, name="Observed X position share")
-    obsd_Y_s = task_share.Share("f", thread_protect=False, name="Observed Y position share")
-    dist_yaw_s = task_share.Share("f", thread_protect=False, name="distance derived yaw share")
+    # Signalled by the path director at the start of each segment, and seen
+    # once by each motor controller (0 is the left one, 1 the right one)
+    seg_start_e = task_share.Event(2, name="segment start event")
 
     ## Create objects of each task for the Task objects
     # Collect garbage data for defragmentation before large imports and object creation
@@ -120,26 +114,80 @@ if __name__ == "__main__":
     from Observer import Observer
     from Motor_Controller import MotorController
     from Garbage_Collector import GarbageCollector
+    from Status_Reporter import StatusReporter
+    from UART_Sender import UARTSender
+    from Data_Logger import DataLogger
+    from Flight_Log import FlightLog
+    from Subscriptions import Subscriptions
+    from Sensor import Sensor
 
     collect()
 
-    user_input_obj = UserInput(button_pin, Battery_obj)
+    # The observed state is one record, published and read all at once; its
+    # field names come from the observer, so it's made after the import
+    obsd_pose_s = task_share.StructShare(Observer.POSE_FIELDS, "f", thread_protect=False, name="Observed pose share")
+
+    # The priority of the background tasks. Those which fit their work into
+    # the slack before the next deadline are told it, so that only the
+    # deadlines of the tasks above them count
+    BACKGROUND_PRIORITY = 0
+
+    # Replies, telemetry and gain changes are queued and sent over Bluetooth
+    # a little at a time by a task of their own, so no task waits on the UART
+    uart_sender_obj = UARTSender(UART(5, 115200), task_list=cotask.task_list, priority=BACKGROUND_PRIORITY)
+
+    # The motor controllers' samples are recorded into arrays allocated now,
+    # so check the memory they take against what is free before choosing
+    # how many samples to keep
+    LOG_SAMPLES = 250
+    collect()
+    print(f"Data logger needs {DataLogger.size(LOG_SAMPLES)} bytes of {mem_free()} free")
+    data_logger_obj = DataLogger(LOG_SAMPLES)
+
+    status_reporter_obj = StatusReporter(cotask.task_list, uart_sender_obj, priority=BACKGROUND_PRIORITY)
     observer_obj = Observer(IMU_obj, l_encoder, r_encoder, Battery_obj)
-    path_director_obj = PathDirector(Linesensor, IMU_obj, bump_sensors)
-    LMC_obj = MotorController(l_motor, l_encoder, Battery_obj, False)  # False = left
-    RMC_obj = MotorController(r_motor, r_encoder, Battery_obj, True)  # True = right
+    path_director_obj = PathDirector(Linesensor, IMU_obj, bump_sensors, port=uart_sender_obj)
+
+    # Gain changes and subscriptions go out through the path director's
+    # telemetry, so every frame on the Bluetooth stream is numbered in one
+    # sequence and the host can tell when frames are lost
+    Sensor.telemetry = path_director_obj.telemetry
+
+    # Shares the host can subscribe to with the t command, each at a rate of
+    # its own; all the subscriptions together may use half of what the UART
+    # sender sends, leaving the rest for replies and other telemetry
+    subscriptions_obj = Subscriptions(path_director_obj.telemetry, period=20, budget=uart_sender_obj.slot_bytes * 1000 // 20 // 2)
+    subscriptions_obj.add_fields("obsd_{}_s", obsd_pose_s)
+    subscriptions_obj.add("l_speed_s", l_speed_s)
+    subscriptions_obj.add("r_speed_s", r_speed_s)
+    subscriptions_obj.add("l_flag_s", l_flag_s)
+    subscriptions_obj.add("r_flag_s", r_flag_s)
+    subscriptions_obj.add("set_seg_s", set_seg_s)
+
+    user_input_obj = UserInput(
+        button_pin, Battery_obj, status_reporter_obj, port=uart_sender_obj, logger=data_logger_obj, subscriptions=subscriptions_obj
+    )
+    LMC_obj = MotorController(l_motor, l_encoder, Battery_obj, False, logger=data_logger_obj)  # False = left
+    RMC_obj = MotorController(r_motor, r_encoder, Battery_obj, True, logger=data_logger_obj)  # True = right
     garbage_collector_obj = GarbageCollector()
 
+    # Every frame's state is appended to flight.log in flash, in compressed
+    # blocks written only when there's time before the next deadline
+    flight_log_obj = FlightLog(
+        (l_encoder, r_encoder), IMU_obj, (LMC_obj, RMC_obj), path_director_obj.Line_CLC, cotask.task_list, priority=BACKGROUND_PRIORITY
+    )
+
     ## Create Task objects
-    # Create the tasks. If trace is enabled for any task, memory will be
-    # allocated for state transition tracing, and the application will run out
-    # of memory after a while and quit. Therefore, use tracing only for
-    # debugging and set trace to False when it's not needed
+    # Create the tasks. If trace is enabled for any task, a fixed ring buffer
+    # holding that task's most recent state transitions is allocated here;
+    # set trace to a number to keep more than cotask.TRACE_LEN transitions
     task_User_Input = cotask.Task(
         user_input_obj.run,
         name="User Input Task      ",
         priority=10,
         period=100,
+        overrun=cotask.RESET,
+        budget=2,
         profile=True,
         trace=False,
         shares=(
@@ -159,24 +207,31 @@ if __name__ == "__main__":
         name="Observer Task        ",
         priority=4,
         period=20,
+        overrun=cotask.SKIP,
+        budget=8,
+        degrade=observer_obj.degrade,
         profile=True,
         trace=False,
-        shares=(
-            obsd_lpos_s,
-            obsd_rpos_s,
-            obsd_cpos_s,
-            obsd_yaw_s,
-            obsd_yawrate_s,
-            obsd_X_s,
-            obsd_Y_s,
-            dist_yaw_s,
-        ),
+        shares=(obsd_pose_s,),
     )
+    # The observer, path director and motor controllers run in that order in
+    # each 20 ms frame, so the motors act on the pose estimated in the same
+    # frame. Each phase is set a little past when its producer should finish.
+    # After a stall, such as a long IMU calibration, each skips the frames it
+    # missed rather than running back to back, so the chain stays in phase.
+    # Every task has a time budget; after a run over budget the observer skips
+    # its next pose update and the path director holds its last command, so
+    # the motor controllers keep to their 20 ms frame
     task_Path_Director = cotask.Task(
         path_director_obj.run,
         name="Path Director Task   ",
         priority=3,
-        period=30,
+        period=20,
+        phase=5,
+        overrun=cotask.SKIP,
+        budget=3,
+        degrade=path_director_obj.degrade,
+        after=task_Observer,
         profile=True,
         trace=False,
         shares=(
@@ -189,15 +244,8 @@ if __name__ == "__main__":
             cal_white_s,
             cal_black_s,
             set_seg_s,
-            seg_start_s,
-            obsd_lpos_s,
-            obsd_rpos_s,
-            obsd_cpos_s,
-            obsd_yaw_s,
-            obsd_yawrate_s,
-            obsd_X_s,
-            obsd_Y_s,
-            dist_yaw_s,
+            seg_start_e,
+            obsd_pose_s,
         ),
     )
     task_LMC = cotask.Task(
@@ -205,35 +253,115 @@ if __name__ == "__main__":
         name="Left Motor Cont Task ",
         priority=2,
         period=20,
+        phase=6,
+        overrun=cotask.SKIP,
+        budget=2,
+        after=task_Path_Director,
         profile=True,
         trace=False,
-        shares=(l_flag_s, l_speed_s, data_transfer_s, test_complete_s, seg_start_s),
+        shares=(l_flag_s, l_speed_s, data_transfer_s, test_complete_s, seg_start_e),
     )
     task_RMC = cotask.Task(
         RMC_obj.run,
         name="Right Motor Cont Task",
         priority=2,
         period=20,
+        phase=6,
+        overrun=cotask.SKIP,
+        budget=2,
+        after=task_Path_Director,
         profile=True,
         trace=False,
-        shares=(r_flag_s, r_speed_s, data_transfer_s, test_complete_s, seg_start_s),
+        shares=(r_flag_s, r_speed_s, data_transfer_s, test_complete_s, seg_start_e),
     )
-    task_Garbage_Collection = cotask.Task(
-        garbage_collector_obj.run,
-        name="Garbage Collect Task ",
-        priority=0,
-        period=0,
+
+    # Sends status snapshots asked for over Bluetooth; its phase puts it in
+    # the quiet part of each frame, after the motor controllers are done
+    task_Status_Reporter = cotask.Task(
+        status_reporter_obj.run,
+        name="Status Reporter Task ",
+        priority=BACKGROUND_PRIORITY,
+        period=20,
+        phase=10,
+        overrun=cotask.SKIP,
+        budget=2,
         profile=True,
         trace=False,
         shares=None,
     )
 
+    # Reads the subscribed shares once the motor controllers have acted in
+    # each frame, and queues them for the UART sender
+    task_Subscriptions = cotask.Task(
+        subscriptions_obj.run,
+        name="Subscriptions Task   ",
+        priority=BACKGROUND_PRIORITY,
+        period=20,
+        phase=10,
+        overrun=cotask.SKIP,
+        budget=2,
+        profile=True,
+        trace=False,
+    )
+
+    # Sends what the other tasks queued for the UART, in whatever time is
+    # left in each frame after the motor controllers
+    task_UART_Sender = cotask.Task(
+        uart_sender_obj.run,
+        name="UART Sender Task     ",
+        priority=BACKGROUND_PRIORITY,
+        period=20,
+        phase=14,
+        overrun=cotask.SKIP,
+        budget=3,
+        profile=True,
+        trace=False,
+    )
+
+    # Samples the state after the control tasks have run in each frame, and
+    # writes a full page of samples to flash when it fits in the slack left
+    # before the next deadline. Its phase leaves the end of the frame free
+    # for garbage collection. Its runs which write take longer than the
+    # others, so it has no budget
+    task_Flight_Log = cotask.Task(
+        flight_log_obj.run,
+        name="Flight Log Task      ",
+        priority=BACKGROUND_PRIORITY,
+        period=20,
+        phase=14,
+        overrun=cotask.SKIP,
+        profile=True,
+        trace=False,
+        shares=(obsd_pose_s,),
+    )
+
     cotask.task_list.append(task_User_Input)
     cotask.task_list.append(task_Observer)
     cotask.task_list.append(task_Path_Director)
     cotask.task_list.append(task_LMC)
     cotask.task_list.append(task_RMC)
-    cotask.task_list.append(task_Garbage_Collection)
+    cotask.task_list.append(task_Status_Reporter)
+    cotask.task_list.append(task_Subscriptions)
+    cotask.task_list.append(task_UART_Sender)
+    cotask.task_list.append(task_Flight_Log)
+
+    # Collect garbage only when it fits before the next task deadline, or
+    # when free memory runs low, rather than in a task of its own
+    cotask.task_list.gc_policy = garbage_collector_obj
+
+    # Uncomment to log every task run (11 bytes each) for a timeline which
+    # Host Tools/Trace_Tools.py converts for Perfetto; dump it as shown below
+    # cotask.task_list.record_timeline(1000)
+
+    # Set to sample the running task and state about 1000 times a second on
+    # timer 7, into 12 kB of buffers. The profiler is made once every task
+    # is in the list, and the m command starts, stops and dumps it; decode
+    # the dump with Host Tools/Sample_Profile.py
+    SAMPLE_PROFILE = False
+    if SAMPLE_PROFILE:
+        from Sampling_Profiler import SamplingProfiler
+
+        user_input_obj.profiler = SamplingProfiler(cotask.task_list)
 
     # Run the memory garbage collector to ensure memory is as defragmented as
     # possible before the real-time scheduler is started
@@ -242,7 +370,7 @@ if __name__ == "__main__":
     # Run the scheduler with the chosen scheduling algorithm. Quit if ^C pressed
     while True:
         try:
-            cotask.task_list.pri_sched()
+            cotask.task_list.frame_sched()
         except BaseException as e:
             uart = UART(5, 115200)
             
@@ -257,9 +385,17 @@ if __name__ == "__main__":
             LMC_obj.motor.set_effort(0)
             RMC_obj.motor.set_effort(0)
 
+            # The scheduler has stopped, so the last samples can be written
+            # without holding up any task
+            flight_log_obj.close()
+
             # Print a table of task data and a table of shared information data
             print("\n" + str(cotask.task_list))
             print(task_share.show_all())
+            print(uart_sender_obj)
+            print(data_logger_obj)
+            print(flight_log_obj)
+            print(subscriptions_obj)
             # print(task_User_Input.get_trace())
             # print("")
             # print(task_Observer.get_trace())
@@ -270,8 +406,7 @@ if __name__ == "__main__":
             # print("")
             # print(task_RMC.get_trace())
             # print("")
-            # print(task_Garbage_Collection.get_trace())
-            # print("")
+            # cotask.task_list.dump_trace(uart)  # traces and timeline; decode with Host Tools/Trace_Tools.py
 
             # Print the current battery voltage and percentage after every error including keyboard interrupts
             print(f"Battery - %:{Battery_obj.get_cur_perc()}, V:{Battery_obj.get_cur_volt()}\n")
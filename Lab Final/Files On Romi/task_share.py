@@ -24,6 +24,7 @@
 import array
 import gc
 import pyb
+import utime
 import micropython
 
 
@@ -31,6 +32,36 @@ import micropython
 #  used to create diagnostic printouts.
 share_list = []
 
+## Whether queues and shares count their reads and writes unless told
+#  otherwise when they're created. Counting costs time and a little memory
+#  on every access, so it is off by default and an ordinary build pays
+#  nothing for it; set this to @c True before creating the shares, or pass
+#  @c stats=True to the ones of interest, to find the shares which are used
+#  most.
+#
+#  Statistics must not be kept for a queue or share which an ISR writes or
+#  reads. The counts are updated without disabling interrupts, so an ISR
+#  which interrupts a count loses one, and a write made by an ISR is put
+#  down to whichever task it interrupted.
+STATS = False
+
+# Stands for an argument which wasn't given to a counting method
+_NO_ARG = object()
+
+
+# Call a method with those of up to three positional arguments which were
+# given, followed by an in_ISR flag given by keyword if it's set. Passing
+# the arguments one by one, rather than as *args and **kwargs, means a
+# counting method allocates no memory
+def _forward(method, a, b, c, in_ISR):
+    if a is _NO_ARG:
+        return method(True) if in_ISR else method()
+    if b is _NO_ARG:
+        return method(a, True) if in_ISR else method(a)
+    if c is _NO_ARG:
+        return method(a, b, True) if in_ISR else method(a, b)
+    return method(a, b, c)
+
 ## This dictionary allows readable printouts of queue and share data types.
 type_code_strings = {
     "b": "int8",
@@ -50,9 +81,13 @@ type_code_strings = {
 
 ## Create a string holding a diagnostic printout showing the status of
 #  each queue and share in the system.
+#  @param values If @c True, also show the data each one holds now
 #  @return A string containing information about each queue and share
-def show_all():
-    gen = (str(item) for item in share_list)
+def show_all(values=False):
+    if values:
+        gen = (str(item) + item._value_text() for item in share_list)
+    else:
+        gen = (str(item) for item in share_list)
     return "\n".join(gen)
 
 
@@ -63,16 +98,131 @@ def show_all():
 #  classes @c Queue and @c Share.
 class BaseShare:
 
+    ## The names of the methods which write data, counted as writes when
+    #  statistics are kept.
+    _WRITERS = ()
+
+    ## The names of the methods which read data, counted as reads when
+    #  statistics are kept.
+    _READERS = ()
+
     ## Create a base queue object when called by a child class initializer.
     #
     #  This method creates the things which queues and shares have in common.
-    def __init__(self, type_code, thread_protect=True, name=None):
+    #  @param stats @c True to count reads and writes, @c False not to, or
+    #         @c None to follow @c task_share.STATS
+    def __init__(self, type_code, thread_protect=True, name=None, stats=None):
         self._type_code = type_code
         self._thread_protect = thread_protect
 
+        # Number of writes so far, kept below 2**30 so that it stays a small
+        # integer and counting never allocates memory, and the number of
+        # checks with @c changed_since() which found nothing new
+        self._version = 0
+        self._unchanged = 0
+
         # Add this queue to the global share and queue list
         share_list.append(self)
 
+        self._stats = STATS if stats is None else stats
+        if self._stats:
+            self._start_stats()
+
+    # Start counting reads and writes. The methods which read and write are
+    # replaced, for this object only, by ones which count and then do the
+    # same thing, so objects which don't count run exactly as before
+    def _start_stats(self):
+        import cotask
+
+        self._task_class = cotask.Task
+        self._reads = 0
+        self._writes = 0
+        self._first_write = 0
+        self._last_write = 0
+        self._last_writer = None
+        for method in self._WRITERS:
+            setattr(self, method, self._count_writes(getattr(self, method)))
+        for method in self._READERS:
+            setattr(self, method, self._count_reads(getattr(self, method)))
+
+    # Make a version of a method which counts each call as a write, noting
+    # when it was and which task made it. Every reading and writing method
+    # takes at most three arguments, the last of them in_ISR where it has
+    # one, so they're passed on one by one and the call allocates nothing
+    def _count_writes(self, method):
+        def counted(a=_NO_ARG, b=_NO_ARG, c=_NO_ARG, in_ISR=False):
+            now = utime.ticks_ms()
+            if self._writes == 0:
+                self._first_write = now
+            self._writes += 1
+            self._last_write = now
+            self._last_writer = self._task_class.running
+            return _forward(method, a, b, c, in_ISR)
+
+        return counted
+
+    # Make a version of a method which counts each call as a read
+    def _count_reads(self, method):
+        def counted(a=_NO_ARG, b=_NO_ARG, c=_NO_ARG, in_ISR=False):
+            self._reads += 1
+            return _forward(method, a, b, c, in_ISR)
+
+        return counted
+
+    # The statistics part of the diagnostic printout: the number of reads
+    # and writes, the average rate of writes, and the time of the last write
+    # and the task which made it
+    def _stats_text(self):
+        if not self._stats:
+            return ""
+        text = " Reads {:d} Writes {:d}".format(self._reads, self._writes)
+        if self._writes:
+            span = utime.ticks_diff(self._last_write, self._first_write)
+            if span > 0:
+                text += " Rate {:.1f}/s".format((self._writes - 1) * 1000 / span)
+            writer = self._last_writer.name if self._last_writer else "(none)"
+            text += " Last {:d} ms by {:s}".format(self._last_write, writer.strip())
+        return text
+
+    # The data held now, for the diagnostic printout; read without disabling
+    # interrupts or being counted, since it's only for show
+    def _value_text(self):
+        return ""
+
+    ## Get the version of the data, a number which goes up by one each time
+    #  data is written. It wraps around to zero after 2**30 writes, so
+    #  versions should only be compared for equality, as
+    #  @c changed_since() does.
+    #  @return The current version
+    @micropython.native
+    def version(self):
+        return self._version
+
+    ## Check whether data has been written since a version was read.
+    #
+    #  This lets a task skip work when nothing it depends on has changed,
+    #  rather than reading the data every run or having the writer raise a
+    #  flag which the reader clears:
+    #  @code
+    #     def some_task ():
+    #         seen = my_share.version ()
+    #         while True:
+    #             if my_share.changed_since (seen):
+    #                 seen = my_share.version ()
+    #                 do_something_with (my_share.get ())
+    #             yield 0
+    #  @endcode
+    #  Checks which find nothing new are counted and shown in the diagnostic
+    #  printout, as the number of reads which were saved.
+    #  @param version A version from @c version()
+    #  @return @c True if data has been written since @c version
+    @micropython.native
+    def changed_since(self, version):
+        if self._version != version:
+            return True
+        self._unchanged += 1
+        return False
+
 
 ## A queue which is used to transfer data from one task to another.
 #
@@ -100,6 +250,9 @@ class Queue(BaseShare):
     ## A counter used to give serial numbers to queues for diagnostic use.
     ser_num = 0
 
+    _WRITERS = ("put", "put_many")
+    _READERS = ("get", "get_into", "discard")
+
     ## Initialize a queue object to carry and buffer data between tasks.
     #
     #  This method sets up a queue by allocating memory for the contents and
@@ -125,9 +278,11 @@ class Queue(BaseShare):
     #         data if the queue becomes full
     #  @param name A short name for the queue, default @c QueueN where @c N
     #         is a serial number for the queue
-    def __init__(self, type_code, size, thread_protect=False, overwrite=False, name=None):
+    #  @param stats @c True to count reads and writes, @c False not to, or
+    #         @c None to follow @c task_share.STATS
+    def __init__(self, type_code, size, thread_protect=False, overwrite=False, name=None, stats=None):
         # First call the parent class initializer
-        super().__init__(type_code, thread_protect, name)
+        super().__init__(type_code, thread_protect, name, stats)
 
         self._size = size
         self._overwrite = overwrite
@@ -136,7 +291,7 @@ class Queue(BaseShare):
 
         # Allocate memory in which the queue's data will be stored
         try:
-            self._buffer = array.array(type_code, range(size))
+            self._buffer = array.array(type_code, (0 for _ in range(size)))
         except MemoryError:
             self._buffer = None
             raise
@@ -144,6 +299,10 @@ class Queue(BaseShare):
             self._buffer = None
             raise
 
+        # A view of the buffer through which runs of items are copied in and
+        # out in one block, and handed out by peek_view() without copying
+        self._view = memoryview(self._buffer)
+
         # Initialize pointers to be used for reading and writing data
         self.clear()
 
@@ -196,6 +355,7 @@ class Queue(BaseShare):
             self._num_items = self._size
         if self._num_items > self._max_full:  # Record maximum fillage
             self._max_full = self._num_items
+        self._version = (self._version + 1) & 0x3FFFFFFF
 
         # Re-enable interrupts
         if self._thread_protect and not in_ISR:
@@ -205,8 +365,9 @@ class Queue(BaseShare):
     #
     #  If there isn't anything in there, wait (blocking the calling process)
     #  until something becomes available. If non-blocking reads are needed,
-    #  one should call @c any() to check for items before attempting to read
-    #  from the queue. This is usually done in a low priority task:
+    #  one should use @c try_get(), or call @c any() to check for items
+    #  before attempting to read from the queue. This is usually done in a
+    #  low priority task:
     #  @code
     #     def some_task ():
     #         # Setup
@@ -245,6 +406,182 @@ class Queue(BaseShare):
 
         return to_return
 
+    ## Put an item into the queue if there's room, without waiting.
+    #
+    #  @param item The item to be placed into the queue
+    #  @param in_ISR Set this to @c True if calling from within an ISR
+    #  @return @c True if the item was put, @c False if the queue was full
+    #          and overwriting isn't allowed
+    @micropython.native
+    def try_put(self, item, in_ISR=False):
+        if self._num_items >= self._size and not self._overwrite:
+            return False
+        self.put(item, in_ISR)
+        return True
+
+    ## Read an item from the queue if there is one, without waiting.
+    #
+    #  @param default The value returned if the queue is empty
+    #  @param in_ISR Set this to @c True if calling from within an ISR
+    #  @return The oldest item in the queue, or @c default
+    @micropython.native
+    def try_get(self, default=None, in_ISR=False):
+        if self._num_items <= 0:
+            return default
+        return self.get(in_ISR)
+
+    ## Put a run of items into the queue at once.
+    #
+    #  The items are copied into the queue in at most two blocks, with
+    #  interrupts disabled once for the whole run rather than once per item,
+    #  so this suits a task or ISR which logs at a high rate. It never waits:
+    #  if there isn't room for all the items, as many as fit are put, unless
+    #  the @c overwrite constructor parameter was set to @c True, in which
+    #  case the oldest items are dropped to make room.
+    #  @code
+    #     samples = array.array ('f', range (16))
+    #     ...
+    #     put = my_queue.put_many (samples)
+    #     if put < len (samples):
+    #         count_dropped_samples (len (samples) - put)
+    #  @endcode
+    #  @param buffer An array or memoryview holding items of the queue's type
+    #  @param in_ISR Set this to @c True if calling from within an ISR
+    #  @return The number of items put into the queue
+    @micropython.native
+    def put_many(self, buffer, in_ISR=False):
+        src = memoryview(buffer)
+        count = len(src)
+
+        if self._thread_protect and not in_ISR:
+            irq_state = pyb.disable_irq()
+
+        room = self._size - self._num_items
+        if count > room:
+            if self._overwrite:
+                # Only the newest items fit if there are more than the queue
+                # holds; the oldest items in the queue make way for the rest
+                if count > self._size:
+                    src = src[count - self._size :]
+                    count = self._size
+                drop = count - room
+                self._rd_idx += drop
+                if self._rd_idx >= self._size:
+                    self._rd_idx -= self._size
+                self._num_items -= drop
+            else:
+                count = room
+
+        # Copy up to the end of the buffer, then any remainder to the start
+        first = self._size - self._wr_idx
+        if first > count:
+            first = count
+        if first > 0:
+            self._view[self._wr_idx : self._wr_idx + first] = src[:first]
+        if count > first:
+            self._view[: count - first] = src[first:count]
+
+        self._wr_idx += count
+        if self._wr_idx >= self._size:
+            self._wr_idx -= self._size
+        self._num_items += count
+        if self._num_items > self._max_full:
+            self._max_full = self._num_items
+        if count > 0:
+            self._version = (self._version + 1) & 0x3FFFFFFF
+
+        if self._thread_protect and not in_ISR:
+            pyb.enable_irq(irq_state)
+
+        return count
+
+    ## Read a run of items out of the queue at once, into a buffer allocated
+    #  beforehand.
+    #
+    #  As many items are read as the buffer holds or the queue has, oldest
+    #  first, copied in at most two blocks with interrupts disabled once. It
+    #  never waits for items to arrive.
+    #  @param out An array or memoryview of the queue's type, into which
+    #         items are copied from the start
+    #  @param in_ISR Set this to @c True if calling from within an ISR
+    #  @return The number of items read
+    @micropython.native
+    def get_into(self, out, in_ISR=False):
+        dest = memoryview(out)
+
+        if self._thread_protect and not in_ISR:
+            irq_state = pyb.disable_irq()
+
+        count = len(dest)
+        if count > self._num_items:
+            count = self._num_items
+
+        first = self._size - self._rd_idx
+        if first > count:
+            first = count
+        if first > 0:
+            dest[:first] = self._view[self._rd_idx : self._rd_idx + first]
+        if count > first:
+            dest[first:count] = self._view[: count - first]
+
+        self._rd_idx += count
+        if self._rd_idx >= self._size:
+            self._rd_idx -= self._size
+        self._num_items -= count
+
+        if self._thread_protect and not in_ISR:
+            pyb.enable_irq(irq_state)
+
+        return count
+
+    ## Look at the items in the queue without copying or removing them.
+    #
+    #  The items are in the queue's own buffer, which is a ring, so they may
+    #  run off its end and on from its start; they're returned as two views,
+    #  oldest items first, the second of which is empty unless the items
+    #  wrap around. A task can send the views straight to a UART or file,
+    #  then remove the items it sent with @c discard():
+    #  @code
+    #     first, second = my_queue.peek_view ()
+    #     sent = uart.write (first)
+    #     my_queue.discard (sent)
+    #  @endcode
+    #  The views point into the live buffer, so they should be used before
+    #  anything else is put into the queue, and a writer must not be allowed
+    #  to overwrite the items while they're being read.
+    #  @return A tuple of two memoryviews of the queue's items
+    @micropython.native
+    def peek_view(self):
+        count = self._num_items
+        first = self._size - self._rd_idx
+        if first > count:
+            first = count
+        return (self._view[self._rd_idx : self._rd_idx + first], self._view[: count - first])
+
+    ## Remove items from the queue without reading them, such as items
+    #  already used through @c peek_view().
+    #
+    #  @param count The number of oldest items to remove
+    #  @param in_ISR Set this to @c True if calling from within an ISR
+    #  @return The number of items removed, which is less than @c count if
+    #          the queue didn't hold that many
+    @micropython.native
+    def discard(self, count, in_ISR=False):
+        if self._thread_protect and not in_ISR:
+            irq_state = pyb.disable_irq()
+
+        if count > self._num_items:
+            count = self._num_items
+        self._rd_idx += count
+        if self._rd_idx >= self._size:
+            self._rd_idx -= self._size
+        self._num_items -= count
+
+        if self._thread_protect and not in_ISR:
+            pyb.enable_irq(irq_state)
+
+        return count
+
     ## Check if there are any items in the queue.
     #
     #  Returns @c True if there are any items in the queue and @c False
@@ -290,12 +627,19 @@ class Queue(BaseShare):
 
     ## This method puts diagnostic information about the queue into a string.
     #
-    #  It shows the queue's name and type as well as the maximum number of
-    #  items and queue size.
+    #  It shows the queue's name and type, the maximum number of items and
+    #  queue size, the version and number of unchanged checks, and the
+    #  statistics if they're kept.
     def __repr__(self):
-        return "{:<12s} Queue<{:s}> Max Full {:d}/{:d}".format(
-            self._name, type_code_strings[self._type_code], self._max_full, self._size
-        )
+        return "{:<12s} Queue<{:s}> Max Full {:d}/{:d} Version {:d} Unchanged {:d}".format(
+            self._name, type_code_strings[self._type_code], self._max_full, self._size, self._version, self._unchanged
+        ) + self._stats_text()
+
+    # The items in the queue, oldest first, up to eight of them
+    def _value_text(self):
+        first, second = self.peek_view()
+        items = (list(first) + list(second))[:8]
+        return " = {}{}".format(items, " ..." if self._num_items > 8 else "")
 
 
 # ============================================================================
@@ -326,6 +670,9 @@ class Share(BaseShare):
     ## A counter used to give serial numbers to shares for diagnostic use.
     ser_num = 0
 
+    _WRITERS = ("put",)
+    _READERS = ("get",)
+
     ## Create a shared data item used to transfer data between tasks.
     #
     #  This method allocates memory in which the shared data will be buffered.
@@ -347,9 +694,11 @@ class Share(BaseShare):
     #  @param thread_protect True if mutual exclusion protection is used
     #  @param name A short name for the share, default @c ShareN where @c N
     #         is a serial number for the share
-    def __init__(self, type_code, thread_protect=True, name=None):
+    #  @param stats @c True to count reads and writes, @c False not to, or
+    #         @c None to follow @c task_share.STATS
+    def __init__(self, type_code, thread_protect=True, name=None, stats=None):
         # First call the parent class initializer
-        super().__init__(type_code, thread_protect, name)
+        super().__init__(type_code, thread_protect, name, stats)
 
         self._buffer = array.array(type_code, [0])
 
@@ -372,6 +721,7 @@ class Share(BaseShare):
             irq_state = pyb.disable_irq()
 
         self._buffer[0] = data
+        self._version = (self._version + 1) & 0x3FFFFFFF
 
         # Re-enable interrupts
         if self._thread_protect and not in_ISR:
@@ -399,6 +749,578 @@ class Share(BaseShare):
 
     ## Puts diagnostic information about the share into a string.
     #
-    #  Shares are pretty simple, so we just put the name and type.
+    #  Shares are pretty simple, so we just put the name and type, the
+    #  version and number of unchanged checks, and the statistics if they're
+    #  kept.
     def __repr__(self):
-        return "{:<12s} Share<{:s}>".format(self._name, type_code_strings[self._type_code])
+        return "{:<12s} Share<{:s}> Version {:d} Unchanged {:d}".format(
+            self._name, type_code_strings[self._type_code], self._version, self._unchanged
+        ) + self._stats_text()
+
+    def _value_text(self):
+        return " = {}".format(self._buffer[0])
+
+
+# ============================================================================
+
+
+## A record of several values of the same type, such as the fields of a state
+#  vector, shared between tasks as one item.
+#
+#  The whole record is written or read at once with interrupts disabled only
+#  once, so a reader always sees values which were all written together. A
+#  writer fills, and a reader copies the record into, a buffer allocated
+#  beforehand with @c new_buffer(), and the fields are read from that copy by
+#  number. The record is copied with one slice assignment between arrays of
+#  the same type, which is a single block copy; since MicroPython 1.22 the
+#  slice is made on the stack, so copying never allocates memory.
+#
+#  An example of the creation and use of a record share is as follows:
+#  @code
+#  import task_share
+#
+#  # This record holds three floats; the field numbers are found by name
+#  pose_share = task_share.StructShare (("X", "Y", "yaw"), name="Pose")
+#  X = pose_share.index ("X")
+#
+#  # Somewhere in one task, fill a buffer and write the whole record
+#  out = pose_share.new_buffer ()
+#  out[X] = x
+#  pose_share.put (out)
+#
+#  # In another task, allocate a buffer once, then copy the record into it
+#  pose = pose_share.new_buffer ()
+#  while True:
+#      pose_share.snapshot_into (pose)
+#      do_something_with (pose[X])
+#      yield 0
+#  @endcode
+class StructShare(BaseShare):
+
+    ## A counter used to give serial numbers to record shares for diagnostic
+    #  use.
+    ser_num = 0
+
+    _WRITERS = ("put", "put_field")
+    _READERS = ("snapshot_into", "get_field")
+
+    ## Create a record share.
+    #
+    #  @param fields The names of the fields, in order
+    #  @param type_code The type of every field, as for @c Share
+    #  @param thread_protect True if mutual exclusion protection is used
+    #  @param name A short name for the share, default @c StructShareN where
+    #         @c N is a serial number for the share
+    #  @param stats @c True to count reads and writes, @c False not to, or
+    #         @c None to follow @c task_share.STATS
+    def __init__(self, fields, type_code="f", thread_protect=True, name=None, stats=None):
+        # First call the parent class initializer
+        super().__init__(type_code, thread_protect, name, stats)
+
+        ## The names of the fields, in order.
+        self.fields = tuple(fields)
+        self._size = len(self.fields)
+        self._buffer = array.array(type_code, [0] * self._size)
+
+        self._name = str(name) if name != None else "StructShare" + str(StructShare.ser_num)
+        StructShare.ser_num += 1
+
+    ## Find the number of a field, by which it is read or written.
+    #  @param field The name of the field
+    #  @return The field's number
+    def index(self, field):
+        return self.fields.index(field)
+
+    ## Allocate a buffer which can hold a copy of the record. This allocates
+    #  memory, so it should be done once, before the scheduler starts.
+    #  @return A new array with one element for each field
+    def new_buffer(self):
+        return array.array(self._type_code, [0] * self._size)
+
+    ## Write the whole record at once.
+    #
+    #  @param values A buffer from @c new_buffer() holding a value for each
+    #         field
+    #  @param in_ISR Set this to True if calling from within an ISR
+    @micropython.native
+    def put(self, values, in_ISR=False):
+        # Disable interrupts before writing the data
+        if self._thread_protect and not in_ISR:
+            irq_state = pyb.disable_irq()
+
+        self._buffer[:] = values
+        self._version = (self._version + 1) & 0x3FFFFFFF
+
+        # Re-enable interrupts
+        if self._thread_protect and not in_ISR:
+            pyb.enable_irq(irq_state)
+
+    ## Copy the whole record into a buffer, such as one from @c new_buffer().
+    #
+    #  @param out The buffer into which the fields are copied
+    #  @param in_ISR Set this to True if calling from within an ISR
+    #  @return The buffer @c out
+    @micropython.native
+    def snapshot_into(self, out, in_ISR=False):
+        # Disable interrupts before reading the data
+        if self._thread_protect and not in_ISR:
+            irq_state = pyb.disable_irq()
+
+        out[:] = self._buffer
+
+        # Re-enable interrupts
+        if self._thread_protect and not in_ISR:
+            pyb.enable_irq(irq_state)
+
+        return out
+
+    ## Write one field of the record.
+    #
+    #  @param field The number of the field
+    #  @param value The value to be written
+    #  @param in_ISR Set this to True if calling from within an ISR
+    @micropython.native
+    def put_field(self, field, value, in_ISR=False):
+        if self._thread_protect and not in_ISR:
+            irq_state = pyb.disable_irq()
+
+        self._buffer[field] = value
+        self._version = (self._version + 1) & 0x3FFFFFFF
+
+        if self._thread_protect and not in_ISR:
+            pyb.enable_irq(irq_state)
+
+    ## Read one field of the record.
+    #
+    #  @param field The number of the field
+    #  @param in_ISR Set this to True if calling from within an ISR
+    #  @return The field's value
+    @micropython.native
+    def get_field(self, field, in_ISR=False):
+        if self._thread_protect and not in_ISR:
+            irq_state = pyb.disable_irq()
+
+        to_return = self._buffer[field]
+
+        if self._thread_protect and not in_ISR:
+            pyb.enable_irq(irq_state)
+
+        return to_return
+
+    ## Puts diagnostic information about the record share into a string,
+    #  showing its name, type and number of fields, the version and number
+    #  of unchanged checks, and the statistics if they're kept.
+    def __repr__(self):
+        return "{:<12s} StructShare<{:s} x{:d}> Version {:d} Unchanged {:d}".format(
+            self._name, type_code_strings[self._type_code], self._size, self._version, self._unchanged
+        ) + self._stats_text()
+
+    # Each field on a line of its own
+    def _value_text(self):
+        return "".join("\n  {} = {}".format(field, value) for field, value in zip(self.fields, self._buffer))
+
+
+# ============================================================================
+
+
+## A ring buffer which one writer fills and any number of readers read,
+#  each at its own pace.
+#
+#  A @c Queue hands each item to one reader; a broadcast ring hands every
+#  item to every reader, so one stream of data, such as wheel velocities,
+#  can feed a telemetry sender and a data logger without copying it into a
+#  queue for each. Each reader is a @c BroadcastReader made with
+#  @c reader(), which keeps its own place in the ring. The writer never
+#  waits for readers: a reader which falls more than a ring's length behind
+#  loses the oldest items, which are counted as overruns for that reader.
+#
+#  Putting an item doesn't disable interrupts. The writer stores the item
+#  first and then moves the count of items written on in a single store,
+#  and a reader checks after taking an item that the writer hasn't come
+#  round to it again, so the one writer may be a task or an ISR. There must
+#  only be one writer, though.
+#
+#  @code
+#  import task_share
+#
+#  # Readers are made before the scheduler starts
+#  vel_ring = task_share.Broadcast ('f', 100, name="Velocity")
+#  to_logger = vel_ring.reader ("logger")
+#  to_telemetry = vel_ring.reader ("telemetry")
+#
+#  # Somewhere in one task or ISR, put data into the ring
+#  vel_ring.put (velocity)
+#
+#  # In each reading task, read everything written since the last run
+#  while to_logger.any ():
+#      log (to_logger.get ())
+#  @endcode
+class Broadcast(BaseShare):
+
+    ## A counter used to give serial numbers to broadcast rings for
+    #  diagnostic use.
+    ser_num = 0
+
+    # Reads are counted by each reader's lag and overruns instead
+    _WRITERS = ("put",)
+
+    ## Create a broadcast ring.
+    #
+    #  @param type_code The type of data items which the ring can hold, as
+    #         for @c Queue
+    #  @param size The number of items the ring holds; a reader can fall this
+    #         many items behind before it loses any
+    #  @param name A short name for the ring, default @c BroadcastN where
+    #         @c N is a serial number for the ring
+    #  @param stats @c True to count writes, @c False not to, or @c None to
+    #         follow @c task_share.STATS
+    def __init__(self, type_code, size, name=None, stats=None):
+        # The ring doesn't disable interrupts, so it has no thread protection
+        super().__init__(type_code, False, name, stats)
+
+        self._size = size
+        self._name = str(name) if name != None else "Broadcast" + str(Broadcast.ser_num)
+        Broadcast.ser_num += 1
+
+        self._buffer = array.array(type_code, (0 for _ in range(size)))
+
+        # Count of items written, which wraps at a multiple of the size below
+        # 2**30 so it stays a small integer and also gives the item's place
+        # in the ring
+        self._limit = (0x40000000 // size) * size
+        self._head = 0
+
+        self._readers = []
+
+        gc.collect()
+
+    ## Make a reader which starts with the next item written. This allocates
+    #  memory, so it should be done before the scheduler starts.
+    #
+    #  @param name A short name for the reader, shown in diagnostic printouts
+    #  @return A new @c BroadcastReader
+    def reader(self, name=None):
+        new_reader = BroadcastReader(self, str(name) if name != None else "Reader" + str(len(self._readers)))
+        self._readers.append(new_reader)
+        return new_reader
+
+    ## Put an item into the ring, overwriting the oldest item if the ring is
+    #  full. Never waits, and may be called from an ISR.
+    #
+    #  @param item The item to be placed into the ring
+    #  @param in_ISR Accepted so the ring can be used in place of a share or
+    #         queue; the ring works the same either way
+    @micropython.native
+    def put(self, item, in_ISR=False):
+        head = self._head
+        self._buffer[head % self._size] = item
+        head += 1
+        if head >= self._limit:
+            head = 0
+
+        # Publish the item only once it's in place
+        self._head = head
+        self._version = (self._version + 1) & 0x3FFFFFFF
+
+    ## This method puts diagnostic information about the ring and each of
+    #  its readers into a string.
+    #
+    #  It shows the ring's name, type and size, and for each reader the
+    #  number of items it has yet to read, the most it has had waiting when
+    #  it read, and the number of items it lost by falling too far behind.
+    def __repr__(self):
+        text = "{:<12s} Broadcast<{:s}> Size {:d} Version {:d} Unchanged {:d}".format(
+            self._name, type_code_strings[self._type_code], self._size, self._version, self._unchanged
+        ) + self._stats_text()
+        for each in self._readers:
+            text += "\n  {:<10s} Lag {:d}/{:d} Max Lag {:d} Overruns {:d}".format(
+                each._name, each.num_in(), self._size, each._max_lag, each._overruns
+            )
+        return text
+
+    # The newest item, if anything has been written, on a line of its own
+    # after the readers
+    def _value_text(self):
+        if not self._version:
+            return ""
+        return "\n  newest = {}".format(self._buffer[(self._head - 1) % self._limit % self._size])
+
+
+## One reader's place in a @c Broadcast ring. Readers are made with
+#  @c Broadcast.reader() and are each read by one task.
+class BroadcastReader:
+
+    ## Create a reader; called by @c Broadcast.reader().
+    #
+    #  @param ring The ring which is read
+    #  @param name A short name for the reader
+    def __init__(self, ring, name):
+        self._ring = ring
+        self._name = name
+
+        # Count of items read, on the same scale as the ring's count of
+        # items written, so it starts with the next item written
+        self._tail = ring._head
+
+        self._overruns = 0
+        self._max_lag = 0
+
+    # Number of items written which haven't been read, which may be more
+    # than the ring holds if this reader has fallen behind
+    @micropython.native
+    def _lag(self):
+        ring = self._ring
+        return (ring._head - self._tail) % ring._limit
+
+    ## Check if there are any items to read.
+    #  @return @c True if items have been written which this reader hasn't
+    #          read
+    @micropython.native
+    def any(self):
+        return self._ring._head != self._tail
+
+    ## Check how many items there are to read.
+    #  @return The number of items waiting, at most the size of the ring
+    @micropython.native
+    def num_in(self):
+        lag = self._lag()
+        return lag if lag < self._ring._size else self._ring._size
+
+    ## Read the oldest item this reader hasn't read, without waiting.
+    #
+    #  If the writer has come round the ring past items this reader hadn't
+    #  read, those items are counted as overruns and the oldest item still
+    #  in the ring is read.
+    #  @param default The value returned if there's nothing to read
+    #  @return The item, or @c default
+    @micropython.native
+    def get(self, default=None):
+        ring = self._ring
+        while True:
+            lag = self._lag()
+            if lag == 0:
+                return default
+            if lag > self._max_lag:
+                self._max_lag = lag
+            if lag > ring._size:
+                self._overruns += lag - ring._size
+                self._tail = (self._tail + lag - ring._size) % ring._limit
+
+            item = ring._buffer[self._tail % ring._size]
+
+            # If the writer has come round to this item while it was being
+            # read, it may have been overwritten, so it's lost too
+            if self._lag() <= ring._size:
+                self._tail += 1
+                if self._tail >= ring._limit:
+                    self._tail = 0
+                return item
+
+    ## Read as many waiting items as fit into a buffer allocated
+    #  beforehand, oldest first.
+    #
+    #  @param out An array of the ring's type, into which items are put from
+    #         the start
+    #  @return The number of items read
+    @micropython.native
+    def read_into(self, out):
+        count = 0
+        while count < len(out) and self._ring._head != self._tail:
+            out[count] = self.get()
+            count += 1
+        return count
+
+    ## Skip all the items waiting, so the next item read is the next one
+    #  written.
+    def clear(self):
+        self._tail = self._ring._head
+
+    ## Get the number of items this reader has lost by falling more than a
+    #  ring's length behind.
+    #  @return The number of items overwritten before they were read
+    def overruns(self):
+        return self._overruns
+
+
+# ============================================================================
+
+
+## A signal from one task or ISR to a fixed number of participants, each of
+#  which sees each signal once.
+#
+#  Each participant is known by a number from 0 up to one less than the
+#  number of participants, and polls the event with @c wait_poll() each time
+#  it runs. A poll returns @c True the first time after the event has been
+#  signalled and @c False after that, so every participant acts on every
+#  signal once no matter in which order they run, without any of them
+#  having to clear or count down a flag for the others. Signals which come
+#  before a participant polls again are seen as one.
+#
+#  Tasks may be given with @c add_waiter(), and @c signal() then calls
+#  their @c go() methods so that tasks run only when told to are run.
+#
+#  @code
+#  import task_share
+#
+#  # Two motor controllers, numbered 0 and 1, act on each segment start
+#  seg_start = task_share.Event (2, name="Segment start")
+#
+#  # In the path director, at the start of a segment
+#  seg_start.signal ()
+#
+#  # In each motor controller, knowing its own number
+#  if seg_start.wait_poll (side):
+#      start_the_segment ()
+#  @endcode
+class Event(BaseShare):
+
+    ## A counter used to give serial numbers to events for diagnostic use.
+    ser_num = 0
+
+    _WRITERS = ("signal",)
+    _READERS = ("wait_poll",)
+
+    ## Create an event.
+    #
+    #  @param parties The number of participants which poll the event
+    #  @param thread_protect True if mutual exclusion protection is used
+    #  @param name A short name for the event, default @c EventN where @c N
+    #         is a serial number for the event
+    #  @param stats @c True to count signals and polls, @c False not to, or
+    #         @c None to follow @c task_share.STATS
+    def __init__(self, parties, thread_protect=True, name=None, stats=None):
+        super().__init__("I", thread_protect, name, stats)
+
+        self._parties = parties
+        self._name = str(name) if name != None else type(self).__name__ + str(Event.ser_num)
+        Event.ser_num += 1
+
+        # The version each participant last saw; the version counts signals
+        self._seen = array.array("I", [0] * parties)
+        self._waiters = []
+
+    # The type and size for diagnostic printouts
+    def _kind(self):
+        return "Event<{:d}>".format(self._parties)
+
+    ## Have a task told to run each time the event is signalled. This
+    #  allocates memory, so it should be done before the scheduler starts.
+    #  @param task A @c cotask.Task whose @c go() method is called
+    def add_waiter(self, task):
+        self._waiters.append(task)
+
+    ## Signal the event, so each participant's next poll returns @c True.
+    #
+    #  @param in_ISR Set this to True if calling from within an ISR
+    @micropython.native
+    def signal(self, in_ISR=False):
+        if self._thread_protect and not in_ISR:
+            irq_state = pyb.disable_irq()
+
+        self._version = (self._version + 1) & 0x3FFFFFFF
+
+        if self._thread_protect and not in_ISR:
+            pyb.enable_irq(irq_state)
+
+        for task in self._waiters:
+            task.go()
+
+    ## Check, without waiting, whether the event has been signalled since
+    #  this participant last checked.
+    #
+    #  @param participant The participant's number
+    #  @return @c True once after each signal, @c False otherwise
+    @micropython.native
+    def wait_poll(self, participant):
+        version = self._version
+        if self._seen[participant] == version:
+            self._unchanged += 1
+            return False
+        self._seen[participant] = version
+        return True
+
+    ## Puts diagnostic information about the event into a string: its name,
+    #  number of participants and signals, and how many participants have
+    #  yet to see the last signal.
+    def __repr__(self):
+        pending = sum(1 for seen in self._seen if seen != self._version)
+        return "{:<12s} {:s} Version {:d} Unchanged {:d} Pending {:d}".format(
+            self._name, self._kind(), self._version, self._unchanged, pending
+        ) + self._stats_text()
+
+
+## A point which a fixed number of participants must all reach before any
+#  of them goes on.
+#
+#  Each participant, known by a number as for @c Event, calls @c arrive()
+#  when it gets to the barrier and then polls @c wait_poll() each time it
+#  runs until that returns @c True. When the last participant arrives the
+#  barrier is signalled, as an @c Event is, and it's ready to be used
+#  again. A participant arriving twice before the others counts once.
+#
+#  @code
+#  # Both motor controllers must have stopped before the next segment
+#  stopped = task_share.Barrier (2, pollers=3, name="Stopped")
+#
+#  # In each motor controller
+#  stopped.arrive (side)
+#
+#  # In the path director, which polls as a third participant would but
+#  # isn't one of the two that must arrive
+#  if stopped.wait_poll (2):
+#      start_next_segment ()
+#  @endcode
+class Barrier(Event):
+
+    _WRITERS = ("arrive",)
+
+    ## Create a barrier.
+    #
+    #  @param parties The number of participants which must arrive
+    #  @param pollers The number of participants which poll the barrier,
+    #         by default the same as @c parties; those which poll but don't
+    #         arrive are numbered after those which arrive
+    #  @param thread_protect True if mutual exclusion protection is used
+    #  @param name A short name for the barrier, default @c BarrierN where
+    #         @c N is a serial number for the barrier
+    #  @param stats @c True to count arrivals and polls, @c False not to, or
+    #         @c None to follow @c task_share.STATS
+    def __init__(self, parties, pollers=None, thread_protect=True, name=None, stats=None):
+        super().__init__(pollers if pollers else parties, thread_protect, name, stats)
+
+        # Bits for the participants which have arrived, and for all of them
+        self._arrived = 0
+        self._arrivers = parties
+        self._all = (1 << parties) - 1
+
+    def _kind(self):
+        return "Barrier<{:d} of {:d}>".format(self._arrivers, self._parties)
+
+    ## Note that a participant has reached the barrier, and signal the
+    #  barrier if it's the last one.
+    #
+    #  @param participant The participant's number
+    #  @param in_ISR Set this to True if calling from within an ISR
+    #  @return @c True if this was the last participant to arrive
+    @micropython.native
+    def arrive(self, participant, in_ISR=False):
+        if self._thread_protect and not in_ISR:
+            irq_state = pyb.disable_irq()
+
+        self._arrived |= 1 << participant
+        done = self._arrived == self._all
+        if done:
+            self._arrived = 0
+
+        if self._thread_protect and not in_ISR:
+            pyb.enable_irq(irq_state)
+
+        if done:
+            self.signal(in_ISR)
+        return done
+
+    ## Check how many participants have arrived since the barrier was last
+    #  signalled.
+    #  @return The number of participants waiting at the barrier
+    def num_arrived(self):
+        return bin(self._arrived).count("1")
@@ -0,0 +1,169 @@
+## @file Async_Bench.py
+#  Benchmark comparing the @c cotask scheduler loops with the @c asyncio
+#  backend in @c cotask_async.py on the same task set.
+#
+#  Both backends run against the real clock, since @c asyncio sleeps in real
+#  time. Two things are measured for each backend:
+#
+#  - Dispatch overhead: tasks of equal priority which are always due and do
+#    no work are run for a while, so the time per dispatch is all scheduler.
+#  - Jitter: the timed tasks from @c main.py, each spinning for the run time
+#    measured on the Romi, are run for a while. Lateness is read from the
+#    task profiles, and the spread of the intervals between the starts of
+#    each task's runs is worked out from the start times.
+#
+#  Absolute numbers are for CPython on the PC, where the event loop is much
+#  heavier than MicroPython's; the comparison between backends is what's of
+#  interest.
+#
+#  Usage: @code python Async_Bench.py [--ms 2000] [--tasks 6] @endcode
+#
+#  @author Antonio Ventimiglia
+#  @author Caiden Bonney
+#  @date   2025-Dec-12
+#  @copyright GPLv3
+
+import argparse
+import statistics
+import time
+
+import Host_Paths  # noqa: F401  (sets up the module search path)
+import cotask
+import cotask_async
+import utime
+
+## Names, priorities, periods [ms], phases [ms], run times [us] and the
+#  names of the tasks each depends on, for the timed tasks in @c main.py.
+MAIN_TASKS = (
+    ("User Input", 10, 100, 0, 156, ()),
+    ("Observer", 4, 20, 0, 4_538, ()),
+    ("Path Director", 3, 20, 5, 847, ("Observer",)),
+    ("Left Motor", 2, 20, 6, 837, ("Path Director",)),
+    ("Right Motor", 2, 20, 6, 821, ("Path Director",)),
+)
+
+## The ways of running the tasks which are compared; a @c TaskList method
+#  name, or @c "asyncio" for @c cotask_async.
+BACKENDS = ("pri_sched", "frame_sched", "asyncio")
+
+
+## Generator for a task which does no work at all.
+def idle_task():
+    while True:
+        yield 0
+
+
+## Make a generator function for a task which spins for a fixed time each
+#  run and records when each run starts.
+#
+#  @param cost_us Time [us] to spin for on each run
+#  @param starts  List to which the start time of each run is appended
+def busy_task(cost_us: int, starts: list):
+    def run():
+        while True:
+            start = utime.ticks_us()
+            starts.append(start)
+            while utime.ticks_diff(utime.ticks_us(), start) < cost_us:
+                pass
+            yield 0
+
+    return run
+
+
+## Run a task list with one of the backends for a while.
+#
+#  @param task_list The @c cotask.TaskList to run
+#  @param backend   One of @c BACKENDS
+#  @param run_ms    Real run time [ms]
+def run_backend(task_list, backend: str, run_ms: int) -> None:
+    if backend == "asyncio":
+        cotask_async.run(task_list, run_ms)
+        return
+    sched = getattr(task_list, backend)
+    end = utime.ticks_add(utime.ticks_ms(), run_ms)
+    while utime.ticks_diff(end, utime.ticks_ms()) > 0:
+        sched()
+
+
+## Measure the time per dispatch of tasks which are always due.
+#
+#  @param backend One of @c BACKENDS
+#  @param n       Number of tasks
+#  @param run_ms  Real run time [ms]
+#  @return Tuple of (dispatches, microseconds per dispatch)
+def bench_overhead(backend: str, n: int, run_ms: int) -> tuple:
+    task_list = cotask.TaskList()
+    for idx in range(n):
+        task_list.append(cotask.Task(idle_task, name=f"Task {idx}", priority=1, period=0, profile=True))
+    start = time.perf_counter()
+    run_backend(task_list, backend, run_ms)
+    elapsed = time.perf_counter() - start
+    dispatches = sum(task._runs for pri in task_list.pri_list for task in pri[2:])
+    return dispatches, elapsed * 1e6 / dispatches if dispatches else float("nan")
+
+
+## Run the task set from @c main.py and measure lateness and jitter.
+#
+#  @param backend One of @c BACKENDS
+#  @param run_ms  Real run time [ms]
+#  @return List of (name, runs, average late [ms], 95th percentile late
+#          [ms], most late [ms], interval standard deviation [ms], widest
+#          interval error [ms]), one for each task
+def bench_jitter(backend: str, run_ms: int) -> list:
+    task_list = cotask.TaskList()
+    tasks = {}
+    starts = {}
+    for name, priority, period, phase, cost, after in MAIN_TASKS:
+        starts[name] = []
+        tasks[name] = cotask.Task(
+            busy_task(cost, starts[name]),
+            name=name,
+            priority=priority,
+            period=period,
+            profile=True,
+            phase=phase,
+            after=[tasks[dep] for dep in after],
+        )
+        task_list.append(tasks[name])
+    run_backend(task_list, backend, run_ms)
+
+    rows = []
+    for name, _, period, _, _, _ in MAIN_TASKS:
+        task = tasks[name]
+        intervals = [utime.ticks_diff(b, a) / 1000.0 for a, b in zip(starts[name], starts[name][1:])]
+        stdev = statistics.pstdev(intervals) if intervals else 0.0
+        worst = max((abs(ivl - period) for ivl in intervals), default=0.0)
+        avg_late = task._late_sum / task._runs / 1000.0 if task._runs else 0.0
+        p95 = task.late_percentile(95) / 1000.0 if task._runs else 0.0
+        rows.append((name, task._runs, avg_late, p95, task._latest / 1000.0, stdev, worst))
+    return rows
+
+
+## Run both benchmarks for each backend and print tables of results.
+def main():
+    parser = argparse.ArgumentParser(description="Compare the cotask schedulers with the asyncio backend.")
+    parser.add_argument("--ms", type=int, default=2_000, help="real run time per case [ms]")
+    parser.add_argument("--tasks", type=int, default=6, help="tasks in the overhead benchmark")
+    args = parser.parse_args()
+
+    print(f"DISPATCH OVERHEAD, {args.tasks} TASKS ALWAYS DUE")
+    print(f"{'BACKEND':>11s} {'DISPATCH':>9s} {'US/DISP':>9s}")
+    for backend in BACKENDS:
+        dispatches, per_disp = bench_overhead(backend, args.tasks, args.ms)
+        print(f"{backend:>11s} {dispatches:9d} {per_disp:9.3f}")
+
+    print("\nJITTER, MAIN.PY TASK SET (TIMES IN ms)")
+    print(
+        f"{'BACKEND':>11s} {'TASK':<14s} {'RUNS':>6s} {'AVG LATE':>9s} {'P95 LATE':>9s} "
+        f"{'MAX LATE':>9s} {'STDEV':>7s} {'MAX ERR':>8s}"
+    )
+    for backend in BACKENDS:
+        for name, runs, avg_late, p95, latest, stdev, worst in bench_jitter(backend, args.ms):
+            print(
+                f"{backend:>11s} {name:<14s} {runs:6d} {avg_late:9.3f} {p95:9.3f} "
+                f"{latest:9.3f} {stdev:7.3f} {worst:8.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
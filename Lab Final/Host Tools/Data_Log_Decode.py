@@ -0,0 +1,149 @@
+## @file Data_Log_Decode.py
+#  Decodes the binary dumps written by @c DataLogger.dump() on the robot,
+#  whether captured from the Bluetooth serial port or taken from a
+#  simulated run, and writes each wheel's samples to a CSV file.
+#
+#  A dump starts with the marker @c b"RLOG", so it's found even among the
+#  text the robot writes around it. If a capture holds several dumps, the
+#  last one is decoded unless @c --index says otherwise.
+#
+#  With @c --sim the default mission is run with the @c l command typed as
+#  the robot starts driving toward the first corner and @c d typed ten
+#  seconds later, so the dump holds the step response of both wheels.
+#  Recording stops at the end of that segment, long before the logger is
+#  full, so the dump holds only the samples up to the corner. The run goes on
+#  for a while after @c d, as the UART sender sends the dump a few samples
+#  at a time.
+#
+#  Usage: @code python Data_Log_Decode.py capture.bin [--index -1] [--csv out]
+#         python Data_Log_Decode.py --sim [--csv out] @endcode
+#
+#  @author Antonio Ventimiglia
+#  @author Caiden Bonney
+#  @date   2025-Dec-12
+#  @copyright GPLv3
+
+import argparse
+import csv
+import os
+import struct
+from array import array
+
+import Host_Paths  # noqa: F401  (sets up the module search path)
+from Data_Logger import CHANNELS, CHANNEL_TYPES, LOG_HEADER
+
+## Names of the wheels, in the order they're dumped.
+WHEELS = ("left", "right")
+
+
+## One decoded dump.
+class DataLog:
+    ## Create a dump from its header values.
+    #
+    #  @param samples Samples each channel could hold
+    #  @param counts  Samples recorded for each wheel
+    #  @param data    For each wheel, a dictionary of arrays by channel name
+    def __init__(self, samples: int, counts: tuple, data: tuple):
+        self.samples = samples
+        self.counts = counts
+        self.data = data
+
+    ## Describe each wheel's samples.
+    def __repr__(self) -> str:
+        text = f"DATA LOG OF {self.samples} SAMPLES PER WHEEL\n"
+        text += f"{'WHEEL':<6s} {'SAMPLES':>8s} {'SPAN MS':>8s} {'AVG PERIOD':>11s} {'MAX VEL':>8s} {'MAX EFFORT':>11s}\n"
+        for name, count, data in zip(WHEELS, self.counts, self.data):
+            times = data["time"]
+            span = (times[-1] - times[0]) / 1000 if count else 0.0
+            period = span / (count - 1) if count > 1 else 0.0
+            max_vel = max(data["velocity"], key=abs, default=0.0)
+            max_eff = max(data["effort"], key=abs, default=0.0)
+            text += f"{name:<6s} {count:8d} {span:8.1f} {period:11.3f} {max_vel:8.1f} {max_eff:11.1f}\n"
+        return text
+
+
+## Decode a dump from captured bytes.
+#
+#  @param data  The bytes, which may hold text and other dumps around it
+#  @param index Which dump to decode; -1 is the last
+#  @return A @c DataLog
+def parse_dump(data: bytes, index: int = -1) -> DataLog:
+    starts = []
+    pos = data.find(b"RLOG")
+    while pos >= 0:
+        starts.append(pos)
+        pos = data.find(b"RLOG", pos + 1)
+    if not starts:
+        raise SystemExit("no data logger dump found")
+    pos = starts[index]
+    _, channels, samples, *counts = struct.unpack_from(LOG_HEADER, data, pos)
+    if channels != len(CHANNELS):
+        raise SystemExit(f"dump has {channels} channels, expected {len(CHANNELS)}")
+    pos += struct.calcsize(LOG_HEADER)
+
+    wheels = []
+    for count in counts:
+        channels = {}
+        for name, code in zip(CHANNELS, CHANNEL_TYPES):
+            values = array(code)
+            end = pos + count * values.itemsize
+            if end > len(data):
+                raise SystemExit("dump is cut short")
+            values.frombytes(data[pos:end])
+            channels[name] = values
+            pos = end
+        wheels.append(channels)
+    return DataLog(samples, tuple(counts), tuple(wheels))
+
+
+## Write each wheel's samples to a CSV file.
+#
+#  @param log       The decoded dump
+#  @param directory Folder for @c left.csv and @c right.csv, made if it
+#                   doesn't exist
+def write_csv(log: DataLog, directory: str) -> None:
+    os.makedirs(directory, exist_ok=True)
+    for name, data in zip(WHEELS, log.data):
+        with open(os.path.join(directory, name + ".csv"), "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(CHANNELS)
+            writer.writerows(zip(*(data[channel] for channel in CHANNELS)))
+
+
+## Run the default mission, recording from when the robot starts toward
+#  the first corner, and return what was written to the Bluetooth UART.
+def sim_stream() -> bytes:
+    import Romi_Sim
+
+    mission = Romi_Sim.DEFAULT_MISSION + ((10.5, b"l"), (20.5, b"d"))
+    sim = Romi_Sim.RomiSim(seconds=30.0, mission=mission)
+    sim.run(quiet=True)
+    return sim.uart_output()
+
+
+## Decode a dump from the command line.
+def main():
+    parser = argparse.ArgumentParser(description="Decode a DataLogger dump from the Romi.")
+    parser.add_argument("capture", nargs="?", help="file holding bytes captured from the serial port")
+    parser.add_argument("--sim", action="store_true", help="record and decode a simulated run instead of a capture")
+    parser.add_argument("--index", type=int, default=-1, help="which dump in the capture to decode; -1 is the last")
+    parser.add_argument("--csv", metavar="DIR", help="write left.csv and right.csv into this folder")
+    args = parser.parse_args()
+
+    if args.sim:
+        data = sim_stream()
+    elif args.capture:
+        with open(args.capture, "rb") as file:
+            data = file.read()
+    else:
+        parser.error("give a capture file or --sim")
+
+    log = parse_dump(data, args.index)
+    print(log)
+    if args.csv:
+        write_csv(log, args.csv)
+        print(f"Wrote {', '.join(name + '.csv' for name in WHEELS)} to {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
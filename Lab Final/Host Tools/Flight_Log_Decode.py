@@ -0,0 +1,205 @@
+## @file Flight_Log_Decode.py
+#  Decodes the flight log written to flash by @c Flight_Log.py, copied off
+#  the robot or written by a simulated run, and writes each session's
+#  samples to a CSV file.
+#
+#  The file is a run of session headers, one for each boot, each followed
+#  by the blocks written during that boot. Every block is checked against
+#  its CRC-16 and decoded on its own, so a block cut short by a reset or
+#  corrupted is skipped, and reading carries on from the next header. Gaps
+#  in the blocks' numbers show blocks which were lost, and each block gives
+#  the samples dropped just before it because the robot had no page free.
+#  Values are given in the channels' units, such as millimetres and
+#  radians, using the steps each session header names.
+#
+#  Usage: @code python Flight_Log_Decode.py flight.log [--csv out]
+#         python Flight_Log_Decode.py --sim [--seconds 60] [--csv out] @endcode
+#
+#  @author Antonio Ventimiglia
+#  @author Caiden Bonney
+#  @date   2025-Dec-12
+#  @copyright GPLv3
+
+import argparse
+import binascii
+import csv
+import os
+import struct
+import tempfile
+
+import Host_Paths  # noqa: F401  (sets up the module search path)
+from Flight_Log import BLOCK_HEADER, SESSION_HEADER
+
+_SESSION_LEN = struct.calcsize(SESSION_HEADER)
+_BLOCK_LEN = struct.calcsize(BLOCK_HEADER)
+
+
+## Read a zigzag encoded varint.
+#
+#  @param data The bytes
+#  @param pos Where the varint starts
+#  @return Tuple of the integer and the position after it
+def get_varint(data: bytes, pos: int) -> tuple:
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            break
+    return (value >> 1) ^ -(value & 1), pos
+
+
+## The samples recorded during one boot of the robot.
+class Session:
+    ## Create a session from its header.
+    #
+    #  @param channels Tuple of (name, steps) for each channel
+    def __init__(self, channels: tuple):
+        self.channels = channels
+        ## The samples, each a list of integers in the channels' steps.
+        self.samples = []
+        ## Blocks decoded.
+        self.blocks = 0
+        ## Blocks missing from the sequence.
+        self.lost = 0
+        ## Samples the robot dropped for want of a free page.
+        self.dropped = 0
+        ## Bytes of the file taken by the session.
+        self.bytes = 0
+        self._last_seq = None
+
+    # Decode the samples of one block and add them
+    def add_block(self, seq: int, count: int, dropped: int, payload: bytes) -> None:
+        if self._last_seq is not None:
+            self.lost += (seq - self._last_seq - 1) & 0xFFFF
+        self._last_seq = seq
+        self.blocks += 1
+        self.dropped += dropped
+        pos = 0
+        prev = [0] * len(self.channels)
+        for num in range(count):
+            sample = []
+            for idx in range(len(self.channels)):
+                value, pos = get_varint(payload, pos)
+                sample.append(value if num == 0 else prev[idx] + value)
+            prev = sample
+            self.samples.append(sample)
+
+    ## The samples in the channels' units.
+    def values(self) -> list:
+        steps = [steps for _, steps in self.channels]
+        return [[val if div == 1 else val / div for val, div in zip(sample, steps)] for sample in self.samples]
+
+
+## Decode a flight log.
+#
+#  @param data The bytes of the file
+#  @return Tuple of a list of @c Session and the number of blocks skipped
+#          because they were cut short or failed their CRC
+def parse_log(data: bytes) -> tuple:
+    sessions = []
+    bad = 0
+    pos = 0
+    while pos < len(data):
+        marker = data[pos : pos + 4]
+        if marker == b"FLGS" and pos + _SESSION_LEN <= len(data):
+            _, _, count, length, crc = struct.unpack_from(SESSION_HEADER, data, pos)
+            text = data[pos + _SESSION_LEN : pos + _SESSION_LEN + length]
+            if len(text) == length and binascii.crc_hqx(text, 0xFFFF) == crc:
+                channels = tuple((name, int(steps)) for name, _, steps in (item.partition(":") for item in text.decode().split(",")))
+                if len(channels) == count:
+                    sessions.append(Session(channels))
+                    sessions[-1].bytes += _SESSION_LEN + length
+                    pos += _SESSION_LEN + length
+                    continue
+        elif marker == b"FLGB" and sessions and pos + _BLOCK_LEN <= len(data):
+            _, seq, count, dropped, length, crc = struct.unpack_from(BLOCK_HEADER, data, pos)
+            payload = data[pos + _BLOCK_LEN : pos + _BLOCK_LEN + length]
+            if len(payload) == length and binascii.crc_hqx(payload, 0xFFFF) == crc:
+                sessions[-1].add_block(seq, count, dropped, payload)
+                sessions[-1].bytes += _BLOCK_LEN + length
+                pos += _BLOCK_LEN + length
+                continue
+
+        # Not a whole header and block, so skip on to the next marker
+        bad += 1
+        starts = [at for at in (data.find(b"FLGS", pos + 1), data.find(b"FLGB", pos + 1)) if at >= 0]
+        pos = min(starts) if starts else len(data)
+    return sessions, bad
+
+
+## Describe each session of a log.
+#
+#  @param sessions List of @c Session
+#  @param bad Blocks skipped
+#  @return The description as text
+def report(sessions: list, bad: int) -> str:
+    text = f"{'SESSION':>7s} {'SAMPLES':>8s} {'BLOCKS':>7s} {'LOST':>5s} {'DROPPED':>8s} {'SECONDS':>8s} {'BYTES':>8s} {'B/SAMPLE':>9s} {'RAW B':>8s}\n"
+    for num, session in enumerate(sessions):
+        count = len(session.samples)
+        seconds = (session.samples[-1][0] - session.samples[0][0]) / 1000 if count else 0.0
+        per_sample = session.bytes / count if count else 0.0
+        raw = count * 4 * len(session.channels)
+        text += f"{num:7d} {count:8d} {session.blocks:7d} {session.lost:5d} {session.dropped:8d} "
+        text += f"{seconds:8.1f} {session.bytes:8d} {per_sample:9.2f} {raw:8d}\n"
+    text += f"{bad} damaged or partial blocks skipped"
+    return text
+
+
+## Write each session's samples to a CSV file, in the channels' units.
+#
+#  @param sessions List of @c Session
+#  @param directory Folder for @c session_0.csv and so on, made if it
+#                   doesn't exist
+def write_csv(sessions: list, directory: str) -> None:
+    os.makedirs(directory, exist_ok=True)
+    for num, session in enumerate(sessions):
+        with open(os.path.join(directory, f"session_{num}.csv"), "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(name for name, _ in session.channels)
+            writer.writerows(session.values())
+
+
+## Run the simulation with the flight log written to a temporary file, and
+#  return the file's bytes.
+#
+#  @param seconds Simulated run time [s]
+def sim_log(seconds: float) -> bytes:
+    import Romi_Sim
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "flight.log")
+        Romi_Sim.RomiSim(seconds=seconds, flight_log=path).run(quiet=True)
+        with open(path, "rb") as file:
+            return file.read()
+
+
+## Decode a flight log from the command line.
+def main():
+    parser = argparse.ArgumentParser(description="Decode the Romi's flight log.")
+    parser.add_argument("log", nargs="?", help="flight log copied from the robot")
+    parser.add_argument("--sim", action="store_true", help="decode the flight log of a simulated run instead")
+    parser.add_argument("--seconds", type=float, default=60.0, help="simulated run time [s] with --sim")
+    parser.add_argument("--csv", metavar="DIR", help="write a CSV file for each session into this folder")
+    args = parser.parse_args()
+
+    if args.sim:
+        data = sim_log(args.seconds)
+    elif args.log:
+        with open(args.log, "rb") as file:
+            data = file.read()
+    else:
+        parser.error("give a flight log or --sim")
+
+    sessions, bad = parse_log(data)
+    print(report(sessions, bad))
+    if args.csv:
+        write_csv(sessions, args.csv)
+        print(f"Wrote {len(sessions)} sessions to {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+## @file Host_Paths.py
+#  Puts the MicroPython stand-in modules and the files on the Romi onto the
+#  module search path so host tools can import @c cotask, @c task_share and
+#  the task classes under CPython. Host tools import this module first.
+#
+#  @author Antonio Ventimiglia
+#  @author Caiden Bonney
+#  @date   2025-Dec-12
+#  @copyright GPLv3
+
+import os
+import sys
+
+## Folder holding this file and the other host tools.
+HOST_DIR = os.path.dirname(os.path.abspath(__file__))
+
+## Folder holding the CPython stand-ins for @c pyb, @c utime and friends.
+STANDIN_DIR = os.path.join(HOST_DIR, "MicroPython Stand-ins")
+
+## Folder holding the code which runs on the Romi.
+ROMI_DIR = os.path.normpath(os.path.join(HOST_DIR, "..", "Files On Romi"))
+
+for _path in (ROMI_DIR, STANDIN_DIR):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+# Keep __pycache__ folders out of the files which are copied onto the Romi
+sys.dont_write_bytecode = True
@@ -0,0 +1,23 @@
+## @file machine.py
+#  CPython stand-in for the MicroPython @c machine module.
+#
+#  @author Antonio Ventimiglia
+#  @author Caiden Bonney
+#  @date   2025-Dec-12
+#  @copyright GPLv3
+
+
+## A soft reset ends the program; raise @c SystemExit as the board would
+#  when it restarts the interpreter.
+def soft_reset():
+    raise SystemExit("soft reset")
+
+
+## A hard reset also ends the program.
+def reset():
+    raise SystemExit("hard reset")
+
+
+## Return the CPU frequency of the NUCLEO-L476RG in hertz.
+def freq() -> int:
+    return 80_000_000
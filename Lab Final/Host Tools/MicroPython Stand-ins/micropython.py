@@ -0,0 +1,33 @@
+## @file micropython.py
+#  CPython stand-in for the MicroPython @c micropython module. The code
+#  emitter decorators do nothing here and @c const() returns its argument.
+#
+#  @author Antonio Ventimiglia
+#  @author Caiden Bonney
+#  @date   2025-Dec-12
+#  @copyright GPLv3
+
+
+## Stand-in for the native code emitter; returns the function unchanged.
+def native(fun):
+    return fun
+
+
+## Stand-in for the viper code emitter; returns the function unchanged.
+def viper(fun):
+    return fun
+
+
+## Stand-in for compile-time constants; returns the value unchanged.
+def const(value):
+    return value
+
+
+## Stand-in for the emergency exception buffer allocation; does nothing.
+def alloc_emergency_exception_buf(size: int) -> None:
+    pass
+
+
+## Run a function immediately, as a scheduled callback would be run soon.
+def schedule(fun, arg) -> None:
+    fun(arg)
@@ -0,0 +1,330 @@
+## @file pyb.py
+#  CPython stand-in for the parts of the MicroPython @c pyb module used by
+#  the Romi: pins, timers, ADCs, the I2C controller, UARTs and external
+#  interrupts. Nothing here touches hardware. Pin levels, timer counters
+#  and ADC readings live in class-level registries so that a simulation
+#  (see @c Romi_Sim.py) can play the part of the motors and sensors.
+#
+#  Time is read through @c utime, so replacing @c utime.ticks_us() and
+#  @c utime.sleep_us() moves @c pyb.delay() and @c pyb.millis() as well.
+#
+#  @author Antonio Ventimiglia
+#  @author Caiden Bonney
+#  @date   2025-Dec-12
+#  @copyright GPLv3
+
+import utime
+
+
+## Stand-in for disabling interrupts; returns a dummy interrupt state.
+def disable_irq():
+    return True
+
+
+## Stand-in for re-enabling interrupts.
+def enable_irq(state=True):
+    pass
+
+
+## Wait for the given number of milliseconds.
+def delay(ms: int) -> None:
+    utime.sleep_us(ms * 1000)
+
+
+## Wait for the given number of microseconds.
+def udelay(us: int) -> None:
+    utime.sleep_us(us)
+
+
+## Return the millisecond counter.
+def millis() -> int:
+    return utime.ticks_ms()
+
+
+## Return the microsecond counter.
+def micros() -> int:
+    return utime.ticks_us()
+
+
+## Namespace which turns any attribute, such as @c Pin.cpu.A4, into a pin
+#  name string.
+class _PinNames:
+    def __getattr__(self, name: str) -> str:
+        return name
+
+
+## A GPIO pin. Pins with the same name share one level.
+class Pin:
+    IN = 0
+    OUT_PP = 1
+    OUT_OD = 2
+    ALT = 3
+    ALT_OD = 4
+    ANALOG = 5
+    PULL_NONE = 0
+    PULL_UP = 1
+    PULL_DOWN = 2
+
+    ## Pin names by CPU port and number, e.g. @c Pin.cpu.C13.
+    cpu = _PinNames()
+    ## Pin names by board label.
+    board = _PinNames()
+
+    ## Level of each pin by name. Pins start high so that active-low inputs
+    #  such as the user button read as released.
+    levels = {}
+
+    ## Create or reconfigure a pin.
+    #
+    #  @param id   Pin name, or another @c Pin object
+    #  @param mode Pin mode constant (ignored)
+    #  @param pull Pull-up/down constant (ignored)
+    #  @param alt  Alternate function number (ignored)
+    def __init__(self, id, mode=IN, pull=PULL_NONE, alt=-1):
+        self.id = id.id if isinstance(id, Pin) else str(id)
+        self.mode = mode
+        Pin.levels.setdefault(self.id, 1)
+
+    ## Read the pin level, or set it if a value is given.
+    def value(self, val=None):
+        if val is None:
+            return Pin.levels[self.id]
+        Pin.levels[self.id] = 1 if val else 0
+
+    ## Set the pin high.
+    def high(self):
+        Pin.levels[self.id] = 1
+
+    ## Set the pin low.
+    def low(self):
+        Pin.levels[self.id] = 0
+
+    ## Return the pin name.
+    def name(self) -> str:
+        return self.id
+
+    def __repr__(self):
+        return "Pin(" + self.id + ")"
+
+
+## One channel of a timer, used for PWM output or encoder input.
+class TimerChannel:
+    ## Create a channel; called by @c Timer.channel().
+    def __init__(self, timer, number: int, mode, pin):
+        self.timer = timer
+        self.number = number
+        self.mode = mode
+        self.pin = pin
+        self._percent = 0.0
+
+    ## Read the PWM duty cycle in percent, or set it if a value is given.
+    def pulse_width_percent(self, value=None):
+        if value is None:
+            return self._percent
+        self._percent = float(value)
+
+    ## Read or set the raw pulse width.
+    def pulse_width(self, value=None):
+        if value is None:
+            return int(self._percent * (self.timer._period + 1) / 100)
+        self._percent = value * 100 / (self.timer._period + 1)
+
+
+## A hardware timer. Timers with the same number share one state.
+class Timer:
+    PWM = 0
+    PWM_INVERTED = 1
+    OC_TIMING = 2
+    IC = 3
+    ENC_A = 4
+    ENC_B = 5
+    ENC_AB = 6
+
+    ## Most recently created timer for each timer number.
+    timers = {}
+
+    ## Create a timer.
+    #
+    #  @param id        Timer number
+    #  @param freq      Frequency [Hz] at which the callback fires
+    #  @param prescaler Prescaler value (kept but not used)
+    #  @param period    Auto-reload value
+    #  @param callback  Function called with the timer as its argument
+    def __init__(self, id: int, freq=None, prescaler=0, period=0xFFFF, callback=None):
+        self.id = id
+        self.freq_hz = freq
+        self._prescaler = prescaler
+        self._period = period
+        self._counter = 0
+        self._callback = callback
+        self.channels = {}
+        Timer.timers[id] = self
+
+    ## Return the auto-reload value.
+    def period(self, value=None):
+        if value is None:
+            return self._period
+        self._period = value
+
+    ## Read the counter, or set it if a value is given.
+    def counter(self, value=None):
+        if value is None:
+            return self._counter
+        self._counter = int(value) & self._period
+
+    ## Read the frequency, or set it if a value is given.
+    def freq(self, value=None):
+        if value is None:
+            return self.freq_hz
+        self.freq_hz = value
+
+    ## Create a channel on this timer.
+    def channel(self, number: int, mode=PWM, pin=None, **kwargs):
+        chan = TimerChannel(self, number, mode, pin)
+        self.channels[number] = chan
+        return chan
+
+    ## Set the function called each time the timer fires.
+    def callback(self, fun):
+        self._callback = fun
+
+    ## Stop the timer and its callback.
+    def deinit(self):
+        self._callback = None
+
+
+## An analog to digital converter on one pin.
+class ADC:
+    ## Functions or fixed values giving the reading for each pin by name.
+    sources = {}
+
+    ## Create an ADC on the given pin.
+    def __init__(self, pin):
+        self.pin = pin.id if isinstance(pin, Pin) else str(pin)
+
+    ## Return the reading for this pin, 0 if nothing has been set up.
+    def read(self) -> int:
+        source = ADC.sources.get(self.pin, 0)
+        return int(source() if callable(source) else source)
+
+
+## An I2C bus controller which passes register reads and writes to
+#  simulated devices.
+class I2C:
+    CONTROLLER = 0
+    PERIPHERAL = 1
+    MASTER = 0
+    SLAVE = 1
+
+    ## Simulated devices by (bus, address). A device has methods
+    #  @c mem_read(buf, memaddr) and @c mem_write(data, memaddr).
+    devices = {}
+
+    ## Create a bus controller.
+    def __init__(self, bus: int, mode=CONTROLLER, **kwargs):
+        self.bus = bus
+
+    def _device(self, addr: int):
+        try:
+            return I2C.devices[(self.bus, addr)]
+        except KeyError:
+            raise OSError(5) from None  # EIO, as when nothing answers
+
+    ## Read device registers into a buffer.
+    def mem_read(self, data, addr: int, memaddr: int, timeout=5000, addr_size=8):
+        if isinstance(data, int):
+            data = bytearray(data)
+        self._device(addr).mem_read(data, memaddr)
+        return data
+
+    ## Write a buffer or an integer to device registers.
+    def mem_write(self, data, addr: int, memaddr: int, timeout=5000, addr_size=8):
+        if isinstance(data, int):
+            data = data.to_bytes(addr_size // 8, "little")
+        self._device(addr).mem_write(bytes(data), memaddr)
+
+
+## Shared state of one UART: bytes waiting to be read and bytes written.
+class _Port:
+    def __init__(self):
+        self.rx = bytearray()
+        self.tx = bytearray()
+
+
+## A serial port. UARTs with the same bus number share one @c _Port.
+class UART:
+    ## Port state for each bus number.
+    ports = {}
+
+    ## Open a UART.
+    def __init__(self, bus: int, baudrate: int = 9600, **kwargs):
+        self.bus = bus
+        self.baudrate = baudrate
+        self.port = UART.ports.setdefault(bus, _Port())
+
+    ## Queue bytes as though they had arrived from outside.
+    @staticmethod
+    def feed(bus: int, data: bytes) -> None:
+        UART.ports.setdefault(bus, _Port()).rx += data
+
+    ## Return the number of bytes waiting to be read.
+    def any(self) -> int:
+        return len(self.port.rx)
+
+    ## Read up to @c nbytes bytes, or everything waiting; @c None if empty.
+    def read(self, nbytes=None):
+        if not self.port.rx:
+            return None
+        if nbytes is None:
+            nbytes = len(self.port.rx)
+        data = bytes(self.port.rx[:nbytes])
+        del self.port.rx[:nbytes]
+        return data
+
+    ## Read waiting bytes into a buffer and return how many were read.
+    def readinto(self, buf, nbytes=None):
+        data = self.read(len(buf) if nbytes is None else nbytes)
+        if data is None:
+            return None
+        buf[: len(data)] = data
+        return len(data)
+
+    ## Write bytes and return how many were written.
+    def write(self, buf) -> int:
+        self.port.tx += buf
+        return len(buf)
+
+    ## The stand-in sends instantly, so transmission is always complete.
+    def txdone(self) -> bool:
+        return True
+
+
+## The USB virtual serial port, which behaves like UART number @c "usb".
+class USB_VCP(UART):
+    def __init__(self, id=0):
+        super().__init__("usb")
+
+
+## An external interrupt on a pin.
+class ExtInt:
+    IRQ_RISING = 0
+    IRQ_FALLING = 1
+    IRQ_RISING_FALLING = 2
+
+    ## All external interrupts which have been set up.
+    handlers = []
+
+    ## Set up an interrupt which calls @c callback(line) on an edge.
+    def __init__(self, pin, mode, pull, callback):
+        self.pin = pin.id if isinstance(pin, Pin) else str(pin)
+        self.callback = callback
+        ExtInt.handlers.append(self)
+
+    ## Set a pin level and run the callbacks attached to that pin, as a
+    #  falling edge would.
+    @staticmethod
+    def trigger(pin_name: str, level: int = 0) -> None:
+        Pin.levels[pin_name] = level
+        for handler in ExtInt.handlers:
+            if handler.pin == pin_name:
+                handler.callback(pin_name)
@@ -0,0 +1,8 @@
+## @file __init__.py
+#  CPython stand-in for the @c ulab package. Only the small part of
+#  @c ulab.numpy used by the Romi's observer is provided.
+#
+#  @author Antonio Ventimiglia
+#  @author Caiden Bonney
+#  @date   2025-Dec-12
+#  @copyright GPLv3
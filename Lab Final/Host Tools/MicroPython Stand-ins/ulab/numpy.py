@@ -0,0 +1,75 @@
+## @file numpy.py
+#  CPython stand-in for @c ulab.numpy covering what @c Observer.py uses:
+#  two-dimensional float arrays, @c zeros(), @c dot(), element-wise
+#  addition and subtraction, and the scalar @c cos() and @c sin() functions.
+#  Written in plain Python so the simulated Romi needs nothing beyond the
+#  standard library.
+#
+#  @author Antonio Ventimiglia
+#  @author Caiden Bonney
+#  @date   2025-Dec-12
+#  @copyright GPLv3
+
+import math
+
+## Scalar cosine, as @c ulab.numpy.cos() is used on single values.
+cos = math.cos
+
+## Scalar sine, as @c ulab.numpy.sin() is used on single values.
+sin = math.sin
+
+## The value of pi.
+pi = math.pi
+
+
+## A two-dimensional array of floats stored as a list of rows.
+class ndarray:
+    ## Create an array from a list of rows.
+    #
+    #  @param rows A list of equal-length lists of numbers
+    def __init__(self, rows):
+        self._rows = [[float(val) for val in row] for row in rows]
+
+    ## The (rows, columns) shape of the array.
+    @property
+    def shape(self) -> tuple:
+        return (len(self._rows), len(self._rows[0]) if self._rows else 0)
+
+    ## Read one element using @c array[row, col] indexing.
+    def __getitem__(self, idx):
+        row, col = idx
+        return self._rows[row][col]
+
+    ## Write one element using @c array[row, col] indexing.
+    def __setitem__(self, idx, value):
+        row, col = idx
+        self._rows[row][col] = float(value)
+
+    ## Element-wise addition of two arrays of the same shape.
+    def __add__(self, other):
+        return ndarray([[a + b for a, b in zip(ra, rb)] for ra, rb in zip(self._rows, other._rows)])
+
+    ## Element-wise subtraction of two arrays of the same shape.
+    def __sub__(self, other):
+        return ndarray([[a - b for a, b in zip(ra, rb)] for ra, rb in zip(self._rows, other._rows)])
+
+    ## Show the array contents.
+    def __repr__(self):
+        return "array(" + repr(self._rows) + ")"
+
+
+## Create an array from a nested list.
+def array(rows):
+    return ndarray(rows)
+
+
+## Create an array of zeros with the given (rows, columns) shape.
+def zeros(shape):
+    rows, cols = shape
+    return ndarray([[0.0] * cols for _ in range(rows)])
+
+
+## Matrix product of two arrays.
+def dot(a, b):
+    cols_b = list(zip(*b._rows))
+    return ndarray([[sum(x * y for x, y in zip(row, col)) for col in cols_b] for row in a._rows])
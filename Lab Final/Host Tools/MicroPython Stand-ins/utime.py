@@ -0,0 +1,61 @@
+## @file utime.py
+#  CPython stand-in for the MicroPython @c utime module, used so that the
+#  files on the Romi can be imported and run on a PC.
+#
+#  Tick counts wrap around in the same 30-bit range as they do on the
+#  Nucleo, so code which forgets to use @c ticks_diff() or @c ticks_add()
+#  misbehaves here just as it would on the robot.
+#
+#  @author Antonio Ventimiglia
+#  @author Caiden Bonney
+#  @date   2025-Dec-12
+#  @copyright GPLv3
+
+import time as _time
+
+## Number of distinct tick values before the counters wrap around.
+TICKS_PERIOD = 1 << 30
+
+_TICKS_MAX = TICKS_PERIOD - 1
+_TICKS_HALF = TICKS_PERIOD // 2
+
+
+## Return a wrapping microsecond counter.
+def ticks_us() -> int:
+    return (_time.perf_counter_ns() // 1000) & _TICKS_MAX
+
+
+## Return a wrapping millisecond counter.
+def ticks_ms() -> int:
+    return (_time.perf_counter_ns() // 1_000_000) & _TICKS_MAX
+
+
+## Add a signed number of ticks to a tick value, wrapping as needed.
+#
+#  @param ticks A value from @c ticks_us() or @c ticks_ms()
+#  @param delta The number of ticks to add, which may be negative
+def ticks_add(ticks: int, delta: int) -> int:
+    return (ticks + delta) & _TICKS_MAX
+
+
+## Find the signed difference @c ticks1 - @c ticks2 between tick values.
+#
+#  @param ticks1 The later tick value
+#  @param ticks2 The earlier tick value
+def ticks_diff(ticks1: int, ticks2: int) -> int:
+    return ((ticks1 - ticks2 + _TICKS_HALF) & _TICKS_MAX) - _TICKS_HALF
+
+
+## Sleep for the given number of seconds.
+def sleep(seconds: float) -> None:
+    _time.sleep(seconds)
+
+
+## Sleep for the given number of milliseconds.
+def sleep_ms(ms: int) -> None:
+    _time.sleep(ms / 1000)
+
+
+## Sleep for the given number of microseconds.
+def sleep_us(us: int) -> None:
+    _time.sleep(us / 1_000_000)
@@ -0,0 +1,116 @@
+## @file Queue_Bench.py
+#  Benchmark of the cost per item of moving data through a
+#  @c task_share.Queue one item at a time and in batches.
+#
+#  For each batch size, the same number of float items goes through a queue
+#  in batches: a producer puts a batch and a consumer then takes it all out
+#  again. Three ways of doing it are compared:
+#
+#  - @c put() and @c get() called once for each item, as the motor
+#    controllers' old time, position and velocity queues did.
+#  - @c put_many() and @c get_into(), which copy each batch in at most two
+#    blocks.
+#  - @c put_many(), then @c peek_view() and @c discard(), where the consumer
+#    reads the items in place and copies nothing out.
+#
+#  By default the queue holds 300 items, room for the largest batch, and
+#  its size isn't a multiple of any batch size, so the copies wrap around
+#  the end of the ring. With a smaller @c --size, batches bigger than the
+#  queue are cut to fit it. Absolute numbers are for CPython on the PC; the way the
+#  cost per item falls with batch size is what carries over to the Nucleo.
+#
+#  Usage: @code python Queue_Bench.py [--items 200000] [--size 300] [--protect] @endcode
+#
+#  @author Antonio Ventimiglia
+#  @author Caiden Bonney
+#  @date   2025-Dec-12
+#  @copyright GPLv3
+
+import argparse
+import time
+from array import array
+
+import Host_Paths  # noqa: F401  (sets up the module search path)
+import task_share
+
+## Batch sizes compared.
+BATCHES = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+## Move items through a queue one at a time.
+#
+#  @param queue The queue
+#  @param batch Items put before they're taken out again
+#  @param rounds Number of batches
+#  @return Seconds taken
+def bench_single(queue, batch: int, rounds: int) -> float:
+    data = array("f", range(batch))
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for item in data:
+            queue.put(item)
+        for _ in range(batch):
+            queue.get()
+    return time.perf_counter() - start
+
+
+## Move items through a queue with block copies in and out.
+#
+#  @param queue The queue
+#  @param batch Items put before they're taken out again
+#  @param rounds Number of batches
+#  @return Seconds taken
+def bench_copy(queue, batch: int, rounds: int) -> float:
+    data = memoryview(array("f", range(batch)))
+    out = memoryview(array("f", range(batch)))
+    start = time.perf_counter()
+    for _ in range(rounds):
+        queue.put_many(data)
+        queue.get_into(out)
+    return time.perf_counter() - start
+
+
+## Move items through a queue with a block copy in, read in place.
+#
+#  @param queue The queue
+#  @param batch Items put before they're taken out again
+#  @param rounds Number of batches
+#  @return Seconds taken
+def bench_view(queue, batch: int, rounds: int) -> float:
+    data = memoryview(array("f", range(batch)))
+    start = time.perf_counter()
+    for _ in range(rounds):
+        queue.put_many(data)
+        first, second = queue.peek_view()
+        queue.discard(len(first) + len(second))
+    return time.perf_counter() - start
+
+
+## Run the benchmark and print a table of results.
+def main():
+    parser = argparse.ArgumentParser(description="Compare single-item and batched task_share.Queue transfers.")
+    parser.add_argument("--items", type=int, default=200_000, help="items moved per case")
+    parser.add_argument("--size", type=int, default=300, help="queue size [items]; batches bigger than this are cut to fit")
+    parser.add_argument("--protect", action="store_true", help="disable interrupts around each transfer")
+    args = parser.parse_args()
+
+    print(f"US PER ITEM, QUEUE OF {args.size} FLOATS" + (", PROTECTED" if args.protect else ""))
+    print(f"{'BATCH':>6s} {'PUT/GET':>9s} {'PUT_MANY':>9s} {'PEEK_VIEW':>10s}")
+    for batch in BATCHES:
+        # A batch bigger than the queue would overflow it, so it's cut to fit
+        batch = min(batch, args.size)
+        rounds = max(1, args.items // batch)
+        row = f"{batch:6d}"
+        for bench, width in ((bench_single, 9), (bench_copy, 9), (bench_view, 10)):
+            queue = task_share.Queue("f", args.size, thread_protect=args.protect, name="bench")
+            # Start part way round so batches wrap around the end of the ring
+            queue.put_many(array("f", range(args.size // 3)))
+            queue.discard(args.size // 3)
+            per_item = bench(queue, batch, rounds) * 1e6 / (rounds * batch)
+            task_share.share_list.pop()
+            row += f" {per_item:{width}.3f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,617 @@
+## @file Romi_Sim.py
+#  Runs the Romi firmware on a PC, faster than real time, against a
+#  simulated clock and a simple model of the robot.
+#
+#  The real @c main.py is executed unchanged with the CPython stand-ins for
+#  @c pyb, @c utime, @c machine and @c micropython. Every time source the
+#  firmware uses (@c cotask's clock, @c utime, @c time.ticks_us() and
+#  @c pyb.delay()) reads one @c SimClock. Each task dispatch moves the clock
+#  forward by that task's typical run time, and whenever the scheduler finds
+#  nothing ready the clock jumps straight to the next task deadline, so a
+#  multi-minute mission takes seconds. At the end of the run the clock
+#  raises @c KeyboardInterrupt, so @c main.py prints its usual task and
+#  share tables just as it does after ^C on the robot.
+#
+#  The robot model turns PWM duty cycles into wheel motion with a first
+#  order lag, feeds the encoder timers and a model of the BNO055 heading and
+#  yaw rate registers, and holds the line centered under the line sensor.
+#  A model of the heap stands in for @c gc: tasks leave garbage as they run
+#  and collections take simulated time in proportion to what they free.
+#  Timers given a callback have it called at their frequency as the clock
+#  moves, as their interrupts would.
+#
+#  Usage: @code python Romi_Sim.py [--seconds 180] [--quiet] [--uart]
+#                [--trace dump.bin] [--trace-len 4096]
+#                [--chrome timeline.json] [--timeline-len 50000]
+#                [--share-stats] @endcode
+#
+#  @author Antonio Ventimiglia
+#  @author Caiden Bonney
+#  @date   2025-Dec-12
+#  @copyright GPLv3
+
+import argparse
+import contextlib
+import gc
+import io
+import math
+import os
+import runpy
+import struct
+import time
+
+import Host_Paths
+import utime
+import pyb
+import cotask
+import task_share
+import Flight_Log
+import Sampling_Profiler
+import Trace_Tools
+
+_TICKS_MAX = utime.TICKS_PERIOD - 1
+
+## Typical run time [us] of each task by the start of its name, taken from
+#  the averages in @c USB_Connection_Console.txt. Tasks not listed cost
+#  @c DEFAULT_COST_US per dispatch.
+TASK_COSTS_US = {
+    "User Input": 156,
+    "Observer": 4_538,
+    "Path Director": 847,
+    "Left Motor": 837,
+    "Right Motor": 821,
+}
+
+## Run time [us] charged for a dispatch of a task not in @c TASK_COSTS_US.
+DEFAULT_COST_US = 100
+
+## Rough heap memory [bytes] each task leaves as garbage per dispatch, by
+#  the start of its name. The observer's @c ulab arithmetic creates new
+#  arrays and floats every run; the other tasks mostly create floats.
+TASK_GARBAGE_BYTES = {
+    "Observer": 1_200,
+    "Path Director": 300,
+    "Left Motor": 200,
+    "Right Motor": 200,
+}
+
+## Garbage [bytes] left by a dispatch of a task not in @c TASK_GARBAGE_BYTES.
+DEFAULT_GARBAGE_BYTES = 50
+
+## Size of the MicroPython heap on the Nucleo-L476RG [bytes].
+HEAP_BYTES = 98_000
+
+## Heap memory [bytes] held by live objects once @c main.py has started.
+LIVE_BYTES = 45_000
+
+## Time [us] a collection takes regardless of how much garbage there is,
+#  for marking the live objects and sweeping the heap.
+GC_BASE_US = 3_500
+
+## Extra time [us] per byte of garbage a collection frees.
+GC_US_PER_BYTE = 0.05
+
+
+## Build the bytes typed over Bluetooth to send the robot to a point.
+#
+#  @param x Target X position [mm]
+#  @param y Target Y position [mm]
+#  @return The command for @c User_Input: state 401 and four 5-digit values
+def go_to_point_cmd(x: float, y: float) -> bytes:
+    return b".401" + b"%05d%05d%05d%05d" % (x, y, 0, 0)
+
+
+## Corners of the box driven by the default mission [mm].
+BOX = ((600, 800), (600, 400), (100, 400), (100, 800))
+
+## Default mission: after calibration, drive around a 500 x 400 mm box
+#  again and again, turning in place toward each corner (reference speed
+#  zero) before driving to it, as the course states in @c Path_Director.py
+#  do. Each entry is (time [s], bytes arriving on UART 5).
+DEFAULT_MISSION = tuple(
+    entry
+    for leg in range(40)
+    for entry in (
+        (2.0 + 15.0 * leg, b"z00000" + go_to_point_cmd(*BOX[leg % 4])),
+        (10.0 + 15.0 * leg, go_to_point_cmd(*BOX[leg % 4])),
+    )
+)
+
+
+## A simulated microsecond clock which moves only when told to.
+class SimClock:
+    ## Create a clock at time zero.
+    #
+    #  @param max_step_us Longest step [us] taken at once when the clock
+    #         moves, so the robot model is integrated finely enough
+    def __init__(self, max_step_us: int = 1000):
+        ## Time since the start of the simulation [us], never wrapped.
+        self.now = 0
+        self.max_step_us = max_step_us
+        ## Object with a @c step(dt) method called as time passes.
+        self.plant = None
+        self._events = []
+
+    ## Return the wrapped microsecond time, like @c utime.ticks_us().
+    def ticks_us(self) -> int:
+        return self.now & _TICKS_MAX
+
+    ## Return the wrapped millisecond time, like @c utime.ticks_ms().
+    def ticks_ms(self) -> int:
+        return (self.now // 1000) & _TICKS_MAX
+
+    ## Move the clock forward, stepping the plant and firing due events.
+    #
+    #  @param us Microseconds to move forward
+    def advance(self, us) -> None:
+        target = self.now + max(0, int(us))
+        while self.now < target:
+            step = min(target - self.now, self.max_step_us)
+            self.now += step
+            if self.plant is not None:
+                self.plant.step(step * 1e-6)
+            while self._events and self._events[0][0] <= self.now:
+                self._events.pop(0)[1]()
+            self._fire_timers()
+
+    # Call the callbacks of the timers which have come due, as the timer
+    # interrupts would on the robot
+    def _fire_timers(self) -> None:
+        for timer in pyb.Timer.timers.values():
+            if timer._callback is None or not timer.freq_hz:
+                continue
+            period = 1_000_000 / timer.freq_hz
+            due = getattr(timer, "_sim_due", None)
+            if due is None:
+                due = timer._sim_due = self.now + period
+            while due <= self.now and timer._callback is not None:
+                timer._callback(timer)
+                due += period
+            timer._sim_due = due
+
+    ## Move the clock to just past a @c ticks_us() time, if that is later.
+    #
+    #  @param ticks The wrapped time to move to
+    def jump_to(self, ticks: int) -> None:
+        self.advance(utime.ticks_diff(ticks, self.ticks_us()) + 1)
+
+    ## Sleep by moving the clock forward, for @c utime.sleep_us().
+    def sleep_us(self, us) -> None:
+        self.advance(us)
+
+    ## Sleep by moving the clock forward, for @c utime.sleep_ms().
+    def sleep_ms(self, ms) -> None:
+        self.advance(ms * 1000)
+
+    ## Sleep by moving the clock forward, for @c utime.sleep().
+    def sleep(self, seconds) -> None:
+        self.advance(seconds * 1_000_000)
+
+    ## Arrange for a function to be called once the clock reaches a time.
+    #
+    #  @param seconds Simulation time [s] at which to call @c fun
+    #  @param fun     Function taking no arguments
+    def at(self, seconds: float, fun) -> None:
+        self._events.append((int(seconds * 1_000_000), fun))
+        self._events.sort(key=lambda event: event[0])
+
+    ## Make this clock the time source for @c cotask, @c utime, @c pyb and
+    #  the MicroPython additions to @c time.
+    def install(self) -> None:
+        cotask.set_clock(self.ticks_us)
+        for module in (utime, time):
+            module.ticks_us = self.ticks_us
+            module.ticks_ms = self.ticks_ms
+            module.ticks_add = utime.ticks_add
+            module.ticks_diff = utime.ticks_diff
+            module.sleep_us = self.sleep_us
+            module.sleep_ms = self.sleep_ms
+        utime.sleep = self.sleep
+
+
+## A model of the MicroPython heap, standing in for @c gc.collect(),
+#  @c gc.mem_free() and @c gc.mem_alloc(). Tasks add garbage as they run,
+#  and each collection frees it and moves the simulated clock forward by
+#  the time it would take on the robot. As on the robot, an allocation
+#  which doesn't fit causes an automatic collection in whichever task is
+#  running.
+class SimHeap:
+    ## Create a heap holding only the live objects.
+    #
+    #  @param clock The @c SimClock moved forward by collections
+    def __init__(self, clock):
+        self.clock = clock
+        ## Bytes of unreachable objects not yet collected.
+        self.garbage = 0
+        ## Number of collections asked for by the firmware.
+        self.collects = 0
+        ## Number of automatic collections caused by a full heap.
+        self.auto_collects = 0
+        ## Total simulated time spent collecting [us].
+        self.total_us = 0
+
+    ## Return the free heap memory [bytes], like @c gc.mem_free().
+    def mem_free(self) -> int:
+        return HEAP_BYTES - LIVE_BYTES - self.garbage
+
+    ## Return the allocated heap memory [bytes], like @c gc.mem_alloc().
+    def mem_alloc(self) -> int:
+        return LIVE_BYTES + self.garbage
+
+    ## Collect the garbage, taking simulated time, like @c gc.collect().
+    def collect(self) -> None:
+        self.collects += 1
+        self._sweep()
+
+    ## Allocate memory which soon becomes garbage, collecting first if the
+    #  heap is too full for it.
+    #
+    #  @param nbytes The number of bytes allocated
+    def alloc(self, nbytes: int) -> None:
+        if nbytes > self.mem_free():
+            self.auto_collects += 1
+            self._sweep()
+        self.garbage += nbytes
+
+    def _sweep(self) -> None:
+        cost = GC_BASE_US + int(self.garbage * GC_US_PER_BYTE)
+        self.garbage = 0
+        self.total_us += cost
+        self.clock.advance(cost)
+
+
+## A model of the BNO055 IMU's registers at I2C address 0x28.
+class BNO055:
+    ## Create the register map.
+    #
+    #  @param plant The @c RomiPlant whose heading the IMU reports
+    def __init__(self, plant):
+        self.plant = plant
+        self.mem = bytearray(0x80)
+
+    ## Copy registers into @c buf, refreshing the heading, yaw rate and
+    #  calibration status first.
+    def mem_read(self, buf, memaddr: int) -> None:
+        heading = int(round((-self.plant.heading) % (2 * math.pi) * 900))
+        yaw_rate = max(-32768, min(32767, int(round(self.plant.yaw_rate * 900))))
+        struct.pack_into("<h", self.mem, 0x1A, heading)
+        struct.pack_into("<h", self.mem, 0x18, yaw_rate)
+        self.mem[0x35] = 0xFF
+        buf[:] = self.mem[memaddr : memaddr + len(buf)]
+
+    ## Store written bytes in the register map.
+    def mem_write(self, data: bytes, memaddr: int) -> None:
+        self.mem[memaddr : memaddr + len(data)] = data
+
+
+## A model of one wheel: motor driver, gearbox and encoder.
+class Wheel:
+    ## Describe which pins and timers drive and sense this wheel.
+    #
+    #  @param pwm_timer  Timer number driving the PWM
+    #  @param pwm_ch     PWM channel number on that timer
+    #  @param dir_pin    Name of the direction pin
+    #  @param slp_pin    Name of the sleep (enable) pin
+    #  @param enc_timer  Timer number counting encoder ticks
+    def __init__(self, pwm_timer: int, pwm_ch: int, dir_pin: str, slp_pin: str, enc_timer: int):
+        self.pwm_timer = pwm_timer
+        self.pwm_ch = pwm_ch
+        self.dir_pin = dir_pin
+        self.slp_pin = slp_pin
+        self.enc_timer = enc_timer
+        ## Wheel surface speed [mm/s].
+        self.speed = 0.0
+        ## Distance travelled by the wheel surface [mm].
+        self.pos = 0.0
+
+    ## Return the signed effort [%] the motor driver is applying.
+    def effort(self) -> float:
+        timer = pyb.Timer.timers.get(self.pwm_timer)
+        if timer is None or self.pwm_ch not in timer.channels or not pyb.Pin.levels.get(self.slp_pin, 0):
+            return 0.0
+        effort = timer.channels[self.pwm_ch].pulse_width_percent()
+        return -effort if pyb.Pin.levels.get(self.dir_pin, 0) else effort
+
+
+## Kinematic model of the Romi which feeds the simulated sensors.
+class RomiPlant:
+    ## Effort [%] below which the wheels do not turn.
+    DEADBAND = 5.5
+    ## Steady wheel speed per percent of effort above the deadband [mm/s].
+    GAIN = 1 / 0.075
+    ## Time constant of the motor speed response [s].
+    TAU = 0.05
+    ## ADC reading of the battery monitor at nominal voltage.
+    BATTERY_ADC = 3210
+    ## Line sensor pins in the order @c main.py builds the sensor array,
+    #  with each sensor's distance from the array center [mm].
+    IR_PINS = (("A4", -48), ("B0", -32), ("C1", -16), ("C0", 0), ("C4", 16), ("B1", 32), ("C5", 48))
+
+    ## Create the robot at the origin, facing along +X.
+    #
+    #  @param ir_cal Path of an @c IR_cal.txt giving white and black readings
+    def __init__(self, ir_cal: str):
+        from Romi_Props import RomiProps
+
+        self.props = RomiProps
+        self.left = Wheel(4, 2, "H1", "H0", 2)
+        self.right = Wheel(4, 1, "A7", "A6", 3)
+        self.heading = 0.0
+        self.yaw_rate = 0.0
+        self.x = 0.0
+        self.y = 0.0
+        with open(ir_cal) as file:
+            self.white = [int(val) for val in file.readline().split(",")]
+            self.black = [int(val) for val in file.readline().split(",")]
+
+    ## Connect the model to the stand-in ADCs and I2C bus.
+    def attach(self) -> None:
+        pyb.ADC.sources["C3"] = self.BATTERY_ADC
+        for idx, (pin, location) in enumerate(self.IR_PINS):
+            darkness = math.exp(-((location / 6.0) ** 2))
+            pyb.ADC.sources[pin] = self.white[idx] + (self.black[idx] - self.white[idx]) * darkness
+        pyb.I2C.devices[(2, 0x28)] = BNO055(self)
+
+    ## Integrate the robot's motion over a short time.
+    #
+    #  @param dt Time step [s]
+    def step(self, dt: float) -> None:
+        lag = min(1.0, dt / self.TAU)
+        for wheel in (self.left, self.right):
+            effort = wheel.effort()
+            drive = max(0.0, abs(effort) - self.DEADBAND) * self.GAIN
+            wheel.speed += (math.copysign(drive, effort) - wheel.speed) * lag
+            wheel.pos += wheel.speed * dt
+
+            # Forward wheel motion counts the encoder timer down
+            timer = pyb.Timer.timers.get(wheel.enc_timer)
+            if timer is not None:
+                ticks = wheel.pos / self.props.wheel_radius / self.props.ticks_to_rads
+                timer._counter = int(-ticks) & timer._period
+
+        self.yaw_rate = (self.right.speed - self.left.speed) / self.props.trackwidth
+        self.heading = (self.right.pos - self.left.pos) / self.props.trackwidth
+        speed = (self.left.speed + self.right.speed) / 2
+        self.x += speed * math.cos(self.heading) * dt
+        self.y += speed * math.sin(self.heading) * dt
+
+
+## A task list which charges simulated run time for each task dispatch and
+#  lets the clock skip over idle time.
+class SimTaskList(cotask.TaskList):
+    ## Create an empty task list tied to a simulation.
+    def __init__(self, sim):
+        super().__init__()
+        self.sim = sim
+
+    ## Append a task, wrapping its generator so each run costs sim time and
+    #  switching on transition tracing if the simulation asks for it.
+    def append(self, task):
+        task._run_gen = self.sim.costed(task._run_gen, self.sim.cost_of(task.name), self.sim.garbage_of(task.name))
+        if self.sim.trace:
+            task.set_trace(self.sim.trace)
+        super().append(task)
+
+    ## Priority scheduler, followed by a jump to the next deadline if idle.
+    def pri_sched(self) -> bool:
+        return self.sim.after_sched(self, super().pri_sched())
+
+    ## Round-robin scheduler, followed by a jump to the next deadline if idle.
+    def rr_sched(self) -> bool:
+        return self.sim.after_sched(self, super().rr_sched())
+
+    ## Deadline scheduler, followed by a jump to the next deadline if idle.
+    def edf_sched(self) -> bool:
+        return self.sim.after_sched(self, super().edf_sched())
+
+    ## Frame scheduler, followed by a jump to the next deadline if idle.
+    def frame_sched(self) -> bool:
+        return self.sim.after_sched(self, super().frame_sched())
+
+
+## One simulated run of the Romi firmware.
+class RomiSim:
+    ## Set up a simulation.
+    #
+    #  @param seconds Simulated time to run for [s]
+    #  @param mission Sequence of (time [s], bytes) arriving on UART 5
+    #  @param costs   Task run times [us] by start of task name
+    #  @param trace   Number of state transitions to trace for every task,
+    #                 or 0 to leave tracing as @c main.py sets it
+    #  @param timeline Number of task runs to keep in a scheduler timeline,
+    #                 or 0 for no timeline
+    #  @param sample_hz Frequency [Hz] at which a @c SamplingProfiler
+    #                 samples the running task, or 0 for no profiler
+    #  @param flight_log File the flight log is appended to, or @c None to
+    #                 throw it away
+    def __init__(
+        self,
+        seconds: float = 180.0,
+        mission=DEFAULT_MISSION,
+        costs=None,
+        trace: int = 0,
+        timeline: int = 0,
+        sample_hz: int = 0,
+        flight_log=None,
+    ):
+        self.seconds = seconds
+        self.end_us = int(seconds * 1_000_000)
+        self.mission = mission
+        self.costs = dict(TASK_COSTS_US if costs is None else costs)
+        self.trace = trace
+        self.timeline = timeline
+        self.sample_hz = sample_hz
+        self.flight_log = flight_log
+        ## The sampling profiler, once the scheduler has started, if
+        #  @c sample_hz was given.
+        self.profiler = None
+        self.clock = SimClock()
+        self.plant = None
+        ## The task list @c main.py filled in, once the run has started.
+        self.task_list = None
+        ## The model of the heap used by @c gc during the run.
+        self.heap = SimHeap(self.clock)
+
+    ## Find the simulated run time of a task from its name.
+    def cost_of(self, name: str) -> int:
+        name = name.strip()
+        for prefix, cost in self.costs.items():
+            if name.startswith(prefix):
+                return cost
+        return DEFAULT_COST_US
+
+    ## Find the garbage a task leaves per dispatch from its name.
+    @staticmethod
+    def garbage_of(name: str) -> int:
+        name = name.strip()
+        for prefix, nbytes in TASK_GARBAGE_BYTES.items():
+            if name.startswith(prefix):
+                return nbytes
+        return DEFAULT_GARBAGE_BYTES
+
+    ## Wrap a task generator so each run moves the clock forward and
+    #  leaves garbage on the heap.
+    #
+    #  @param gen     The task's generator
+    #  @param cost_us Simulated run time per dispatch [us]
+    #  @param garbage Bytes of garbage left per dispatch
+    def costed(self, gen, cost_us: int, garbage: int = 0):
+        advance = self.clock.advance
+        alloc = self.heap.alloc
+        for state in gen:
+            advance(cost_us)
+            alloc(garbage)
+            yield state
+
+    ## Called after each scheduler pass: end the run once time is up, or
+    #  skip the idle time before the next task is due.
+    #
+    #  @param task_list The task list which was scheduled
+    #  @param ran       Whether any task ran during the pass
+    def after_sched(self, task_list, ran: bool) -> bool:
+        if self.clock.now >= self.end_us:
+            raise KeyboardInterrupt
+        if self.sample_hz and self.profiler is None:
+            length = min(0xFFFF, int(self.seconds * self.sample_hz) + 1)
+            self.profiler = Sampling_Profiler.SamplingProfiler(task_list, length=length, freq=self.sample_hz)
+            self.profiler.start()
+        if not ran:
+            deadline = task_list.next_deadline()
+            if deadline is None:
+                self.clock.advance(1000)
+            else:
+                self.clock.jump_to(deadline)
+        return ran
+
+    ## Clear the stand-in hardware registries left over from earlier runs.
+    @staticmethod
+    def reset_hardware() -> None:
+        pyb.Pin.levels.clear()
+        pyb.Timer.timers.clear()
+        pyb.UART.ports.clear()
+        pyb.ExtInt.handlers.clear()
+        pyb.I2C.devices.clear()
+        pyb.ADC.sources.clear()
+
+    ## Run @c main.py until the simulated time is up.
+    #
+    #  @param quiet If @c True, hide what the firmware prints while running
+    #  @return What @c main.py printed, if @c quiet, or an empty string
+    def run(self, quiet: bool = False) -> str:
+        self.reset_hardware()
+        self.plant = RomiPlant(os.path.join(Host_Paths.ROMI_DIR, "IR_cal.txt"))
+        self.plant.attach()
+        self.clock.plant = self.plant
+        self.clock.install()
+        for when, data in self.mission:
+            self.clock.at(when, lambda data=data: pyb.UART.feed(5, data))
+
+        self.task_list = SimTaskList(self)
+        if self.timeline:
+            self.task_list.record_timeline(self.timeline)
+        cotask.task_list = self.task_list
+
+        # CPython manages its own memory, so the firmware's calls to gc use
+        # the heap model instead
+        real_collect = gc.collect
+        gc.collect = self.heap.collect
+        gc.mem_free = self.heap.mem_free
+        gc.mem_alloc = self.heap.mem_alloc
+        # The firmware runs in its own folder, so the flight log is kept out
+        # of it unless a file was given
+        Flight_Log.PATH = os.path.abspath(self.flight_log) if self.flight_log else os.devnull
+        old_dir = os.getcwd()
+        os.chdir(Host_Paths.ROMI_DIR)
+        out = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(out) if quiet else contextlib.nullcontext():
+                runpy.run_path(os.path.join(Host_Paths.ROMI_DIR, "main.py"), run_name="__main__")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.chdir(old_dir)
+            gc.collect = real_collect
+            del gc.mem_free, gc.mem_alloc
+            cotask.set_clock(utime.ticks_us)
+        return out.getvalue()
+
+    ## Return everything the firmware wrote to UART 5 (Bluetooth).
+    def uart_output(self) -> bytes:
+        port = pyb.UART.ports.get(5)
+        return bytes(port.tx) if port else b""
+
+
+## Run the simulation from the command line and report the results.
+def main():
+    parser = argparse.ArgumentParser(description="Run the Romi firmware against a simulated clock.")
+    parser.add_argument("--seconds", type=float, default=180.0, help="simulated run time [s]")
+    parser.add_argument("--quiet", action="store_true", help="hide what the firmware prints")
+    parser.add_argument("--uart", action="store_true", help="show what was sent over Bluetooth")
+    parser.add_argument("--trace", metavar="FILE", help="trace every task and write the binary dump here")
+    parser.add_argument("--trace-len", type=int, default=4096, help="transitions kept per task with --trace")
+    parser.add_argument("--chrome", metavar="JSON", help="record a scheduler timeline and write it as Chrome trace JSON")
+    parser.add_argument("--timeline-len", type=int, default=50_000, help="task runs kept with --chrome")
+    parser.add_argument("--share-stats", action="store_true", help="count share reads and writes and show them")
+    parser.add_argument("--flight-log", metavar="FILE", help="append the flight log to this file")
+    args = parser.parse_args()
+
+    task_share.STATS = args.share_stats
+
+    sim = RomiSim(
+        seconds=args.seconds,
+        trace=args.trace_len if args.trace else 0,
+        timeline=args.timeline_len if args.chrome else 0,
+        flight_log=args.flight_log,
+    )
+    start = time.perf_counter()
+    sim.run(quiet=args.quiet)
+    elapsed = time.perf_counter() - start
+
+    if args.quiet:
+        print(str(sim.task_list))
+    if args.share_stats:
+        print(task_share.show_all(values=True) + "\n")
+    if args.uart:
+        print(sim.uart_output().decode("utf-8", "replace"))
+    if args.trace:
+        with open(args.trace, "wb") as file:
+            sim.task_list.dump_trace(file)
+        print(f"Wrote transition traces to {args.trace}")
+    if args.chrome:
+        buf = io.BytesIO()
+        sim.task_list.timeline.dump(buf)
+        _, timeline = Trace_Tools.read_dump(buf.getvalue())
+        Trace_Tools.write_chrome(timeline, args.chrome)
+        print(f"Wrote {len(timeline.runs)} task runs to {args.chrome}")
+    heap = sim.heap
+    print(
+        f"Garbage collection: {heap.collects} requested, {heap.auto_collects} automatic, "
+        f"{heap.total_us / 1000:.1f} ms in total"
+    )
+    plant = sim.plant
+    print(f"Final pose: X {plant.x:.1f} mm, Y {plant.y:.1f} mm, heading {math.degrees(plant.heading):.1f} deg")
+    print(f"Simulated {args.seconds:.1f} s in {elapsed:.2f} s ({args.seconds / elapsed:.0f}x real time)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+## @file Sample_Profile.py
+#  Builds flat profiles from the samples taken by @c Sampling_Profiler.py,
+#  either from a dump captured from the robot or from a simulated run.
+#
+#  A dump holds the running task and state at each tick of the sampling
+#  timer; the profile counts the samples for each task and state, which is
+#  proportional to the processor time spent there. On the robot, the
+#  samples are taken between the @c m command's @c start and @c stop, and
+#  @c "m dump" writes them. A dump starts with the marker @c b"CSMP", so
+#  it's found even among the text captured around it; if a capture holds
+#  several dumps, the last one is decoded unless @c --index says otherwise.
+#
+#  With @c --sim, @c Romi_Sim.py runs the firmware with the same profiler
+#  sampling simulated time, so the task and state profile can be seen
+#  without hardware. At the same time, the host's processor is sampled with
+#  a profiling timer signal (or a sampling thread where signals aren't
+#  available), and each sample is charged to the innermost line of the
+#  Romi code being run. Some systems deliver the profiling signal only
+#  every few milliseconds, so a longer run gives a clearer line profile.
+#  The host is much faster than the Nucleo, but the lines which are slow on
+#  one are generally the ones slow on the other, so the line profile shows
+#  where to look inside a slow task.
+#
+#  Usage: @code python Sample_Profile.py capture.bin [--index -1]
+#         python Sample_Profile.py --sim [--seconds 60] [--hz 997] [--top 25] @endcode
+#
+#  @author Antonio Ventimiglia
+#  @author Caiden Bonney
+#  @date   2025-Dec-12
+#  @copyright GPLv3
+
+import argparse
+import collections
+import io
+import os
+import signal
+import struct
+import sys
+import threading
+import time
+from array import array
+
+import Host_Paths
+import Romi_Sim
+import Sampling_Profiler
+
+_HEADER_SIZE = struct.calcsize(Sampling_Profiler.SAMPLE_HEADER)
+
+
+## The decoded samples from a @c SamplingProfiler dump.
+class SampleDump:
+    ## Create a sample record.
+    #
+    #  @param names   Task names, with any padding removed, by task number
+    #  @param freq    Sampling frequency [Hz]
+    #  @param total   Number of samples taken, including overwritten ones
+    #  @param samples List of (task number, state), oldest first
+    def __init__(self, names, freq, total, samples):
+        self.names = names
+        self.freq = freq
+        self.total = total
+        self.samples = samples
+
+    ## Name of a task by number, or @c "(scheduler/idle)" for samples taken
+    #  when no task was running.
+    def task_name(self, task_id: int) -> str:
+        if task_id < len(self.names):
+            return self.names[task_id]
+        return "(scheduler/idle)"
+
+    ## Count the samples for each task.
+    #  @return A @c Counter of task names
+    def by_task(self):
+        return collections.Counter(self.task_name(task_id) for task_id, _ in self.samples)
+
+    ## Count the samples for each task and state.
+    #  @return A @c Counter of task name and state labels
+    def by_state(self):
+        counts = collections.Counter()
+        for task_id, state in self.samples:
+            if task_id < len(self.names):
+                counts[f"{self.names[task_id]} state {state}"] += 1
+            else:
+                counts[self.task_name(task_id)] += 1
+        return counts
+
+
+## Decode a dump written by @c SamplingProfiler.dump().
+#
+#  @param data The bytes, which may hold text and other dumps around it
+#  @param index Which dump to decode; -1 is the last
+#  @return A @c SampleDump
+#  @throws ValueError if the data is cut short or holds no sample dump
+def read_samples(data: bytes, index: int = -1) -> SampleDump:
+    starts = []
+    pos = data.find(b"CSMP")
+    while pos >= 0:
+        starts.append(pos)
+        pos = data.find(b"CSMP", pos + 1)
+    if not starts:
+        raise ValueError("not a sample dump")
+    data = data[starts[index] :]
+    if len(data) < _HEADER_SIZE:
+        raise ValueError("sample dump cut short")
+    magic, _, kept, total, freq, n_tasks = struct.unpack_from(Sampling_Profiler.SAMPLE_HEADER, data)
+    if magic != b"CSMP":
+        raise ValueError("not a sample dump")
+    pos = _HEADER_SIZE
+    names = []
+    for _ in range(n_tasks):
+        if pos >= len(data) or pos + 1 + data[pos] > len(data):
+            raise ValueError("sample dump cut short")
+        names.append(data[pos + 1 : pos + 1 + data[pos]].decode("utf-8", "replace").strip())
+        pos += 1 + data[pos]
+    if pos + 3 * kept > len(data):
+        raise ValueError("sample dump cut short")
+    tasks = array("B")
+    tasks.frombytes(data[pos : pos + kept])
+    states = array("H")
+    states.frombytes(data[pos + kept : pos + 3 * kept])
+    return SampleDump(names, freq, total, list(zip(tasks, states)))
+
+
+## Make a flat profile table from sample counts.
+#
+#  @param title  Heading for the first column
+#  @param counts A @c Counter of samples by label
+#  @param top    Number of rows to show, or @c None for all
+#  @param period Time [ms] each sample stands for, or @c None to leave out
+#                the time column
+#  @return The table as a string
+def flat_profile(title: str, counts, top=None, period=None) -> str:
+    total = sum(counts.values())
+    width = max([len(title)] + [len(label) for label in counts]) + 2
+    text = f"{title:<{width}s}  SAMPLES        %" + ("   TIME [ms]" if period else "") + "\n"
+    for label, count in counts.most_common(top):
+        text += f"{label:<{width}s}{count:9d}{100.0 * count / total:9.2f}"
+        if period:
+            text += f"{count * period:12.1f}"
+        text += "\n"
+    return text
+
+
+## Samples which lines of the Romi code the host processor is running.
+class HostSampler:
+    ## Create a sampler.
+    #
+    #  @param interval_us Processor time between samples [us]
+    def __init__(self, interval_us: int = 200):
+        self.interval_us = interval_us
+        ## Samples by (file, line, function) of the innermost Romi frame.
+        self.lines = collections.Counter()
+        ## Samples by (file, function) of the innermost Romi frame.
+        self.functions = collections.Counter()
+        self._thread = None
+        self._running = False
+        self._main_id = threading.main_thread().ident
+
+    # Charge a sample to the innermost frame running code from the Romi.
+    # Time in the MicroPython stand-ins is charged to the Romi code which
+    # called them, but time in the simulation itself is kept apart
+    def _record(self, frame) -> None:
+        while frame is not None and not frame.f_code.co_filename.startswith(Host_Paths.ROMI_DIR):
+            if not frame.f_code.co_filename.startswith(Host_Paths.STANDIN_DIR):
+                self.lines[("(simulator)", 0, "")] += 1
+                self.functions[("(simulator)", "")] += 1
+                return
+            frame = frame.f_back
+        if frame is None:
+            return
+        name = os.path.basename(frame.f_code.co_filename)
+        self.lines[(name, frame.f_lineno or 0, frame.f_code.co_name)] += 1
+        self.functions[(name, frame.f_code.co_name)] += 1
+
+    def _on_signal(self, signum, frame) -> None:
+        self._record(frame)
+
+    def _poll(self) -> None:
+        while self._running:
+            time.sleep(self.interval_us / 1e6)
+            self._record(sys._current_frames().get(self._main_id))
+
+    ## Start sampling the main thread.
+    def start(self) -> None:
+        self._running = True
+        if hasattr(signal, "setitimer"):
+            signal.signal(signal.SIGPROF, self._on_signal)
+            signal.setitimer(signal.ITIMER_PROF, self.interval_us / 1e6, self.interval_us / 1e6)
+        else:
+            self._thread = threading.Thread(target=self._poll, daemon=True)
+            self._thread.start()
+
+    ## Stop sampling.
+    def stop(self) -> None:
+        self._running = False
+        if self._thread is None:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGPROF, signal.SIG_DFL)
+        else:
+            self._thread.join()
+            self._thread = None
+
+
+## Run the simulation under both profilers and print the profiles.
+def profile_sim(seconds: float, hz: int, top: int) -> None:
+    sim = Romi_Sim.RomiSim(seconds=seconds, sample_hz=hz)
+    host = HostSampler()
+    host.start()
+    try:
+        sim.run(quiet=True)
+    finally:
+        host.stop()
+
+    buf = io.BytesIO()
+    sim.profiler.dump(buf)
+    samples = read_samples(buf.getvalue())
+    period = 1000.0 / samples.freq
+    print(f"Simulated time, {len(samples.samples)} samples at {samples.freq} Hz\n")
+    print(flat_profile("TASK", samples.by_task(), period=period))
+    print(flat_profile("TASK AND STATE", samples.by_state(), top=top, period=period))
+
+    print(f"Host processor time, {sum(host.lines.values())} samples\n")
+    functions = collections.Counter({f"{f}:{fn}".rstrip(":"): n for (f, fn), n in host.functions.items()})
+    lines = collections.Counter({f"{f}:{ln} {fn}" if ln else f: n for (f, ln, fn), n in host.lines.items()})
+    print(flat_profile("FUNCTION", functions, top=top))
+    print(flat_profile("LINE", lines, top=top))
+
+
+## Print a flat profile from a dump file or from a simulated run.
+def main():
+    parser = argparse.ArgumentParser(description="Build flat profiles from Sampling_Profiler samples.")
+    parser.add_argument("dump", nargs="?", help="file holding bytes captured from the serial port, with a SamplingProfiler dump")
+    parser.add_argument("--index", type=int, default=-1, help="which dump in the capture to decode; -1 is the last")
+    parser.add_argument("--sim", action="store_true", help="profile a simulated run instead of a dump")
+    parser.add_argument("--seconds", type=float, default=60.0, help="simulated run time [s] with --sim")
+    parser.add_argument("--hz", type=int, default=997, help="sampling frequency [Hz] with --sim")
+    parser.add_argument("--top", type=int, default=25, help="rows shown in each profile")
+    args = parser.parse_args()
+
+    if args.sim:
+        profile_sim(args.seconds, args.hz, args.top)
+    elif args.dump:
+        with open(args.dump, "rb") as file:
+            samples = read_samples(file.read(), args.index)
+        period = 1000.0 / samples.freq
+        print(f"{len(samples.samples)} samples at {samples.freq} Hz ({samples.total - len(samples.samples)} overwritten)\n")
+        print(flat_profile("TASK", samples.by_task(), period=period))
+        print(flat_profile("TASK AND STATE", samples.by_state(), top=args.top, period=period))
+    else:
+        parser.error("give a dump file or --sim")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,390 @@
+## @file Sched_Analysis.py
+#  Schedulability analysis of the Romi's task set using the run times
+#  measured by @c cotask profiling.
+#
+#  The task table printed by @c cotask.TaskList is read from a saved console
+#  log such as @c USB_Connection_Console.txt, from a snapshot sent by
+#  @c Status_Reporter.py over a serial port, or from a simulated run. Each
+#  task's worst case execution time (WCET) is taken as its longest measured
+#  run, or with @c --wcet @c p99 as the 99th percentile if the log holds the
+#  percentile table. The 99th percentile leaves out the slowest runs, so a
+#  task set which passes with it can still miss deadlines when those runs
+#  come together; it's a test of the usual case, not a safe test, and the
+#  analysis says so when it's used.
+#
+#  Tasks run to completion under @c cotask, so the analysis is for
+#  non-preemptive scheduling: once a task starts, even a higher priority task
+#  which comes due must wait for it to finish. Three policies are checked:
+#
+#  - @c fp: fixed priorities as given in @c main.py, as @c pri_sched() runs
+#    them. Tasks of equal priority are counted as delaying each other.
+#  - @c rm: rate-monotonic priorities, shorter periods first.
+#  - @c edf: earliest deadline first, as @c edf_sched() runs them.
+#
+#  For the fixed priority policies the worst case response time of each task
+#  is found by iterating
+#  @f$ w = B_i + \sum_{j \in hp(i)} (\lfloor w / T_j \rfloor + 1) C_j @f$
+#  and @f$ R_i = w + C_i @f$, where @f$ B_i @f$ is the longest run of any
+#  lower priority task. With the longest runs as WCETs this is a sufficient
+#  test, so a task set it passes always meets its deadlines, so far as the
+#  measured runs were the longest there are. For EDF the processor demand test is used,
+#  with blocking by the longest run of a task with a later deadline. EDF
+#  response times are not worked out, and the deadline is shown instead.
+#  Deadlines are taken to be the periods, and phase offsets are ignored, which
+#  can only make the results more pessimistic.
+#
+#  For each task, the headroom is how much longer its WCET could be before
+#  some task misses a deadline. The tightest feasible periods are found by
+#  bisection, both for each task alone and for each group of tasks sharing a
+#  period, such as the 20 ms observer and motor control frame.
+#
+#  Usage: @code python Sched_Analysis.py USB_Connection_Console.txt [--table -1]
+#         python Sched_Analysis.py --sim 60
+#         python Sched_Analysis.py --port COM5 @endcode
+#
+#  @author Antonio Ventimiglia
+#  @author Caiden Bonney
+#  @date   2025-Dec-12
+#  @copyright GPLv3
+
+import argparse
+import re
+import time
+
+## Pattern matching a row of the task table: name, priority, period or
+#  @c "-", runs, and then optionally the run time and lateness columns.
+_ROW = re.compile(r"^(.*?)\s+(-?\d+)\s+(-?[\d.]+|-)\s+(\d+)((?:\s+-?[\d.]+)*)\s*$")
+
+## Pattern matching a row of the percentile table: name, then three run
+#  time percentiles and optionally three lateness percentiles.
+_PCT_ROW = re.compile(r"^(.*?)((?:\s+-?[\d.]+){3,6})\s*$")
+
+
+## One task as seen by the analysis, with times in microseconds.
+class TaskModel:
+    ## Create a task model.
+    #
+    #  @param name     Task name, with padding removed
+    #  @param priority Priority from the task table
+    #  @param period   Period [us], or 0 if the task isn't run by a timer
+    #  @param wcet     Worst case execution time [us]
+    def __init__(self, name: str, priority: int, period: int, wcet: int):
+        self.name = name
+        self.priority = priority
+        self.period = period
+        self.wcet = wcet
+
+    ## Whether the task is run by a timer, rather than whenever nothing else
+    #  is ready.
+    @property
+    def timed(self) -> bool:
+        return self.period > 0
+
+
+## Read the task tables from text printed by @c cotask.TaskList.
+#
+#  @param text The text, which may hold several tables among other output
+#  @param use  Which WCET to use: @c "max" for the longest run, or @c "p99"
+#              for the 99th percentile where the percentile table is given
+#  @return A list of tables, each a list of @c TaskModel, oldest first
+def parse_tables(text: str, use: str = "max") -> list:
+    tables = []
+    lines = text.replace("\r", "").split("\n")
+    idx = 0
+    while idx < len(lines):
+        if not lines[idx].startswith("TASK ") or "PERIOD" not in lines[idx]:
+            idx += 1
+            continue
+        idx += 1
+        table = []
+        while idx < len(lines) and lines[idx].strip():
+            match = _ROW.match(lines[idx])
+            if not match:
+                break
+            name, priority, period, _, rest = match.groups()
+            times = [float(num) for num in rest.split()]
+            period_us = 0 if period == "-" else int(float(period) * 1000)
+            wcet = int(times[1] * 1000) if len(times) >= 2 else 0
+            table.append(TaskModel(name.strip(), int(priority), period_us, wcet))
+            idx += 1
+
+        # The percentile table, if there is one, follows after a blank line
+        while idx < len(lines) and not lines[idx].strip():
+            idx += 1
+        if use == "p99" and idx < len(lines) and lines[idx].startswith("PERCENTILES"):
+            idx += 1
+            by_name = {task.name: task for task in table}
+            while idx < len(lines) and lines[idx].strip():
+                match = _PCT_ROW.match(lines[idx])
+                if match and match.group(1).strip() in by_name:
+                    by_name[match.group(1).strip()].wcet = int(float(match.group(2).split()[2]) * 1000)
+                idx += 1
+        tables.append(table)
+    return tables
+
+
+## Find the worst case response time of each task under non-preemptive
+#  fixed priority scheduling.
+#
+#  @param tasks    List of @c TaskModel
+#  @param priority Function giving the priority of a task; higher runs first
+#  @return Dictionary of response times [us] by task name, with @c None for
+#          a task whose busy period grows past its deadline
+def fp_response(tasks: list, priority) -> dict:
+    timed = [task for task in tasks if task.timed]
+    resp = {}
+    for task in timed:
+        higher = [oth for oth in timed if oth is not task and priority(oth) >= priority(task)]
+        lower = [oth.wcet for oth in tasks if oth is not task and oth not in higher]
+        blocking = max(lower, default=0)
+        wait = blocking + sum(oth.wcet for oth in higher)
+        while True:
+            new = blocking + sum((wait // oth.period + 1) * oth.wcet for oth in higher)
+            if new == wait or new + task.wcet > task.period:
+                break
+            wait = new
+        resp[task.name] = new + task.wcet if new + task.wcet <= task.period else None
+    return resp
+
+
+## Check a task set under non-preemptive EDF scheduling.
+#
+#  At every length of time @f$ L @f$ at which some deadline falls, the run
+#  time of the jobs which must finish within @f$ L @f$, plus the longest run
+#  of a task with a later deadline which may have started just before, must
+#  fit in @f$ L @f$. A task which isn't run by a timer only runs when no
+#  timed task is due, but once it starts it holds up whichever task comes
+#  due next, so it always counts as blocking.
+#
+#  @param tasks List of @c TaskModel
+#  @return @c True if every timed task meets its deadline
+def edf_feasible(tasks: list) -> bool:
+    timed = [task for task in tasks if task.timed]
+    if not timed:
+        return True
+    util = sum(task.wcet / task.period for task in timed)
+    if util >= 1.0:
+        return False
+    background = max((task.wcet for task in tasks if not task.timed), default=0)
+    longest = max(task.period for task in timed)
+
+    # Past this length the demand can no longer catch up with the time
+    limit = max(longest, int((background + sum(task.wcet for task in timed)) / (1.0 - util)) + 1)
+    limit = min(limit, 1000 * longest)
+    points = set()
+    for task in timed:
+        points.update(range(task.period, limit + 1, task.period))
+    for length in sorted(points):
+        demand = sum(length // task.period * task.wcet for task in timed)
+        blocking = max([task.wcet for task in timed if task.period > length] + [background])
+        if demand + blocking > length:
+            return False
+    return True
+
+
+## Work out the response times for a task set under a policy.
+#
+#  @param tasks  List of @c TaskModel
+#  @param policy @c "fp", @c "rm" or @c "edf"
+#  @return Dictionary of response times [us] by task name, with @c None for
+#          a task which may miss its deadline; under EDF, the deadline for
+#          every task if the set is feasible
+def analyze(tasks: list, policy: str) -> dict:
+    if policy == "fp":
+        return fp_response(tasks, lambda task: task.priority)
+    if policy == "rm":
+        return fp_response(tasks, lambda task: -task.period)
+    feasible = edf_feasible(tasks)
+    return {task.name: (task.period if feasible else None) for task in tasks if task.timed}
+
+
+## Check whether every timed task in a set meets its deadline.
+def feasible(tasks: list, policy: str) -> bool:
+    return all(resp is not None for resp in analyze(tasks, policy).values())
+
+
+## Find the largest value for which a test passes, by bisection.
+#
+#  @param test Function of an integer which is @c True up to some value
+#  @param low  A value for which the test passes
+#  @param high A value for which the test fails
+#  @param step Resolution of the answer
+#  @return The largest value found for which the test passes
+def _bisect(test, low: int, high: int, step: int) -> int:
+    while high - low > step:
+        mid = (low + high) // 2
+        if test(mid):
+            low = mid
+        else:
+            high = mid
+    return low
+
+
+## Find how much longer each task's WCET could be before the set becomes
+#  infeasible.
+#
+#  @param tasks  List of @c TaskModel, which must be feasible
+#  @param policy @c "fp", @c "rm" or @c "edf"
+#  @return Dictionary of headroom [us] by task name
+def headroom(tasks: list, policy: str) -> dict:
+    room = {}
+    for task in tasks:
+        base = task.wcet
+
+        def test(extra):
+            task.wcet = base + extra
+            return feasible(tasks, policy)
+
+        limit = max((oth.period for oth in tasks), default=0) + 1
+        room[task.name] = _bisect(test, 0, limit, 10)
+        task.wcet = base
+    return room
+
+
+## Find the shortest period for a group of tasks, with the other tasks'
+#  periods left alone, at which the whole set is still feasible.
+#
+#  @param tasks  List of @c TaskModel
+#  @param group  The tasks whose period is shortened, all run together
+#  @param policy @c "fp", @c "rm" or @c "edf"
+#  @return The shortest feasible period [us], rounded up to 100 us, or
+#          @c None if the set is infeasible even at the current periods
+def tightest_period(tasks: list, group: list, policy: str):
+    saved = [task.period for task in group]
+    current = max(saved)
+
+    def test(period):
+        for task in group:
+            task.period = period
+        return feasible(tasks, policy)
+
+    if not test(current):
+        best = None
+    else:
+        # Bisect on the negated period so that _bisect finds the shortest
+        floor = max(task.wcet for task in group)
+        if test(floor):
+            best = floor
+        else:
+            best = -_bisect(lambda neg: test(-neg), -current, -floor, 1)
+        best = -(-best // 100) * 100
+    for task, period in zip(group, saved):
+        task.period = period
+    return best
+
+
+## Make the report of response times, headroom and tightest periods.
+#
+#  @param tasks  List of @c TaskModel
+#  @param policy @c "fp", @c "rm" or @c "edf"
+#  @return The report as a string
+def report(tasks: list, policy: str) -> str:
+    timed = [task for task in tasks if task.timed]
+    util = sum(task.wcet / task.period for task in timed)
+    resp = analyze(tasks, policy)
+    ok = all(val is not None for val in resp.values())
+    room = headroom(tasks, policy) if ok else {}
+
+    text = f"POLICY {policy.upper()}, UTILIZATION {100 * util:.1f}%, " + ("FEASIBLE" if ok else "NOT FEASIBLE") + "\n"
+    text += "TASK                    PRI    PERIOD      WCET     UTIL%  WC RESP  HEADROOM  HEADRM%\n"
+    for task in tasks:
+        text += f"{task.name:<22s}{task.priority:5d}"
+        if not task.timed:
+            text += f"{'-':>10s}{task.wcet / 1000:10.3f}{'':>9s}{'(background)':>18s}\n"
+            continue
+        text += f"{task.period / 1000:10.1f}{task.wcet / 1000:10.3f}{100 * task.wcet / task.period:9.2f}"
+        text += f"{resp[task.name] / 1000:9.3f}" if resp[task.name] is not None else f"{'MISS':>9s}"
+        if task.name in room:
+            text += f"{room[task.name] / 1000:10.3f}{100 * room[task.name] / task.period:9.2f}"
+        text += "\n"
+
+    text += "\nTIGHTEST PERIODS            NOW [ms]  MIN [ms]\n"
+    groups = {}
+    for task in timed:
+        groups.setdefault(task.period, []).append(task)
+    rows = [(task.name, [task]) for task in timed]
+    rows += [(f"all {period / 1000:g} ms tasks", group) for period, group in groups.items() if len(group) > 1]
+    for label, group in rows:
+        best = tightest_period(tasks, group, policy)
+        text += f"{label:<26s}{max(t.period for t in group) / 1000:10.1f}"
+        text += f"{best / 1000:10.1f}\n" if best is not None else f"{'-':>10s}\n"
+    return text
+
+
+## Read text from a serial port after asking the status reporter for a
+#  snapshot. This needs the @c pyserial package.
+#
+#  @param port    Name of the port, such as @c COM5 or @c /dev/rfcomm0
+#  @param baud    Baud rate
+#  @param seconds How long to wait for the snapshot to arrive
+#  @return The text received
+def read_port(port: str, baud: int, seconds: float) -> str:
+    try:
+        import serial
+    except ImportError:
+        raise SystemExit("reading from a serial port needs pyserial: pip install pyserial")
+    with serial.Serial(port, baud, timeout=0.1) as ser:
+        ser.write(b"s")
+        data = b""
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            data += ser.read(4096)
+    return data.decode("utf-8", "replace")
+
+
+## Run a simulation and return the task table printed at its end.
+#
+#  @param seconds Simulated run time [s]
+def read_sim(seconds: float) -> str:
+    import Host_Paths  # noqa: F401  (sets up the module search path)
+    import Romi_Sim
+
+    sim = Romi_Sim.RomiSim(seconds=seconds)
+    sim.run(quiet=True)
+    return str(sim.task_list)
+
+
+## Analyze a task table from a log, a serial port or a simulated run.
+def main():
+    parser = argparse.ArgumentParser(description="Check cotask task sets against their measured run times.")
+    parser.add_argument("log", nargs="?", help="text file holding a task table printed by cotask")
+    parser.add_argument("--port", help="serial port on which to ask Status_Reporter for a snapshot")
+    parser.add_argument("--baud", type=int, default=115200, help="baud rate with --port")
+    parser.add_argument("--wait", type=float, default=5.0, help="seconds to wait for a snapshot with --port")
+    parser.add_argument("--sim", type=float, metavar="SECONDS", help="analyze a simulated run of this length")
+    parser.add_argument("--table", type=int, default=-1, help="which table in the log to use; -1 is the last")
+    parser.add_argument("--wcet", choices=("max", "p99"), default="max", help="longest run, or 99th percentile, which is not a safe test")
+    parser.add_argument(
+        "--set", action="append", default=[], metavar="NAME=MS", help="override the WCET [ms] of tasks whose names start with NAME"
+    )
+    parser.add_argument("--policy", choices=("fp", "rm", "edf", "all"), default="all", help="scheduling policy to check")
+    args = parser.parse_args()
+
+    if args.sim:
+        text = read_sim(args.sim)
+    elif args.port:
+        text = read_port(args.port, args.baud, args.wait)
+    elif args.log:
+        with open(args.log, encoding="utf-8", errors="replace") as file:
+            text = file.read()
+    else:
+        parser.error("give a log file, --port or --sim")
+
+    tables = parse_tables(text, args.wcet)
+    if not tables:
+        raise SystemExit("no cotask task table found")
+    tasks = tables[args.table]
+    for item in args.set:
+        prefix, _, value = item.partition("=")
+        for task in tasks:
+            if task.name.startswith(prefix):
+                task.wcet = int(float(value) * 1000)
+
+    if args.wcet == "p99":
+        print("WCETs are 99th percentiles, not the longest runs, so passing is not a guarantee of meeting deadlines\n")
+    for policy in ("fp", "rm", "edf") if args.policy == "all" else (args.policy,):
+        print(report(tasks, policy))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+## @file Sched_Bench.py
+#  Benchmark of scheduler overhead for @c cotask.TaskList.pri_sched() and
+#  @c cotask.TaskList.edf_sched() with 6, 20 and 100 tasks.
+#
+#  Each task is a generator which does nothing but yield, so the time
+#  measured is the time the scheduler spends deciding what to run. The
+#  scheduler reads a stepped virtual clock given to @c cotask.set_clock(),
+#  which makes every run dispatch exactly the same tasks at the same times
+#  no matter how fast the PC is. Absolute numbers are for CPython on the
+#  PC; the ratio between schedulers is what carries over to the Nucleo.
+#
+#  Usage: @code python Sched_Bench.py [--ms 5000] [--step 50] @endcode
+#
+#  @author Antonio Ventimiglia
+#  @author Caiden Bonney
+#  @date   2025-Dec-12
+#  @copyright GPLv3
+
+import argparse
+import time
+
+import Host_Paths  # noqa: F401  (sets up the module search path)
+import cotask
+import utime
+
+## Priorities and periods [ms] of the timed tasks in @c main.py, plus one
+#  50 ms task; larger task sets repeat this pattern.
+TASK_PATTERN = ((10, 100), (4, 20), (3, 30), (2, 20), (2, 20), (1, 50))
+
+
+## A clock which moves forward a fixed step each time the scheduler is called.
+class StepClock:
+    ## Create a clock starting at time zero.
+    def __init__(self):
+        self.now = 0
+
+    ## Return the current virtual time in microseconds.
+    def __call__(self) -> int:
+        return self.now
+
+    ## Move the clock forward by the given number of microseconds.
+    def step(self, us: int) -> None:
+        self.now = utime.ticks_add(self.now, us)
+
+
+## Generator for a task which does no work at all.
+def idle_task():
+    while True:
+        yield 0
+
+
+## Build a task list holding @c n tasks following @c TASK_PATTERN.
+#
+#  @param n Number of tasks to create
+#  @return A new @c cotask.TaskList holding the tasks
+def build_task_list(n: int):
+    task_list = cotask.TaskList()
+    for idx in range(n):
+        priority, period = TASK_PATTERN[idx % len(TASK_PATTERN)]
+        task_list.append(
+            cotask.Task(idle_task, name=f"Task {idx}", priority=priority, period=period, profile=True)
+        )
+    return task_list
+
+
+## Run one scheduler over a task set and measure how long it takes.
+#
+#  @param sched_name Name of the @c TaskList method, e.g. @c "pri_sched"
+#  @param n          Number of tasks in the set
+#  @param run_ms     Virtual run time in milliseconds
+#  @param step_us    Virtual time which passes between scheduler calls
+#  @return Tuple of (scheduler calls, task dispatches, seconds taken)
+def bench(sched_name: str, n: int, run_ms: int, step_us: int) -> tuple:
+    clock = StepClock()
+    cotask.set_clock(clock)
+    task_list = build_task_list(n)
+    sched = getattr(task_list, sched_name)
+
+    calls = run_ms * 1000 // step_us
+    start = time.perf_counter()
+    for _ in range(calls):
+        sched()
+        clock.step(step_us)
+    elapsed = time.perf_counter() - start
+
+    dispatches = sum(task._runs for pri in task_list.pri_list for task in pri[2:])
+    return calls, dispatches, elapsed
+
+
+## Run the benchmark for each task count and print a table of results.
+def main():
+    parser = argparse.ArgumentParser(description="Compare cotask scheduler overhead per dispatch.")
+    parser.add_argument("--ms", type=int, default=5_000, help="virtual run time per case [ms]")
+    parser.add_argument("--step", type=int, default=50, help="virtual time between scheduler calls [us]")
+    parser.add_argument("--tasks", type=int, nargs="+", default=[6, 20, 100], help="task counts to try")
+    args = parser.parse_args()
+
+    print(f"{'TASKS':>5s} {'SCHEDULER':>10s} {'CALLS':>9s} {'DISPATCH':>9s} {'US/CALL':>9s} {'US/DISP':>9s}")
+    for n in args.tasks:
+        for sched_name in ("pri_sched", "edf_sched"):
+            calls, dispatches, elapsed = bench(sched_name, n, args.ms, args.step)
+            per_call = elapsed * 1e6 / calls
+            per_disp = elapsed * 1e6 / dispatches if dispatches else float("nan")
+            print(f"{n:5d} {sched_name:>10s} {calls:9d} {dispatches:9d} {per_call:9.3f} {per_disp:9.3f}")
+    cotask.set_clock(utime.ticks_us)
+
+
+if __name__ == "__main__":
+    main()
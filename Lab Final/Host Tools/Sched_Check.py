@@ -0,0 +1,189 @@
+## @file Sched_Check.py
+#  Checks that @c cotask.TaskList.edf_sched() runs timed tasks in deadline
+#  order, and that @c cotask.TaskList.frame_sched() runs them in order of
+#  priority, against a stepped virtual clock given to @c cotask.set_clock().
+#
+#  After every call to the scheduler the deadline heap is checked to still
+#  be a heap, and the task which ran is checked to be the one which was
+#  due first, with tasks due at the same time run in order of priority.
+#  The task set is run once with the clock starting at zero and once with
+#  it starting just before the microsecond counter wraps around. Part way
+#  through, one task is made untimed with @c Task.set_period() and later
+#  timed again, and it's checked to move out of the heap and back.
+#
+#  For @c frame_sched(), a chain of tasks linked by @c after, like the
+#  observer, path director and motor controllers, is run beside a
+#  background task of lower priority due at the same times. Every task of
+#  the chain must run before the background task in each frame, even
+#  though the background task depends on nothing.
+#
+#  Usage: @code python Sched_Check.py [--ms 500] [--step 100] @endcode
+#
+#  @author Antonio Ventimiglia
+#  @author Caiden Bonney
+#  @date   2025-Dec-12
+#  @copyright GPLv3
+
+import argparse
+import sys
+
+import Host_Paths  # noqa: F401  (sets up the module search path)
+import cotask
+import utime
+from Sched_Bench import StepClock
+
+## Priorities, periods [ms] and phases [ms] of the tasks checked. The first
+#  two are due at the same times, so their ties are broken by priority.
+TASK_SET = ((2, 20, 0), (4, 20, 0), (3, 30, 5), (1, 50, 0), (10, 100, 3))
+
+
+## Generator for a task which does no work at all.
+def idle_task():
+    while True:
+        yield 0
+
+
+## Priorities of a chain of tasks, each depending on the one before, and
+#  of a background task due at the same times, as in @c main.py.
+CHAIN = (4, 3, 2)
+BACKGROUND = 0
+
+
+## Check whether the deadline heap of a task list is in heap order.
+#
+#  @param task_list The @c cotask.TaskList
+#  @return @c True if no task is due before its parent in the heap
+def heap_ok(task_list) -> bool:
+    heap = task_list.edf_heap
+    return all(not cotask._runs_before(heap[idx], heap[(idx - 1) >> 1]) for idx in range(1, len(heap)))
+
+
+## Run the task set and check the order in which its tasks run.
+#
+#  @param start Time [us] on the virtual clock when the tasks are created
+#  @param run_ms Virtual run time [ms]
+#  @param step_us Virtual time which passes between scheduler calls [us]
+#  @return List of the problems found, empty if there were none
+def check(start: int, run_ms: int, step_us: int) -> list:
+    clock = StepClock()
+    clock.now = start
+    cotask.set_clock(clock)
+    task_list = cotask.TaskList()
+    tasks = [
+        cotask.Task(idle_task, name=f"Task {idx}", priority=pri, period=period, phase=phase, profile=True)
+        for idx, (pri, period, phase) in enumerate(TASK_SET)
+    ]
+    for task in tasks:
+        task_list.append(task)
+    moved = tasks[2]
+
+    problems = []
+    last = None
+    ties = 0
+    wrapped = False
+    calls = run_ms * 1000 // step_us
+    for call in range(calls):
+        # Take the task out of the heap a third of the way through, and put
+        # it back two thirds of the way through
+        if call == calls // 3:
+            moved.set_period(None)
+            if moved in task_list.edf_heap or moved not in task_list.edf_idle:
+                problems.append("untimed task left in the deadline heap")
+        elif call == 2 * calls // 3:
+            moved.set_period(TASK_SET[2][1])
+            if moved not in task_list.edf_heap or moved in task_list.edf_idle:
+                problems.append("timed task not put back in the deadline heap")
+
+        top = task_list.edf_heap[0]
+        due = top._next_run
+        top_runs = top._runs
+        runs = sum(task._runs for task in tasks)
+        task_list.edf_sched()
+        if not heap_ok(task_list):
+            problems.append(f"heap out of order at {clock.now} us")
+
+        # A timed task which ran must be the one at the top of the heap, due
+        # no earlier than the one before it and no sooner than now
+        if sum(task._runs for task in tasks) > runs:
+            if top._runs == top_runs:
+                problems.append(f"{top.name} was due first but another task ran at {clock.now} us")
+            if utime.ticks_diff(clock.now, due) < 0:
+                problems.append(f"{top.name} ran before it was due at {clock.now} us")
+            if last is not None:
+                order = utime.ticks_diff(due, last[0])
+                if order < 0:
+                    problems.append(f"{top.name} ran after a task due later at {clock.now} us")
+                elif order == 0:
+                    ties += 1
+                    if top.priority > last[1]:
+                        problems.append(f"{top.name} ran after a lower priority task due at the same time")
+            wrapped = wrapped or due < start
+            last = (due, top.priority)
+        clock.step(step_us)
+
+    if ties == 0:
+        problems.append("no tasks were due at the same time")
+    if start > 0 and not wrapped:
+        problems.append("the clock didn't wrap around")
+    if moved._runs == 0:
+        problems.append(f"{moved.name} never ran")
+    return problems
+
+
+## Run a chain of dependent tasks beside a background task with
+#  @c frame_sched() and check that the chain always runs first.
+#
+#  @param run_ms Virtual run time [ms]
+#  @param step_us Virtual time which passes between scheduler calls [us]
+#  @return List of the problems found, empty if there were none
+def check_frame(run_ms: int, step_us: int) -> list:
+    clock = StepClock()
+    cotask.set_clock(clock)
+    task_list = cotask.TaskList()
+    chain = []
+    for idx, pri in enumerate(CHAIN):
+        chain.append(
+            cotask.Task(idle_task, name=f"Chain {idx}", priority=pri, period=20, profile=True, after=chain[-1:])
+        )
+    background = cotask.Task(idle_task, name="Background", priority=BACKGROUND, period=20, profile=True)
+    for task in [background] + chain:
+        task_list.append(task)
+
+    problems = []
+    for _ in range(run_ms * 1000 // step_us):
+        runs = background._runs
+        waiting = [task.name for task in chain if task.go_flag or utime.ticks_diff(clock.now, task._next_run) > 0]
+        task_list.frame_sched()
+        if background._runs > runs and waiting:
+            problems.append(f"background task ran ahead of {', '.join(waiting)} at {clock.now} us")
+        clock.step(step_us)
+    if background._runs == 0:
+        problems.append("background task never ran")
+    return problems
+
+
+## Run the checks and print what they found.
+def main():
+    parser = argparse.ArgumentParser(description="Check the deadline order of cotask's EDF scheduler.")
+    parser.add_argument("--ms", type=int, default=500, help="virtual run time per case [ms]")
+    parser.add_argument("--step", type=int, default=100, help="virtual time between scheduler calls [us]")
+    args = parser.parse_args()
+
+    failed = False
+    for label, start in (("from zero", 0), ("across the wrap", utime.TICKS_PERIOD - args.ms * 500)):
+        problems = check(start, args.ms, args.step)
+        print(f"{label:16s} {'ok' if not problems else 'FAILED'}")
+        for problem in problems[:10]:
+            print("  " + problem)
+        failed = failed or bool(problems)
+    problems = check_frame(args.ms, args.step)
+    print(f"{'frame order':16s} {'ok' if not problems else 'FAILED'}")
+    for problem in problems[:10]:
+        print("  " + problem)
+    failed = failed or bool(problems)
+    cotask.set_clock(utime.ticks_us)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+## @file Share_Bench.py
+#  Benchmark of the cost per 20 ms frame of passing the observed state from
+#  the observer to the path director, as eight separate @c task_share.Share
+#  objects and as one @c task_share.StructShare record.
+#
+#  Each frame, the producer writes all eight fields, adding to the X and Y
+#  positions as the observer does, and the consumer reads the fields the way
+#  the path director's go-to-point segment did before: X and Y twice each,
+#  plus the center position and heading. With a record, the consumer copies
+#  the record once into its own buffer and indexes that. Both are run with
+#  and without interrupt protection. Absolute numbers are for CPython on the
+#  PC; the ratio between the two is what carries over to the Nucleo.
+#
+#  Usage: @code python Share_Bench.py [--frames 200000] @endcode
+#
+#  @author Antonio Ventimiglia
+#  @author Caiden Bonney
+#  @date   2025-Dec-12
+#  @copyright GPLv3
+
+import argparse
+import time
+
+import Host_Paths  # noqa: F401  (sets up the module search path)
+import task_share
+
+## Names of the fields of the observed state.
+FIELDS = ("lpos", "rpos", "cpos", "yaw", "yawrate", "X", "Y", "dist_yaw")
+
+
+## Run frames with a separate share for each field.
+#
+#  @param frames Number of frames to run
+#  @param protect Whether the shares disable interrupts
+#  @return Seconds taken
+def bench_shares(frames: int, protect: bool) -> float:
+    lpos, rpos, cpos, yaw, yawrate, x_s, y_s, dist_yaw = (
+        task_share.Share("f", thread_protect=protect, name=name) for name in FIELDS
+    )
+    start = time.perf_counter()
+    for frame in range(frames):
+        # Producer
+        lpos.put(frame)
+        rpos.put(frame)
+        cpos.put(frame)
+        yaw.put(0.5)
+        yawrate.put(0.1)
+        x_s.put(x_s.get() + 1.0)
+        y_s.put(y_s.get() + 1.0)
+        dist_yaw.put(0.5)
+
+        # Consumer
+        dx = 1000.0 - x_s.get()
+        dy = 500.0 - y_s.get()
+        _ = (dx, dy, x_s.get(), y_s.get(), cpos.get(), yaw.get())
+    elapsed = time.perf_counter() - start
+    del task_share.share_list[-len(FIELDS) :]
+    return elapsed
+
+
+## Run frames with one record share for all the fields.
+#
+#  @param frames Number of frames to run
+#  @param protect Whether the share disables interrupts
+#  @return Seconds taken
+def bench_struct(frames: int, protect: bool) -> float:
+    pose_s = task_share.StructShare(FIELDS, "f", thread_protect=protect, name="pose")
+    CPOS, YAW, X, Y = (pose_s.index(name) for name in ("cpos", "yaw", "X", "Y"))
+    out = pose_s.new_buffer()
+    snap = pose_s.new_buffer()
+    start = time.perf_counter()
+    for frame in range(frames):
+        # Producer
+        out[0] = frame
+        out[1] = frame
+        out[2] = frame
+        out[3] = 0.5
+        out[4] = 0.1
+        out[5] = pose_s.get_field(X) + 1.0
+        out[6] = pose_s.get_field(Y) + 1.0
+        out[7] = 0.5
+        pose_s.put(out)
+
+        # Consumer
+        pose_s.snapshot_into(snap)
+        dx = 1000.0 - snap[X]
+        dy = 500.0 - snap[Y]
+        _ = (dx, dy, snap[X], snap[Y], snap[CPOS], snap[YAW])
+    elapsed = time.perf_counter() - start
+    task_share.share_list.pop()
+    return elapsed
+
+
+## Run the benchmark and print a table of results.
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-field shares with a record share.")
+    parser.add_argument("--frames", type=int, default=200_000, help="frames per case")
+    args = parser.parse_args()
+
+    print(f"{'SHARES':>12s} {'PROTECT':>8s} {'US/FRAME':>9s}")
+    for protect in (False, True):
+        for label, bench in (("8 x Share", bench_shares), ("StructShare", bench_struct)):
+            per_frame = bench(args.frames, protect) * 1e6 / args.frames
+            print(f"{label:>12s} {str(protect):>8s} {per_frame:9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+## @file Telemetry_Bench.py
+#  Benchmark of the bytes and time per record of the text and binary
+#  telemetry in @c Telemetry.py.
+#
+#  Each kind of record the path director sends is sent many times to a port
+#  which only counts what it's given, once as the text lines the tasks used
+#  to write with f-strings and once as a binary frame. The values are
+#  typical of a run: positions of hundreds of millimetres and encoder
+#  counts of thousands, with all their decimal places.
+#
+#  The byte counts are exactly what goes over the link on the robot. The
+#  times are for CPython on the PC, where formatting floats as text is done
+#  in C but the CRC and COBS loops of the binary path are interpreted byte
+#  by byte, so on the PC the text path is the quicker one. On the Nucleo
+#  those loops are compiled to machine code by @c micropython.native while
+#  each float formatted as text goes through MicroPython's own float
+#  printing and leaves strings on the heap, so the times there must be
+#  measured on the robot rather than read from this table.
+#
+#  Before the benchmark, a gain record is sent as a binary frame with each
+#  gain name the user input task can change and decoded again, to check
+#  that no name is cut short and two gains can always be told apart.
+#
+#  Usage: @code python Telemetry_Bench.py [--records 100000] @endcode
+#
+#  @author Antonio Ventimiglia
+#  @author Caiden Bonney
+#  @date   2025-Dec-12
+#  @copyright GPLv3
+
+import argparse
+import time
+
+import Host_Paths  # noqa: F401  (sets up the module search path)
+from Telemetry import Telemetry
+from Telemetry_Decode import StreamDecoder
+
+## Names of the gains the user input task can change, as sent in gain
+#  records.
+GAIN_NAMES = ("Kp", "Ki", "Kd", "Kw", "Kff", "turn_correctionl", "turn_correctionr")
+
+## Values sent for each kind of record.
+SAMPLES = {
+    Telemetry.BUMPED: (),
+    Telemetry.POSE: (6076.442, 3861.203, 4968.823, -15.71092, 120.4219, 399.2227),
+    Telemetry.POINT: (102.4193, 399.2612),
+    Telemetry.NEXT_STATE: (17,),
+    Telemetry.LF2D: (1601.173, 99.87254, -3.141593),
+    Telemetry.POSITION_YAW: (1599.812, 100.2154, -1.570796),
+    Telemetry.DIST_HEAD: (-1.570796, -1.566231),
+    Telemetry.GAIN: ("Kp", 0.15),
+}
+
+
+## A port which keeps the bytes written to it.
+class CapturePort:
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, data) -> int:
+        self.data += data
+        return len(data)
+
+
+## Send a gain record with each gain name as a binary frame and decode it.
+#
+#  @return List of the names which didn't come back unchanged
+def check_gains() -> list:
+    port = CapturePort()
+    telemetry = Telemetry(port, binary=True)
+    for num, name in enumerate(GAIN_NAMES):
+        telemetry.send(Telemetry.GAIN, name, num + 0.5)
+    decoder = StreamDecoder()
+    records = [item for item in decoder.feed(bytes(port.data)) if not isinstance(item, str)]
+    got = [(rec.values[0].rstrip(b"\0").decode(), rec.values[1]) for rec in records if rec.kind == Telemetry.GAIN]
+    return [name for num, name in enumerate(GAIN_NAMES) if (name, num + 0.5) not in got]
+
+
+## A port which counts the bytes written to it.
+class NullPort:
+    def __init__(self):
+        self.count = 0
+
+    def write(self, data) -> int:
+        self.count += len(data)
+        return len(data)
+
+
+## Send one kind of record many times.
+#
+#  @param kind The kind of record
+#  @param binary Whether to send binary frames
+#  @param records Number of records sent
+#  @return Tuple of (bytes per record, microseconds per record)
+def bench(kind: int, binary: bool, records: int) -> tuple:
+    port = NullPort()
+    telemetry = Telemetry(port, binary=binary)
+    values = SAMPLES[kind]
+    send = telemetry.send
+    start = time.perf_counter()
+    for _ in range(records):
+        send(kind, *values)
+    elapsed = time.perf_counter() - start
+    return port.count / records, elapsed * 1e6 / records
+
+
+## Run the benchmark and print a table of results.
+def main():
+    parser = argparse.ArgumentParser(description="Compare text and binary telemetry records.")
+    parser.add_argument("--records", type=int, default=100_000, help="records sent per case")
+    args = parser.parse_args()
+
+    wrong = check_gains()
+    if wrong:
+        raise SystemExit("gain names not sent whole: " + ", ".join(wrong))
+
+    print(f"{'RECORD':<13s} {'TEXT B':>7s} {'BIN B':>6s} {'TEXT US':>8s} {'BIN US':>7s}")
+    for kind in SAMPLES:
+        text_bytes, text_us = bench(kind, False, args.records)
+        bin_bytes, bin_us = bench(kind, True, args.records)
+        name = Telemetry.RECORDS[kind][0]
+        print(f"{name:<13s} {text_bytes:7.1f} {bin_bytes:6.1f} {text_us:8.3f} {bin_us:7.3f}")
+
+
+if __name__ == "__main__":
+    main()
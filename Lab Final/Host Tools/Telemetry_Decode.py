@@ -0,0 +1,258 @@
+## @file Telemetry_Decode.py
+#  Decodes the telemetry stream written by @c Telemetry.py on the robot,
+#  whether captured from the Bluetooth or USB serial port or taken from a
+#  simulated run.
+#
+#  The stream may mix text, such as the user input task's prompts, with
+#  binary frames. Frames lie between zero bytes, which text never holds, so
+#  the stream is split at zero bytes and each piece is decoded as a frame if
+#  it is one: it must COBS decode, be of a known kind and length, and carry
+#  the right CRC-16. Anything else is text. Gaps in the frames' sequence
+#  numbers show frames which were lost.
+#
+#  The kinds of record, their formats and their text templates come from
+#  @c Telemetry.RECORDS, so the decoder always matches the firmware.
+#  @c SAMPLES records from @c Subscriptions.py name their channels by
+#  number; the decoder learns each channel's name from the @c SUBSCRIBED
+#  record sent when it was subscribed to.
+#
+#  Usage: @code python Telemetry_Decode.py capture.bin [--text]
+#         python Telemetry_Decode.py --sim [--seconds 180] [--text] [--subscribe obsd_X_s=10] @endcode
+#
+#  @author Antonio Ventimiglia
+#  @author Caiden Bonney
+#  @date   2025-Dec-12
+#  @copyright GPLv3
+
+import argparse
+import binascii
+import struct
+import sys
+
+import Host_Paths  # noqa: F401  (sets up the module search path)
+import Telemetry
+from Telemetry import Telemetry as Sender
+
+## Longest a frame can be between its zero bytes once COBS encoded.
+MAX_FRAME = (4 + Sender.MAX_PAYLOAD) + (4 + Sender.MAX_PAYLOAD) // 254 + 1
+
+
+## Decode a COBS encoded frame, without its zero delimiters.
+#
+#  @param data The encoded bytes
+#  @return The decoded bytes, or @c None if the data isn't valid COBS
+def cobs_decode(data: bytes):
+    out = bytearray()
+    pos = 0
+    while pos < len(data):
+        code = data[pos]
+        if code == 0 or pos + code > len(data):
+            return None
+        out += data[pos + 1 : pos + code]
+        pos += code
+        if code < 0xFF and pos < len(data):
+            out.append(0)
+    return bytes(out)
+
+
+## One decoded telemetry record.
+class Record:
+    ## Create a record.
+    #
+    #  @param kind   The kind of record, such as @c Telemetry.POSE
+    #  @param seq    The frame's sequence number
+    #  @param values Tuple of the record's values
+    def __init__(self, kind: int, seq: int, values: tuple):
+        self.kind = kind
+        self.seq = seq
+        self.values = values
+        ## For a @c SAMPLES record, the names of the channels whose values
+        #  follow its time and mask.
+        self.channels = ()
+
+    ## The name of the kind of record.
+    @property
+    def name(self) -> str:
+        return "samples" if self.kind == Sender.SAMPLES else Sender.RECORDS[self.kind][0]
+
+    ## For a @c SAMPLES record, pairs of channel name and value.
+    def samples(self) -> list:
+        return list(zip(self.channels, self.values[2:]))
+
+    # The values with text fields, such as gain names, turned back into
+    # strings
+    def _plain_values(self) -> list:
+        return [v.rstrip(b"\0").decode("utf-8", "replace") if isinstance(v, bytes) else v for v in self.values]
+
+    ## The record as the text lines the robot writes in text mode.
+    def text(self) -> str:
+        if self.kind == Sender.SAMPLES:
+            return f"Sample {self.values[0]}:" + "".join(f" {name}={value}" for name, value in self.samples()) + "\r\n"
+        return Sender.RECORDS[self.kind][2].format(*self._plain_values())
+
+    def __repr__(self) -> str:
+        if self.kind == Sender.SAMPLES:
+            return f"{self.name} #{self.seq}: t={self.values[0]} " + ", ".join(f"{name}={value:.6g}" for name, value in self.samples())
+        values = (f"{v:.6g}" if isinstance(v, float) else str(v) for v in self._plain_values())
+        return f"{self.name} #{self.seq}: " + ", ".join(values)
+
+
+# The format of a SAMPLES record's values, which depends on its length, or
+# None if the length can't be one
+def _samples_format(length: int):
+    header = struct.calcsize(Sender.SAMPLES_HEADER)
+    if length < header or (length - header) % 4:
+        return None
+    return Sender.SAMPLES_HEADER + "f" * ((length - header) // 4)
+
+
+## Decode one frame, already split from the stream at zero bytes.
+#
+#  @param data The bytes between two zero bytes
+#  @return A @c Record, or @c None if the bytes aren't a valid frame
+def decode_frame(data: bytes):
+    raw = cobs_decode(data)
+    if raw is None or len(raw) < 4:
+        return None
+    if raw[0] == Sender.SAMPLES:
+        fmt = _samples_format(len(raw) - 4)
+    elif raw[0] in Sender.RECORDS:
+        fmt = Sender.RECORDS[raw[0]][1]
+    else:
+        return None
+    if fmt is None or len(raw) != 2 + struct.calcsize(fmt) + 2:
+        return None
+    # binascii's CRC-CCITT started at 0xFFFF is the robot's CRC-16, worked
+    # out in C rather than a byte at a time
+    if binascii.crc_hqx(raw[:-2], 0xFFFF) != raw[-2] | (raw[-1] << 8):
+        return None
+    return Record(raw[0], raw[1], struct.unpack_from(fmt, raw, 2))
+
+
+## Splits a telemetry stream, given piece by piece as it arrives, into
+#  records and text.
+class StreamDecoder:
+    ## Create a decoder with nothing yet received.
+    def __init__(self):
+        self._pending = b""
+        self._last_seq = None
+        ## Number of frames decoded.
+        self.frames = 0
+        ## Number of frames missing from the sequence.
+        self.lost = 0
+        ## The names of the channels subscribed to, by number.
+        self.channels = {}
+
+    ## Decode what has arrived, keeping any piece not yet ended by a zero
+    #  byte until more arrives.
+    #
+    #  A piece longer than any frame can only be text, so it's passed on
+    #  rather than kept; a stream of text alone then comes out as it
+    #  arrives, in pieces which may end part way through a line.
+    #
+    #  @param data The bytes received
+    #  @return A list of @c Record objects and strings of text, in order
+    def feed(self, data: bytes) -> list:
+        pieces = (self._pending + data).split(b"\0")
+        self._pending = pieces.pop()
+        items = []
+        for piece in pieces:
+            if not piece:
+                continue
+            record = decode_frame(piece)
+            if record is None:
+                items.append(piece.decode("utf-8", "replace"))
+                continue
+            if self._last_seq is not None:
+                self.lost += (record.seq - self._last_seq - 1) & 0xFF
+            self._last_seq = record.seq
+            self.frames += 1
+            self._name_channels(record)
+            items.append(record)
+        if len(self._pending) > MAX_FRAME:
+            items.append(self._pending.decode("utf-8", "replace"))
+            self._pending = b""
+        return items
+
+    # Learn the names of channels as they're subscribed to, and give a
+    # SAMPLES record the names of the channels it holds
+    def _name_channels(self, record: Record) -> None:
+        if record.kind == Sender.SUBSCRIBED:
+            self.channels[record.values[0]] = record.values[1].rstrip(b"\0").decode("utf-8", "replace")
+        elif record.kind == Sender.SAMPLES:
+            mask = record.values[1]
+            record.channels = tuple(self.channels.get(idx, f"channel_{idx}") for idx in range(16) if mask & (1 << idx))
+            if len(record.channels) != len(record.values) - 2:
+                record.channels = tuple(f"channel_{idx}" for idx in range(len(record.values) - 2))
+
+    ## Return whatever is left once the stream has ended, as text.
+    def flush(self) -> list:
+        text, self._pending = self._pending, b""
+        return [text.decode("utf-8", "replace")] if text else []
+
+
+## Decode a whole stream and print it.
+#
+#  @param data The bytes of the stream
+#  @param as_text If @c True, print records as the text the robot writes
+#         in text mode; otherwise one line of values for each record
+def print_stream(data: bytes, as_text: bool) -> None:
+    decoder = StreamDecoder()
+    for item in decoder.feed(data) + decoder.flush():
+        if isinstance(item, Record):
+            sys.stdout.write(item.text() if as_text else repr(item) + "\n")
+        else:
+            sys.stdout.write(item.replace("\r\n", "\n"))
+    print(f"\n{decoder.frames} frames decoded, {decoder.lost} lost, {len(data)} bytes")
+
+
+## The commands which subscribe to channels, as typed over Bluetooth.
+#
+#  @param subscriptions Strings such as @c "obsd_X_s=10", giving a channel
+#         and a rate [Hz]
+#  @return The bytes to send
+def subscribe_commands(subscriptions) -> list:
+    commands = []
+    for item in subscriptions:
+        name, _, rate = item.partition("=")
+        commands.append(f"t{name} {rate or 0}\r".encode())
+    return commands
+
+
+## Run the simulation and return what was written to the Bluetooth UART.
+#
+#  @param seconds Simulated run time [s]
+#  @param binary  Whether the robot sends binary frames rather than text
+#  @param subscriptions Channels to subscribe to once the robot has
+#         started, as for @c subscribe_commands()
+def sim_stream(seconds: float, binary: bool = True, subscriptions=()) -> bytes:
+    import Romi_Sim
+
+    Telemetry.BINARY = binary
+    commands = tuple((1.0 + 0.2 * num, command) for num, command in enumerate(subscribe_commands(subscriptions)))
+    sim = Romi_Sim.RomiSim(seconds=seconds, mission=Romi_Sim.DEFAULT_MISSION + commands)
+    sim.run(quiet=True)
+    return sim.uart_output()
+
+
+## Decode a capture or a simulated run from the command line.
+def main():
+    parser = argparse.ArgumentParser(description="Decode the Romi's telemetry stream.")
+    parser.add_argument("capture", nargs="?", help="file holding bytes captured from the serial port")
+    parser.add_argument("--sim", action="store_true", help="decode a simulated run instead of a capture")
+    parser.add_argument("--seconds", type=float, default=180.0, help="simulated run time [s] with --sim")
+    parser.add_argument("--text", action="store_true", help="print records as the robot's text lines")
+    parser.add_argument("--subscribe", action="append", default=[], metavar="NAME=HZ", help="with --sim, subscribe to a channel at a rate")
+    args = parser.parse_args()
+
+    if args.sim:
+        print_stream(sim_stream(args.seconds, subscriptions=args.subscribe), args.text)
+    elif args.capture:
+        with open(args.capture, "rb") as file:
+            print_stream(file.read(), args.text)
+    else:
+        parser.error("give a capture file or --sim")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,554 @@
+## @file Telemetry_Receiver.py
+#  Receives the Romi's telemetry from a serial port, a pty or a saved log,
+#  gathers it into columns, and writes them to CSV or Parquet files a chunk
+#  at a time.
+#
+#  The stream is split into binary frames and text by
+#  @c Telemetry_Decode.StreamDecoder. Each frame is a record whose values go
+#  straight into the table for its kind. Text is cut into lines, and the
+#  lines are matched against the text templates in @c Telemetry.RECORDS, so
+#  the pose lines (@c L:, @c R:, ... @c Y:), the @c X_LF2D: lines and the
+#  other records a robot in text mode writes land in the same tables, with
+#  the same columns, as frames would. A record whose lines are cut short is
+#  dropped and counted. The values of subscribed channels, whether sent as
+#  @c SAMPLES frames or @c Sample: lines, go into a @c samples table with a
+#  row for each value. The task and percentile tables printed by
+#  @c cotask are read into tables of their own, one row for each task in
+#  each snapshot. Other text, such as prompts and tracebacks, is counted and
+#  skipped.
+#
+#  With @c --subscribe the channels named are subscribed to with the user
+#  input task's @c t command, over the serial port or in a simulated run.
+#
+#  Each column is an @c array.array of doubles or 64 bit integers, or a
+#  list for text, appended to one value at a time. Once a table holds
+#  @c --chunk rows they're written out and the columns emptied, so a run of
+#  any length is received in a fixed amount of memory. NumPy isn't needed;
+#  @c Table.to_numpy() gives the rows not yet written as NumPy arrays which
+#  share the columns' memory. Writing Parquet files needs @c pyarrow, and
+#  reading a serial port needs @c pyserial.
+#
+#  The time for which a replay can be compared with the link is the time the
+#  same bytes would take to arrive at 115200 baud, since a log never holds
+#  more than the link carried. At the end the rate at which the bytes were
+#  read is given as a multiple of that, and of real time for a simulated
+#  run.
+#
+#  Usage: @code python Telemetry_Receiver.py Bluetooth_Connection_Console.txt --csv out
+#         python Telemetry_Receiver.py --port COM5 --csv out [--parquet out] [--subscribe obsd_X_s=10]
+#         python Telemetry_Receiver.py /dev/pts/4 --csv out
+#         python Telemetry_Receiver.py --sim 180 [--text-telemetry] [--repeat 200] @endcode
+#
+#  @author Antonio Ventimiglia
+#  @author Caiden Bonney
+#  @date   2025-Dec-12
+#  @copyright GPLv3
+
+import argparse
+import csv
+import os
+import re
+import stat
+import time
+from array import array
+
+import Host_Paths  # noqa: F401  (sets up the module search path)
+from Telemetry import Telemetry as Sender
+from Telemetry_Decode import Record, StreamDecoder, sim_stream, subscribe_commands
+
+## Bytes a second carried by the Bluetooth link at 115200 baud.
+LINK_RATE = 115200 // 10
+
+## Column names for the values of each kind of record, in the order of its
+#  @c struct format.
+FIELDS = {
+    Sender.BUMPED: (),
+    Sender.WALL: (),
+    Sender.UNBUMPED: (),
+    Sender.REVERSED: (),
+    Sender.POSE: ("L", "R", "C", "H", "X", "Y"),
+    Sender.POINT: ("X", "Y"),
+    Sender.NEXT_STATE: ("state",),
+    Sender.LF2D: ("X_LF2D", "Y_LF2D", "H_LF2D"),
+    Sender.T2C3: ("X", "Y"),
+    Sender.POSITION_YAW: ("X", "Y", "dist_yaw"),
+    Sender.DIST_HEAD: ("dist", "head"),
+    Sender.GAIN: ("gain", "value"),
+    Sender.SUBSCRIBED: ("channel", "name", "every"),
+}
+
+## Columns of the table of subscribed channels' values, one row for each
+#  value.
+SAMPLE_FIELDS = ("seq", "time_ms", "channel", "value")
+
+## Columns of the task table printed by @c cotask, one row for each task.
+TASK_FIELDS = ("snapshot", "task", "priority", "period", "runs", "avg_dur", "max_dur", "avg_late", "max_late")
+
+## Columns of the percentile table printed by @c cotask.
+PERCENTILE_FIELDS = ("snapshot", "task", "dur_p50", "dur_p95", "dur_p99", "late_p50", "late_p95", "late_p99")
+
+# A number as printed by CPython or MicroPython, for a text record's values
+_FLOAT = r"([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?|[-+]?nan|[-+]?inf)"
+_INT = r"([-+]?\d+)"
+_NAME = r"([A-Za-z_]\w*?)"
+
+# A row of the task table: name, priority, period or "-", runs, and then
+# the run time and lateness columns if the task was profiled
+_TASK_ROW = re.compile(r"^(.*?)\s+(-?\d+)\s+(-?[\d.]+|-)\s+(\d+)((?:\s+-?[\d.]+)*)\s*$")
+
+# A row of the percentile table: name, then three run time percentiles and
+# three lateness percentiles if lateness was measured
+_PERCENTILE_ROW = re.compile(r"^(.*?)((?:\s+-?[\d.]+){3,6})\s*$")
+
+# A line of subscribed channels' values, and each name=value pair in it
+_SAMPLE_LINE = re.compile(r"^Sample (\d+):((?: \w+=\S+)+)$")
+_SAMPLE_PAIR = re.compile(r" (\w+)=" + _FLOAT)
+
+
+# The type of each value in a struct format: "f" for a float, "i" for an
+# integer and "s" for text
+def _value_types(fmt: str) -> list:
+    types = []
+    for count, code in re.findall(r"(\d*)([a-zA-Z?])", fmt):
+        if code == "s":
+            types.append("s")
+        else:
+            types += ("f" if code in "efd" else "i") * int(count or 1)
+    return types
+
+
+## Rows of one kind, kept as a column for each field.
+class Table:
+    ## Create an empty table.
+    #
+    #  @param name  The table's name, which names its files
+    #  @param names Column names
+    #  @param types For each column, @c "f" for floats, @c "i" for integers
+    #               or @c "s" for text
+    def __init__(self, name: str, names: tuple, types: tuple):
+        self.name = name
+        self.names = names
+        ## The columns, an @c array.array of doubles or integers or a list of
+        #  strings for each name.
+        self.columns = [[] if kind == "s" else array("d" if kind == "f" else "q") for kind in types]
+        ## Rows now held, which haven't been written yet.
+        self.rows = 0
+        ## Rows appended since the table was made.
+        self.total = 0
+
+    ## Append a row.
+    #
+    #  @param row The row's values, in the order of the columns
+    def append(self, row) -> None:
+        for column, value in zip(self.columns, row):
+            column.append(value)
+        self.rows += 1
+        self.total += 1
+
+    ## Empty the columns once their rows have been written.
+    def clear(self) -> None:
+        for column in self.columns:
+            del column[:]
+        self.rows = 0
+
+    ## The rows not yet written as NumPy arrays, by column name. Numeric
+    #  columns share their memory with the table, so they change if more
+    #  rows arrive.
+    def to_numpy(self) -> dict:
+        import numpy
+
+        return {
+            name: numpy.array(column) if isinstance(column, list) else numpy.frombuffer(column, dtype=column.typecode)
+            for name, column in zip(self.names, self.columns)
+        }
+
+
+## Writes each table's rows to a CSV file of its own, a chunk at a time.
+class CsvWriter:
+    ## Create a writer.
+    #
+    #  @param directory Folder for the files, made if it doesn't exist
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self._files = {}
+
+    ## Write the rows a table holds to the end of its file.
+    def write(self, table: Table) -> None:
+        if table.name not in self._files:
+            file = open(os.path.join(self.directory, table.name + ".csv"), "w", newline="")
+            writer = csv.writer(file)
+            writer.writerow(table.names)
+            self._files[table.name] = (file, writer)
+        self._files[table.name][1].writerows(zip(*table.columns))
+
+    ## Close the files.
+    def close(self) -> None:
+        for file, _ in self._files.values():
+            file.close()
+
+
+## Writes each table's rows to a Parquet file of its own, one row group for
+#  each chunk. This needs the @c pyarrow package.
+class ParquetWriter:
+    ## Create a writer.
+    #
+    #  @param directory Folder for the files, made if it doesn't exist
+    def __init__(self, directory: str):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise SystemExit("writing Parquet files needs pyarrow: pip install pyarrow")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self._pa = pyarrow
+        self._files = {}
+
+    ## Write the rows a table holds as a row group of its file.
+    def write(self, table: Table) -> None:
+        data = self._pa.table({name: self._pa.array(column) for name, column in zip(table.names, table.columns)})
+        if table.name not in self._files:
+            path = os.path.join(self.directory, table.name + ".parquet")
+            self._files[table.name] = self._pa.parquet.ParquetWriter(path, data.schema)
+        self._files[table.name].write_table(data)
+
+    ## Close the files.
+    def close(self) -> None:
+        for writer in self._files.values():
+            writer.close()
+
+
+## Turns a telemetry stream into tables, as it arrives.
+class Receiver:
+    ## Create a receiver with nothing yet received.
+    #
+    #  @param chunk   Rows a table holds before they're written out, or 0 to
+    #                 keep every row in memory
+    #  @param writers Writers, such as a @c CsvWriter, given each chunk
+    #  @param clock   Function giving the time [s], which adds a column @c t
+    #                 of the time each row arrived, or @c None for a replay
+    def __init__(self, chunk: int = 10_000, writers=(), clock=None):
+        self.chunk = chunk
+        self.writers = writers
+        self._clock = clock
+        self._start = clock() if clock else 0.0
+        self._decoder = StreamDecoder()
+
+        # Records go to a table by kind and record name, and the text
+        # templates are matched by the start of their first line, longest
+        # first so "T2C3 X, Y: " is tried before "X, Y: "
+        time_cols = ("t",) if clock else ()
+        time_types = ("f",) if clock else ()
+        self.tables = {}
+        self._by_kind = {}
+        self._starts = []
+        for kind, (name, fmt, text) in Sender.RECORDS.items():
+            types = _value_types(fmt)
+            table = Table(name, time_cols + ("seq",) + FIELDS[kind], time_types + ("i",) + tuple(types))
+            self.tables[name] = table
+            self._by_kind[kind] = (table, "s" in types)
+            patterns = []
+            convert = []
+            values = iter(types)
+            for line in text.split("\r\n")[:-1]:
+                parts = line.split("{}")
+                fields = [next(values) for _ in parts[1:]]
+                groups = [_FLOAT if kind == "f" else _INT if kind == "i" else _NAME for kind in fields]
+                regex = re.escape(parts[0]) + "".join(grp + re.escape(part) for grp, part in zip(groups, parts[1:]))
+                patterns.append(re.compile(regex))
+                convert += [float if kind == "f" else int if kind == "i" else str for kind in fields]
+            self._starts.append((text.split("{}")[0].split("\r\n")[0], table, patterns, convert))
+        self._starts.sort(key=lambda start: -len(start[0]))
+        self.tables["tasks"] = Table("tasks", time_cols + TASK_FIELDS, time_types + ("i", "s", "i", "f", "i") + ("f",) * 4)
+        self.tables["percentiles"] = Table("percentiles", time_cols + PERCENTILE_FIELDS, time_types + ("i", "s") + ("f",) * 6)
+        self.tables["samples"] = Table("samples", time_cols + SAMPLE_FIELDS, time_types + ("i", "i", "s", "f"))
+
+        self._line = ""
+        # The text record whose lines are being matched: table, patterns,
+        # converters, and the values so far; the number of its lines
+        # matched; and the cotask table being read
+        self._open = None
+        self._lines_done = 0
+        self._in_table = None
+        self._snapshots = 0
+
+        ## Bytes received.
+        self.bytes = 0
+        ## Lines of text received.
+        self.lines = 0
+        ## Text records whose lines were cut short.
+        self.partial = 0
+        ## Lines which were neither records nor in a task table.
+        self.other = 0
+
+    ## The number of frames lost from the binary stream.
+    @property
+    def lost(self) -> int:
+        return self._decoder.lost
+
+    # The time columns for a row, if there are any
+    def _time(self) -> tuple:
+        return (self._clock() - self._start,) if self._clock else ()
+
+    # Add a record's values to its table
+    def _add_record(self, record: Record) -> None:
+        if record.kind == Sender.SAMPLES:
+            self._add_samples(record.seq, record.values[0], record.samples())
+            return
+        table, has_text = self._by_kind[record.kind]
+        values = record.values
+        if has_text:
+            values = [v.rstrip(b"\0").decode("utf-8", "replace") if isinstance(v, bytes) else v for v in values]
+        table.append(self._time() + (record.seq,) + tuple(values))
+
+    # Add a row to the samples table for each of a record's values
+    def _add_samples(self, seq: int, time_ms: int, samples) -> None:
+        table = self.tables["samples"]
+        now = self._time()
+        for name, value in samples:
+            table.append(now + (seq, time_ms, name, value))
+
+    # Add a row of one of the tables printed by cotask, or return False if
+    # the line isn't one
+    def _add_table_row(self, line: str) -> bool:
+        if self._in_table == "tasks":
+            match = _TASK_ROW.match(line)
+            if not match:
+                return False
+            name, priority, period, runs, rest = match.groups()
+            times = [float(num) for num in rest.split()]
+            times += [float("nan")] * (4 - len(times))
+            row = (self._snapshots, name.strip(), int(priority), float("nan") if period == "-" else float(period), int(runs))
+            self.tables["tasks"].append(self._time() + row + tuple(times[:4]))
+            return True
+        match = _PERCENTILE_ROW.match(line)
+        if not match:
+            return False
+        times = [float(num) for num in match.group(2).split()]
+        times += [float("nan")] * (6 - len(times))
+        self.tables["percentiles"].append(self._time() + (self._snapshots, match.group(1).strip()) + tuple(times))
+        return True
+
+    # Match one line of text
+    def _add_line(self, line: str) -> None:
+        self.lines += 1
+
+        # Carry on with a record whose first lines have already come
+        if self._open:
+            table, patterns, convert, values = self._open
+            match = patterns[self._lines_done].fullmatch(line)
+            if match:
+                values += match.groups()
+                self._lines_done += 1
+                if self._lines_done == len(patterns):
+                    self._open = None
+                    table.append(self._time() + (-1,) + tuple(conv(val) for conv, val in zip(convert, values)))
+                return
+            self._open = None
+            self.partial += 1
+
+        if self._in_table:
+            if self._add_table_row(line):
+                return
+            self._in_table = None
+        if line.startswith("TASK ") and "PERIOD" in line:
+            self._in_table = "tasks"
+            self._snapshots += 1
+            return
+        if line.startswith("PERCENTILES"):
+            self._in_table = "percentiles"
+            return
+        if line.startswith("Sample "):
+            match = _SAMPLE_LINE.match(line)
+            if match:
+                pairs = _SAMPLE_PAIR.findall(match.group(2))
+                self._add_samples(-1, int(match.group(1)), ((name, float(value)) for name, value in pairs))
+                return
+
+        for prefix, table, patterns, convert in self._starts:
+            if line.startswith(prefix):
+                match = patterns[0].fullmatch(line)
+                if match:
+                    if len(patterns) == 1:
+                        table.append(self._time() + (-1,) + tuple(conv(val) for conv, val in zip(convert, match.groups())))
+                    else:
+                        self._open = (table, patterns, convert, list(match.groups()))
+                        self._lines_done = 1
+                    return
+        self.other += 1
+
+    # Split text into lines, keeping the last piece until its line ends
+    def _add_text(self, text: str) -> None:
+        lines = (self._line + text).split("\n")
+        self._line = lines.pop()
+        for line in lines:
+            self._add_line(line.rstrip("\r"))
+
+    # Write out and empty the tables holding at least a chunk of rows, or
+    # every table holding any rows
+    def _write(self, every: bool) -> None:
+        for table in self.tables.values():
+            if table.rows and (every or (self.chunk and table.rows >= self.chunk)):
+                for writer in self.writers:
+                    writer.write(table)
+                if self.writers:
+                    table.clear()
+
+    ## Add bytes received to the tables, writing out any chunks filled.
+    #
+    #  @param data The bytes received
+    def feed(self, data: bytes) -> None:
+        self.bytes += len(data)
+        for item in self._decoder.feed(data):
+            if isinstance(item, Record):
+                self._add_record(item)
+            else:
+                self._add_text(item)
+        self._write(False)
+
+    ## Finish once the stream has ended: read what is left, write out every
+    #  row still held and close the writers.
+    def close(self) -> None:
+        for item in self._decoder.flush():
+            self._add_text(item)
+        if self._line:
+            self._add_line(self._line.rstrip("\r"))
+            self._line = ""
+        if self._open:
+            self._open = None
+            self.partial += 1
+        self._write(True)
+        for writer in self.writers:
+            writer.close()
+
+    ## Puts the rows in each table and the counts of lines into a string.
+    def __repr__(self) -> str:
+        text = f"{'TABLE':<14s} {'ROWS':>8s}\n"
+        for table in self.tables.values():
+            if table.total:
+                text += f"{table.name:<14s} {table.total:8d}\n"
+        text += f"{self.bytes} bytes, {self._decoder.frames} frames ({self.lost} lost), {self.lines} lines "
+        text += f"({self.partial} partial records, {self.other} other)"
+        return text
+
+
+## Yield the bytes of a file in blocks, as fast as they can be read.
+#
+#  @param path   The file
+#  @param repeat Times the file is read, to time a replay of a short log
+def read_file(path: str, repeat: int = 1):
+    for _ in range(repeat):
+        with open(path, "rb") as file:
+            while True:
+                data = file.read(65536)
+                if not data:
+                    break
+                yield data
+
+
+## Yield bytes as they arrive on a terminal device, such as a pty made by
+#  @c socat or the Bluetooth serial port on Linux.
+#
+#  @param path The device, such as @c /dev/pts/4 or @c /dev/rfcomm0
+def read_tty(path: str):
+    import termios
+    import tty
+
+    fd = os.open(path, os.O_RDONLY | os.O_NOCTTY)
+    try:
+        try:
+            tty.setraw(fd)
+        except termios.error:
+            pass
+        while True:
+            data = os.read(fd, 4096)
+            if not data:
+                break
+            yield data
+    finally:
+        os.close(fd)
+
+
+## Yield bytes as they arrive on a serial port. This needs the @c pyserial
+#  package.
+#
+#  @param port Name of the port, such as @c COM5 or @c /dev/rfcomm0
+#  @param baud Baud rate
+#  @param commands Bytes written to the port once it's open, such as the
+#         commands from @c subscribe_commands()
+def read_serial(port: str, baud: int, commands=()):
+    try:
+        import serial
+    except ImportError:
+        raise SystemExit("reading from a serial port needs pyserial: pip install pyserial")
+    with serial.Serial(port, baud, timeout=0.05) as ser:
+        for command in commands:
+            ser.write(command)
+            time.sleep(0.2)
+        while True:
+            data = ser.read(max(1, ser.in_waiting))
+            if data:
+                yield data
+
+
+## Receive telemetry from the command line.
+def main():
+    parser = argparse.ArgumentParser(description="Receive the Romi's telemetry into CSV or Parquet tables.")
+    parser.add_argument("source", nargs="?", help="saved log or capture, or a pty or serial device to read as it arrives")
+    parser.add_argument("--port", help="serial port to read, through pyserial")
+    parser.add_argument("--baud", type=int, default=115200, help="baud rate with --port")
+    parser.add_argument("--sim", type=float, metavar="SECONDS", help="receive a simulated run of this length")
+    parser.add_argument("--text-telemetry", action="store_true", help="with --sim, have the robot send text rather than frames")
+    parser.add_argument("--repeat", type=int, default=1, help="times a log or simulated run is replayed, for timing; frames count as lost where each replay starts again")
+    parser.add_argument("--csv", metavar="DIR", help="write a CSV file for each table into this folder")
+    parser.add_argument("--parquet", metavar="DIR", help="write a Parquet file for each table into this folder")
+    parser.add_argument("--chunk", type=int, default=10_000, help="rows a table holds before they're written out")
+    parser.add_argument("--subscribe", action="append", default=[], metavar="NAME=HZ", help="with --port or --sim, subscribe to a channel at a rate")
+    args = parser.parse_args()
+
+    live = False
+    seconds = None
+    if args.sim:
+        data = sim_stream(args.sim, binary=not args.text_telemetry, subscriptions=args.subscribe)
+        source = (data for _ in range(args.repeat))
+        seconds = args.sim * args.repeat
+    elif args.port:
+        source = read_serial(args.port, args.baud, subscribe_commands(args.subscribe))
+        live = True
+    elif args.source and stat.S_ISCHR(os.stat(args.source).st_mode):
+        source = read_tty(args.source)
+        live = True
+    elif args.source:
+        source = read_file(args.source, args.repeat)
+    else:
+        parser.error("give a log file, a device, --port or --sim")
+
+    writers = []
+    if args.csv:
+        writers.append(CsvWriter(args.csv))
+    if args.parquet:
+        writers.append(ParquetWriter(args.parquet))
+    receiver = Receiver(args.chunk, writers, time.monotonic if live else None)
+
+    start = time.perf_counter()
+    try:
+        for data in source:
+            receiver.feed(data)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        receiver.close()
+    elapsed = time.perf_counter() - start
+
+    print(receiver)
+    if not live and elapsed > 0:
+        line = f"Read in {elapsed:.3f} s, {receiver.bytes / elapsed / 1e6:.2f} MB/s: "
+        line += f"{receiver.bytes / LINK_RATE / elapsed:.0f}x the link at 115200 baud"
+        if seconds:
+            line += f", {seconds / elapsed:.0f}x real time"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+## @file Trace_Tools.py
+#  Decodes the binary dumps written by @c cotask.TaskList.dump_trace(),
+#  prints the state transition traces as text and converts the scheduler
+#  timeline into Chrome trace-event JSON for Perfetto or @c chrome://tracing.
+#
+#  A dump is any number of task records one after another, each a header in
+#  the @c cotask.TRACE_HEADER format, the task name, the transition times
+#  and then the states, optionally followed by one timeline record in the
+#  @c cotask.TIMELINE_HEADER format. A dump can be captured from the
+#  Bluetooth or USB serial port into a file, or written by @c Romi_Sim.py
+#  with its @c --trace option.
+#
+#  Usage: @code python Trace_Tools.py dump.bin [--task "Observer"]
+#                [--chrome timeline.json] @endcode
+#
+#  @author Antonio Ventimiglia
+#  @author Caiden Bonney
+#  @date   2025-Dec-12
+#  @copyright GPLv3
+
+import argparse
+import json
+import struct
+from array import array
+
+import Host_Paths  # noqa: F401  (sets up the module search path)
+import cotask
+import utime
+
+_HEADER_SIZE = struct.calcsize(cotask.TRACE_HEADER)
+_TIMELINE_SIZE = struct.calcsize(cotask.TIMELINE_HEADER)
+
+
+## The decoded transition trace of one task.
+class TaskTrace:
+    ## Create a trace record.
+    #
+    #  @param name     Task name, with any padding removed
+    #  @param capacity Number of transitions the task's ring buffer holds
+    #  @param total    Number of transitions recorded since tracing began
+    #  @param base     State before the oldest transition kept
+    #  @param start    Tick [us] at which tracing began
+    #  @param times    Ticks [us] of the transitions kept, oldest first
+    #  @param states   States moved to at each transition kept
+    def __init__(self, name, capacity, total, base, start, times, states):
+        self.name = name
+        self.capacity = capacity
+        self.total = total
+        self.base = base
+        self.start = start
+        self.times = times
+        self.states = states
+
+    ## Number of transitions which were overwritten before the dump.
+    @property
+    def dropped(self) -> int:
+        return self.total - len(self.times)
+
+    ## Yield (time since tracing began [s], from-state, to-state) for each
+    #  transition kept.
+    def transitions(self):
+        last = self.base
+        for tick, state in zip(self.times, self.states):
+            yield utime.ticks_diff(tick, self.start) / 1_000_000, last, state
+            last = state
+
+    ## Show the trace in the same form as @c cotask.Task.get_trace().
+    def __str__(self):
+        text = "Task " + self.name + ":\n"
+        if self.dropped:
+            text += f"  ({self.dropped} earlier transitions overwritten)\n"
+        for seconds, from_state, to_state in self.transitions():
+            text += "{: 12.6f}: {: 2d} -> {:d}\n".format(seconds, from_state, to_state)
+        return text
+
+
+## The decoded scheduler timeline: one entry per task run.
+class TimelineDump:
+    ## Create a timeline record.
+    #
+    #  @param names  Task names, with any padding removed, by task number
+    #  @param total  Number of runs recorded, including overwritten ones
+    #  @param runs   List of (task number, start tick, end tick, state),
+    #                oldest first
+    def __init__(self, names, total, runs):
+        self.names = names
+        self.total = total
+        self.runs = runs
+
+    ## Number of runs which were overwritten before the dump.
+    @property
+    def dropped(self) -> int:
+        return self.total - len(self.runs)
+
+    ## Convert the timeline to Chrome trace-event JSON. Each task gets its
+    #  own row, and each run is a complete ("X") event whose arguments hold
+    #  the state the task yielded. Times are microseconds from the first
+    #  run kept, with tick counter wraparound removed.
+    #
+    #  @return A dictionary ready for @c json.dump()
+    def to_chrome(self) -> dict:
+        events = [
+            {"name": "process_name", "ph": "M", "pid": 1, "tid": 0, "args": {"name": "Romi cotask"}},
+        ]
+        for task_id, name in enumerate(self.names):
+            events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": task_id, "args": {"name": name}})
+            events.append({"name": "thread_sort_index", "ph": "M", "pid": 1, "tid": task_id, "args": {"sort_index": task_id}})
+        if self.runs:
+            origin = self.runs[0][1]
+            for task_id, start, end, state in self.runs:
+                events.append(
+                    {
+                        "name": self.names[task_id] if task_id < len(self.names) else f"Task {task_id}",
+                        "ph": "X",
+                        "pid": 1,
+                        "tid": task_id,
+                        "ts": utime.ticks_diff(start, origin),
+                        "dur": utime.ticks_diff(end, start),
+                        "args": {"state": state},
+                    }
+                )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+## Decode a timeline record.
+#
+#  @param data The dump
+#  @param pos  Index of the record's header in @c data
+#  @return The @c TimelineDump and the index just past the record
+#  @throws ValueError if the record is cut short
+def _read_timeline(data: bytes, pos: int):
+    if len(data) - pos < _TIMELINE_SIZE:
+        raise ValueError(f"trace dump cut short at byte {pos}")
+    _, _, kept, total, n_tasks = struct.unpack_from(cotask.TIMELINE_HEADER, data, pos)
+    pos += _TIMELINE_SIZE
+    names = []
+    for _ in range(n_tasks):
+        if pos >= len(data) or pos + 1 + data[pos] > len(data):
+            raise ValueError(f"trace dump cut short at byte {len(data)}")
+        names.append(data[pos + 1 : pos + 1 + data[pos]].decode("utf-8", "replace").strip())
+        pos += 1 + data[pos]
+    columns = []
+    for code in ("B", "I", "I", "H"):
+        column = array(code)
+        size = column.itemsize * kept
+        if pos + size > len(data):
+            raise ValueError(f"trace dump cut short at byte {len(data)}")
+        column.frombytes(data[pos : pos + size])
+        columns.append(column)
+        pos += size
+    return TimelineDump(names, total, list(zip(*columns))), pos
+
+
+## Decode every record in a dump.
+#
+#  @param data The bytes written by @c cotask.TaskList.dump_trace()
+#  @return A list of @c TaskTrace objects in the order they were written,
+#          and the @c TimelineDump or @c None if there was no timeline
+#  @throws ValueError if the data is cut short or is not a trace dump
+def read_dump(data: bytes):
+    traces = []
+    timeline = None
+    pos = 0
+    while pos < len(data):
+        if data[pos : pos + 4] == b"CTLN":
+            timeline, pos = _read_timeline(data, pos)
+            continue
+        if len(data) - pos < _HEADER_SIZE:
+            raise ValueError(f"trace dump cut short at byte {pos}")
+        magic, capacity, kept, total, base, start, name_len = struct.unpack_from(cotask.TRACE_HEADER, data, pos)
+        if magic != b"CTRC":
+            raise ValueError(f"no trace record at byte {pos}")
+        pos += _HEADER_SIZE
+        end = pos + name_len + 6 * kept
+        if end > len(data):
+            raise ValueError(f"trace dump cut short at byte {len(data)}")
+        name = data[pos : pos + name_len].decode("utf-8", "replace").strip()
+        pos += name_len
+        times = array("I")
+        times.frombytes(data[pos : pos + 4 * kept])
+        pos += 4 * kept
+        states = array("H")
+        states.frombytes(data[pos : pos + 2 * kept])
+        pos += 2 * kept
+        traces.append(TaskTrace(name, capacity, total, base, start, list(times), list(states)))
+    return traces, timeline
+
+
+## Write a timeline as Chrome trace-event JSON.
+#
+#  @param timeline The @c TimelineDump to convert
+#  @param path     Name of the JSON file to write
+def write_chrome(timeline, path: str) -> None:
+    with open(path, "w") as file:
+        json.dump(timeline.to_chrome(), file)
+
+
+## Decode a dump file, print the traces and convert the timeline.
+def main():
+    parser = argparse.ArgumentParser(description="Decode a binary cotask trace and timeline dump.")
+    parser.add_argument("dump", help="file holding the bytes from TaskList.dump_trace()")
+    parser.add_argument("--task", help="show only tasks whose names start with this")
+    parser.add_argument("--chrome", metavar="JSON", help="write the timeline here as Chrome trace-event JSON")
+    args = parser.parse_args()
+
+    with open(args.dump, "rb") as file:
+        traces, timeline = read_dump(file.read())
+    for trace in traces:
+        if args.task is None or trace.name.startswith(args.task):
+            print(trace)
+    if args.chrome:
+        if timeline is None:
+            raise SystemExit("the dump holds no timeline")
+        write_chrome(timeline, args.chrome)
+        print(f"Wrote {len(timeline.runs)} task runs to {args.chrome} ({timeline.dropped} overwritten)")
+
+
+if __name__ == "__main__":
+    main()